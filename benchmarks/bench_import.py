@@ -0,0 +1,63 @@
+"""Benchmark the cold-start import time of gtlparser.
+
+Each scenario runs in a fresh interpreter, so module caches from one run do
+not leak into the next. Usage:
+
+    python benchmarks/bench_import.py [--repeat N]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+
+# "gtlparser.Map" loads the ipyleaflet module, which is what "import gtlparser"
+# used to do eagerly; it is the reference the other scenarios are compared to.
+REFERENCE = "gtlparser.Map (previous import gtlparser)"
+SCENARIOS = {
+    "import gtlparser (parse only)": "import gtlparser",
+    "gtlparser.parse_visitPoint": "import gtlparser; gtlparser.parse_visitPoint",
+    REFERENCE: "import gtlparser; gtlparser.Map",
+    "gtlparser.foliumap.Map": "import gtlparser; gtlparser.foliumap.Map",
+}
+
+
+def time_import(code, repeat):
+    """
+    Time a snippet in fresh interpreters.
+
+    Args:
+        code (str): The Python code to run.
+        repeat (int): Number of runs.
+
+    Returns:
+        float: Median wall-clock time in milliseconds, minus the bare
+            interpreter start-up time.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark gtlparser import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario")
+    args = parser.parse_args()
+
+    baseline = time_import("pass", args.repeat)
+    results = {
+        name: time_import(code, args.repeat) - baseline
+        for name, code in SCENARIOS.items()
+    }
+    reference = results[REFERENCE]
+    print(f"{'scenario':<46} {'ms':>8} {'share':>7}")
+    for name, milliseconds in results.items():
+        print(f"{name:<46} {milliseconds:>8.1f} {milliseconds / reference:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
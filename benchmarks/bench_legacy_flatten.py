@@ -0,0 +1,463 @@
+"""Benchmark the placeVisit/activitySegment flattening of the legacy converter.
+
+The compiled field mapping specs of the converter are compared to a copy of
+the if/elif flattening they replaced, on a synthetic Semantic Location
+History of placeVisit and activitySegment objects. Both must give the same
+properties. Usage:
+
+    python benchmarks/bench_legacy_flatten.py [--records N]
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gtlparser import Convert_GTL_2_GeoJSON as legacy  # noqa: E402
+
+# Distinct objects generated; the history repeats them up to --records
+POOL = 10000
+
+# ----------------------------------------
+# Reference: the if/elif flattening of the converter before the field
+# mapping specs, kept verbatim so the benchmark compares against fixed code.
+
+
+def parse_coordinate(inputCoordinate):
+    return inputCoordinate / 10000000
+
+
+def parse_sourceInfo(inputDict, temp_allFields_dict, withPrefix=False, prefix="start"):
+    if withPrefix == 0:
+        for subfield in inputDict:
+            temp_allFields_dict["sourceInfo"] = subfield
+            temp_allFields_dict[subfield] = inputDict.get(subfield)
+    else:
+        for subfield in inputDict:
+            temp_allFields_dict[f"{prefix}_sourceInfo"] = subfield
+            temp_allFields_dict[f"{prefix}_" + subfield] = inputDict.get(subfield)
+
+
+# -------------------------------------
+
+
+def parse_placeVisit_items(placeVisit):
+    # Get values (dict) from input placeVisit
+    subset_placeVisit = placeVisit.get("placeVisit")
+    # Create temporary dict
+    temp_allFields_dict = {}
+    # Get values (aggregated fields) from input
+    for aggregatedFields in subset_placeVisit:
+        if aggregatedFields == "location":
+            parse_placeVisit_location(
+                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "childVisits":
+            parse_placeVisit_childVisits(
+                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "duration":
+            parse_placeVisit_duration(
+                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "otherCandidateLocations":
+            parse_placeVisit_location(
+                subset_placeVisit.get(aggregatedFields),
+                temp_allFields_dict,
+                otherCandidateLocation=True,
+            )
+        elif aggregatedFields == "centerLatE7" or aggregatedFields == "centerLngE7":
+            temp_allFields_dict[aggregatedFields] = parse_coordinate(
+                subset_placeVisit.get(aggregatedFields)
+            )
+        else:
+            temp_allFields_dict[aggregatedFields] = subset_placeVisit.get(
+                aggregatedFields
+            )
+    return temp_allFields_dict
+
+
+def parse_placeVisit_location(
+    inputDict, temp_allFields_dict, otherCandidateLocation=False, childVisit=False
+):
+    if otherCandidateLocation == 0:
+        for subfield in inputDict:
+            if subfield == "latitudeE7" or subfield == "longitudeE7":
+                temp_allFields_dict[subfield] = parse_coordinate(
+                    inputDict.get(subfield)
+                )
+            elif subfield == "name":
+                if childVisit:
+                    temp_allFields_dict[subfield] = (
+                        inputDict.get(subfield) + " " + temp_allFields_dict[subfield]
+                    )
+                else:
+                    temp_allFields_dict[subfield] = inputDict.get(subfield)
+            elif subfield == "sourceInfo":
+                sourceInfo_dict = inputDict.get(subfield)
+                parse_sourceInfo(sourceInfo_dict, temp_allFields_dict)
+            else:
+                temp_allFields_dict[subfield] = inputDict.get(subfield)
+    else:  # to be continue
+        temp_allFields_dict["otherCandidateFields"] = inputDict
+
+
+def parse_placeVisit_childVisits(inputList, temp_allFields_dict):
+    childVisitDict = inputList[0]
+    for aggregatedFields in childVisitDict:
+        if aggregatedFields == "location":
+            parse_placeVisit_location(
+                childVisitDict.get(aggregatedFields),
+                temp_allFields_dict,
+                childVisit=True,
+            )
+        elif aggregatedFields == "duration":
+            parse_placeVisit_duration(
+                childVisitDict.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "otherCandidateLocations":
+            parse_placeVisit_location(
+                childVisitDict.get(aggregatedFields),
+                temp_allFields_dict,
+                otherCandidateLocation=True,
+            )
+        else:
+            temp_allFields_dict[aggregatedFields] = childVisitDict.get(aggregatedFields)
+
+
+# can customize the time zone
+def parse_placeVisit_duration(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        temp_time_string = datetime.datetime.fromisoformat(
+            inputDict.get(subfield)
+        ).strftime("%Y-%m-%d %H:%M:%S")
+        temp_time = datetime.datetime.strptime(temp_time_string, "%Y-%m-%d %H:%M:%S")
+        ETZ_datetime = temp_time - datetime.timedelta(hours=5)
+        temp_allFields_dict[subfield + "recordDate"] = ETZ_datetime.strftime("%Y-%m-%d")
+        temp_allFields_dict[subfield + "recordTime"] = ETZ_datetime.strftime("%H:%M:%S")
+
+
+# ----------------------------------------
+
+
+def parse_activitySegment_items(activitySegment):
+    # Get values (dict) from input activitySegment
+    subset_activitySegment = activitySegment.get("activitySegment")
+    # Create temporary dict
+    temp_allFields_dict = {}
+    # Get values (aggregated fields) from input
+    for aggregatedFields in subset_activitySegment:
+        if aggregatedFields == "startLocation":
+            parse_activitySegment_startLocation(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "endLocation":
+            parse_activitySegment_endLocation(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "duration":
+            parse_activitySegment_duration(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "activities":
+            parse_activitySegment_activities(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "waypointPath":
+            parse_activitySegment_waypointPath(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "simplifiedRawPath":
+            parse_activitySegment_simplifiedRawPath(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        elif aggregatedFields == "parkingEvent":
+            parse_activitySegment_parkingEvent(
+                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
+            )
+        else:
+            temp_allFields_dict[aggregatedFields] = subset_activitySegment.get(
+                aggregatedFields
+            )
+    return temp_allFields_dict
+
+
+def parse_activitySegment_startLocation(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        if subfield == "latitudeE7":
+            temp_allFields_dict["start_latitudeE7"] = parse_coordinate(
+                inputDict.get(subfield)
+            )
+        elif subfield == "longitudeE7":
+            temp_allFields_dict["start_longitudeE7"] = parse_coordinate(
+                inputDict.get(subfield)
+            )
+        elif subfield == "sourceInfo":
+            sourceInfo_dict = inputDict.get(subfield)
+            parse_sourceInfo(sourceInfo_dict, temp_allFields_dict, withPrefix=True)
+
+
+def parse_activitySegment_endLocation(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        if subfield == "latitudeE7":
+            temp_allFields_dict["end_latitudeE7"] = parse_coordinate(
+                inputDict.get(subfield)
+            )
+        elif subfield == "longitudeE7":
+            temp_allFields_dict["end_longitudeE7"] = parse_coordinate(
+                inputDict.get(subfield)
+            )
+        elif subfield == "sourceInfo":
+            sourceInfo_dict = inputDict.get(subfield)
+            parse_sourceInfo(
+                sourceInfo_dict, temp_allFields_dict, withPrefix=True, prefix="end"
+            )
+
+
+def parse_activitySegment_duration(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        temp_time_string = datetime.datetime.fromisoformat(
+            inputDict.get(subfield)
+        ).strftime("%Y-%m-%d %H:%M:%S")
+        temp_time = datetime.datetime.strptime(temp_time_string, "%Y-%m-%d %H:%M:%S")
+        ETZ_datetime = temp_time - datetime.timedelta(hours=5)
+        temp_allFields_dict[subfield + "recordDate"] = ETZ_datetime.strftime("%Y-%m-%d")
+        temp_allFields_dict[subfield + "recordTime"] = ETZ_datetime.strftime("%H:%M:%S")
+
+
+def parse_activitySegment_activities(inputDict, temp_allFields_dict):
+    temp_allFields_dict["activities"] = inputDict
+
+
+def parse_activitySegment_waypointPath(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        if subfield == "waypoints":
+            temp_allFields_dict["waypoints"] = parse_activitySegment_waypoints(
+                inputDict.get(subfield), temp_allFields_dict
+            )
+        elif subfield == "roadSegment":
+            continue
+        elif subfield == "confidence":
+            temp_allFields_dict["travelMode_confidence"] = inputDict.get(subfield)
+        else:
+            temp_allFields_dict[subfield] = inputDict.get(subfield)
+
+
+def parse_activitySegment_waypoints(inputDict, temp_allFields_dict):
+    temp_points_list = []
+    for point_dict in inputDict:
+        temp_points_list.append(
+            (
+                parse_coordinate(point_dict["lngE7"]),
+                parse_coordinate(point_dict["latE7"]),
+            )
+        )
+    return temp_points_list
+
+
+def parse_activitySegment_simplifiedRawPath(inputDict, temp_allFields_dict):
+    temp_allFields_dict["simplifiedRawPath"] = inputDict
+
+
+def parse_activitySegment_parkingEvent(inputDict, temp_allFields_dict):
+    for subfield in inputDict:
+        if subfield == "location":
+            subDict = inputDict.get(subfield)
+            temp_allFields_dict["parkingEvent_point"] = (
+                parse_coordinate(subDict["longitudeE7"]),
+                parse_coordinate(subDict["latitudeE7"]),
+            )
+            temp_allFields_dict["parkingEvent_accuracyMetres"] = subDict[
+                "accuracyMetres"
+            ]
+        elif subfield == "method":
+            temp_allFields_dict["parkingEvent_method"] = inputDict.get(subfield)
+        elif subfield == "locationSource":
+            temp_allFields_dict["parkingEvent_locationSource"] = inputDict.get(subfield)
+        elif subfield == "timestamp":
+            temp_allFields_dict["parkingEvent_timestamp"] = (
+                datetime.datetime.fromisoformat(inputDict.get(subfield)).strftime(
+                    "%Y-%m-%d %H:%M:%S"
+                )
+            )
+
+
+# ----------------------------------------
+
+
+def timestamp(moment):
+    """Format a datetime like the Semantic Location History."""
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def synthetic_objects(count, seed=0):
+    """
+    Generate timelineObjects with the fields of real monthly files.
+
+    Args:
+        count (int): Number of objects, alternating visits and segments.
+        seed (int): Random seed.
+
+    Returns:
+        list: The timelineObjects.
+    """
+    rng = random.Random(seed)
+    moment = datetime.datetime(2020, 1, 1, 8)
+    objects = []
+    for i in range(count):
+        start, moment = moment, moment + datetime.timedelta(
+            seconds=rng.randrange(600, 7200)
+        )
+        duration = {
+            "startTimestamp": timestamp(start),
+            "endTimestamp": timestamp(moment),
+        }
+        lat, lng = rng.randrange(-900000000, 900000000), rng.randrange(
+            -1800000000, 1800000000
+        )
+        if i % 2 == 0:
+            place = {
+                "location": {
+                    "latitudeE7": lat,
+                    "longitudeE7": lng,
+                    "placeId": f"ChIJ{i:012d}",
+                    "address": f"{i} Main Street",
+                    "name": f"Place {i}",
+                    "sourceInfo": {"deviceTag": rng.randrange(1 << 31)},
+                    "locationConfidence": rng.random() * 100,
+                    "calibratedProbability": rng.random() * 100,
+                },
+                "duration": duration,
+                "placeConfidence": "HIGH_CONFIDENCE",
+                "centerLatE7": lat + 10,
+                "centerLngE7": lng - 10,
+                "visitConfidence": rng.randrange(100),
+                "otherCandidateLocations": [
+                    {"latitudeE7": lat + 1000, "longitudeE7": lng, "placeId": "x"}
+                ],
+                "editConfirmationStatus": "NOT_CONFIRMED",
+                "locationConfidence": rng.randrange(100),
+                "placeVisitType": "SINGLE_PLACE",
+                "placeVisitImportance": "MAIN",
+            }
+            if i % 10 == 0:
+                place["childVisits"] = [
+                    {
+                        "location": {
+                            "latitudeE7": lat + 5,
+                            "longitudeE7": lng + 5,
+                            "name": f"Shop {i}",
+                        },
+                        "duration": duration,
+                        "placeConfidence": "MEDIUM_CONFIDENCE",
+                    }
+                ]
+            objects.append({"placeVisit": place})
+        else:
+            segment = {
+                "startLocation": {
+                    "latitudeE7": lat,
+                    "longitudeE7": lng,
+                    "sourceInfo": {"deviceTag": rng.randrange(1 << 31)},
+                },
+                "endLocation": {
+                    "latitudeE7": lat + 20000,
+                    "longitudeE7": lng + 20000,
+                    "sourceInfo": {"deviceTag": rng.randrange(1 << 31)},
+                },
+                "duration": duration,
+                "distance": rng.randrange(100, 20000),
+                "activityType": "IN_PASSENGER_VEHICLE",
+                "confidence": "HIGH",
+                "activities": [
+                    {"activityType": "IN_PASSENGER_VEHICLE", "probability": 90.0},
+                    {"activityType": "WALKING", "probability": 5.0},
+                ],
+                "waypointPath": {
+                    "waypoints": [
+                        {"latE7": lat + 4000 * k, "lngE7": lng + 4000 * k}
+                        for k in range(6)
+                    ],
+                    "source": "INFERRED",
+                    "roadSegment": [{"placeId": "road", "duration": "1s"}],
+                    "distanceMeters": 1234.5,
+                    "travelMode": "DRIVE",
+                    "confidence": 0.9,
+                },
+                "editConfirmationStatus": "NOT_CONFIRMED",
+            }
+            if i % 5 == 1:
+                segment["parkingEvent"] = {
+                    "location": {
+                        "latitudeE7": lat + 20000,
+                        "longitudeE7": lng + 20000,
+                        "accuracyMetres": 20,
+                    },
+                    "method": "END_OF_ACTIVITY_SEGMENT",
+                    "locationSource": "UNKNOWN",
+                    "timestamp": timestamp(moment),
+                }
+            objects.append({"activitySegment": segment})
+    return objects
+
+
+def flatten_all(parsers, objects):
+    """Flatten every object with the {key: parse function} parsers."""
+    return [parsers[next(iter(item))](item) for item in objects]
+
+
+def time_flatten(parsers, objects, records):
+    """
+    Time the flattening of a history of records.
+
+    Args:
+        parsers (dict): Parse function of each timelineObjects key.
+        objects (list): The distinct timelineObjects, repeated up to records.
+        records (int): Number of objects in the history.
+
+    Returns:
+        float: Records per second.
+    """
+    start = time.perf_counter()
+    remaining = records
+    while remaining > 0:
+        flatten_all(parsers, objects[:remaining])
+        remaining -= len(objects)
+    return records / (time.perf_counter() - start)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the legacy field flattening")
+    parser.add_argument(
+        "--records", type=int, default=1000000, help="Objects in the history"
+    )
+    args = parser.parse_args()
+
+    before = {
+        "placeVisit": parse_placeVisit_items,
+        "activitySegment": parse_activitySegment_items,
+    }
+    after = {
+        "placeVisit": legacy.parse_placeVisit_items,
+        "activitySegment": legacy.parse_activitySegment_items,
+    }
+    objects = synthetic_objects(min(POOL, args.records))
+    if flatten_all(before, objects) != flatten_all(after, objects):
+        sys.exit("The flattened properties differ from the if/elif flattening.")
+
+    results = {
+        "if/elif": time_flatten(before, objects, args.records),
+        "compiled spec": time_flatten(after, objects, args.records),
+    }
+    reference = next(iter(results.values()))
+    print(f"{'scenario':<24} {'records/s':>12} {'speed-up':>9}")
+    for name, rate in results.items():
+        print(f"{name:<24} {rate:>12,.0f} {rate / reference:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
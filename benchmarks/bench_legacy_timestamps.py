@@ -0,0 +1,113 @@
+"""Benchmark the recordDate/recordTime decoding of the legacy converter.
+
+The decoder is compared to the chain of datetime conversions the converter
+used (fromisoformat, strftime, strptime, a fixed -5 hours and two more
+strftime), on synthetic Semantic Location History timestamps. Usage:
+
+    python benchmarks/bench_legacy_timestamps.py [--count N] [--zone ZONE]
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gtlparser import Convert_GTL_2_GeoJSON as legacy  # noqa: E402
+from gtlparser.decoders import LocalTime  # noqa: E402
+
+
+def previous_chain(timestamp):
+    """Decode a timestamp the way the converter used to."""
+    temp_time_string = datetime.datetime.fromisoformat(timestamp).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    temp_time = datetime.datetime.strptime(temp_time_string, "%Y-%m-%d %H:%M:%S")
+    ETZ_datetime = temp_time - datetime.timedelta(hours=5)
+    return ETZ_datetime.strftime("%Y-%m-%d"), ETZ_datetime.strftime("%H:%M:%S")
+
+
+def synthetic_timestamps(count, seed=0):
+    """
+    Generate "startTimestamp" values a few hours apart over several years.
+
+    Args:
+        count (int): Number of timestamps.
+        seed (int): Random seed.
+
+    Returns:
+        list: The timestamp strings, e.g. "2020-01-01T08:00:00.000Z".
+    """
+    rng = random.Random(seed)
+    moment = datetime.datetime(2016, 1, 1, 8)
+    timestamps = []
+    for _ in range(count):
+        moment += datetime.timedelta(milliseconds=rng.randrange(600000, 10800000))
+        timestamps.append(
+            moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+        )
+    return timestamps
+
+
+def time_decoder(decode, timestamps):
+    """
+    Time a decoder over the timestamps.
+
+    Args:
+        decode (callable): Function of a timestamp string.
+        timestamps (list): The timestamp strings.
+
+    Returns:
+        float: Timestamps per second.
+    """
+    start = time.perf_counter()
+    for timestamp in timestamps:
+        decode(timestamp)
+    return len(timestamps) / (time.perf_counter() - start)
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark the legacy timestamp decoding")
+    parser.add_argument(
+        "--count", type=int, default=1000000, help="Timestamps to decode"
+    )
+    parser.add_argument(
+        "--zone", default="America/New_York", help="IANA time zone scenario"
+    )
+    args = parser.parse_args()
+
+    timestamps = synthetic_timestamps(args.count)
+    fixed = LocalTime(legacy.DEFAULT_TIME_ZONE)
+    for timestamp in timestamps[:10000]:
+        if legacy.parse_record_time("startTimestamp", timestamp, fixed) != (
+            previous_chain(timestamp)
+        ):
+            sys.exit(f"The decoded time of {timestamp} differs from the chain.")
+
+    zone = LocalTime(args.zone)
+    scenarios = {
+        "previous chain (UTC-5)": previous_chain,
+        "decoder, UTC-5": lambda value: legacy.parse_record_time(
+            "startTimestamp", value, fixed
+        ),
+        f"decoder, {args.zone}": lambda value: legacy.parse_record_time(
+            "startTimestamp", value, zone
+        ),
+        "decoder, record offset": lambda value: legacy.parse_record_time(
+            "startTimestamp", value, zone, 60
+        ),
+    }
+    results = {
+        name: time_decoder(decode, timestamps) for name, decode in scenarios.items()
+    }
+    reference = next(iter(results.values()))
+    print(f"{'scenario':<30} {'timestamps/s':>13} {'speed-up':>9}")
+    for name, rate in results.items():
+        print(f"{name:<30} {rate:>13,.0f} {rate / reference:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
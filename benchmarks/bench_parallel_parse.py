@@ -0,0 +1,150 @@
+"""Benchmark parsing a large Timeline export serially and in worker processes.
+
+A synthetic export of alternating visits and timelinePath segments is written
+to a temporary file and parsed with columnar.parse_timeline_columns at each
+worker count. The time the parent process spends finding the segment byte
+ranges and stacking the tables of the workers is reported too: it is the
+serial share that bounds the speedup on any number of CPUs. Usage:
+
+    python benchmarks/bench_parallel_parse.py [--count N] [--workers 1 2 4]
+"""
+
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np  # noqa: E402
+
+from gtlparser import columnar  # noqa: E402
+
+
+def timestamp(moment):
+    """Format a datetime the way Timeline exports do."""
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000-05:00")
+
+
+def latlng(rng):
+    """Get a random "lat°, lng°" string around Knoxville."""
+    return f"{rng.uniform(35.8, 36.1):.7f}°, {rng.uniform(-84.2, -83.7):.7f}°"
+
+
+def synthetic_segments(count, seed=0):
+    """
+    Generate alternating visit and timelinePath segments.
+
+    Args:
+        count (int): Number of segments.
+        seed (int): Random seed.
+
+    Yields:
+        dict: The segments, in startTime order.
+    """
+    rng = random.Random(seed)
+    moment = datetime.datetime(2016, 1, 1, 8)
+    for i in range(count):
+        end = moment + datetime.timedelta(minutes=rng.randrange(10, 120))
+        segment = {"startTime": timestamp(moment), "endTime": timestamp(end)}
+        if i % 2:
+            segment["timelinePath"] = [
+                {
+                    "point": latlng(rng),
+                    "time": timestamp(moment + datetime.timedelta(minutes=j)),
+                }
+                for j in range(rng.randrange(2, 20))
+            ]
+        else:
+            segment["startTimeTimezoneUtcOffsetMinutes"] = -300
+            segment["endTimeTimezoneUtcOffsetMinutes"] = -300
+            segment["visit"] = {
+                "hierarchyLevel": 0,
+                "probability": 0.9,
+                "topCandidate": {
+                    "placeId": f"place{rng.randrange(1000)}",
+                    "semanticType": "UNKNOWN",
+                    "probability": 0.8,
+                    "placeLocation": {"latLng": latlng(rng)},
+                },
+            }
+        yield segment
+        moment = end
+
+
+def write_export(file_path, count):
+    """Write a synthetic export of count segments, indented like Google's."""
+    with open(file_path, "w", encoding="utf8") as f:
+        json.dump(
+            {"semanticSegments": list(synthetic_segments(count))},
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+
+
+def tables_equal(first, second):
+    """Check that two (VisitColumns, PathColumns) results hold the same columns."""
+    return all(
+        np.array_equal(getattr(a, field), getattr(b, field))
+        for a, b in zip(first, second)
+        for field in a.fields
+    )
+
+
+def parent_share(file_path, tables):
+    """Time the serial steps of a parallel parse in the parent process."""
+    start = time.perf_counter()
+    ranges = columnar.find_segment_ranges(file_path)
+    scan = time.perf_counter() - start
+    parts = [
+        [
+            table.select(rows)
+            for rows in np.array_split(np.arange(len(table)), len(ranges))
+        ]
+        for table in tables
+    ]
+    start = time.perf_counter()
+    columnar.VisitColumns.concat(parts[0])
+    columnar.PathColumns.concat(parts[1])
+    stack = time.perf_counter() - start
+    return len(ranges), scan, stack
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--count", type=int, default=160000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "timeline.json")
+        write_export(file_path, args.count)
+        size = os.path.getsize(file_path) / 1e6
+        print(f"{args.count} segments, {size:.0f} MB, {os.cpu_count()} CPUs")
+        start = time.perf_counter()
+        expected = columnar.parse_timeline_columns(file_path)
+        serial = time.perf_counter() - start
+        print(f"serial: {serial:.2f} s")
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = columnar.parse_timeline_columns(file_path, workers=workers)
+            seconds = time.perf_counter() - start
+            if not tables_equal(result, expected):
+                raise AssertionError(f"workers={workers} changed the tables")
+            print(f"workers={workers}: {seconds:.2f} s ({serial / seconds:.2f}x)")
+        chunks, scan, stack = parent_share(file_path, expected)
+        share = (scan + stack) / serial
+        print(
+            f"parent: {scan:.2f} s to split the export into {chunks} ranges, "
+            f"{stack:.2f} s to stack the tables; "
+            f"speedup bound {1 / share:.1f}x on any number of CPUs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,11 @@ import datetime
 import json
 import os
 from os.path import join as osjoin, splitext
-from osgeo import ogr
-from osgeo.ogr import Feature, FieldDefn, Geometry, GetDriverByName, wkbPoint
-from osgeo.osr import SpatialReference
+import numpy as np
 from geojson import Point, LineString, Feature, FeatureCollection, dump
 
+from gtlparser.decoders import LocalTime, decode_e7, decode_timestamps, parse_timestamp
+
 
 def make_reader(in_json):
     # Open location history data
@@ -15,257 +15,741 @@ def make_reader(in_json):
     return json_data
 
 
-# Get value (either placeVisit or activitySegment) from input json
-def create_point_file(input_json, output_folder, output_name):
-    point_features = []
-    failed_features = []
-    for item in input_json["timelineObjects"]:
-        try:
-            if list(item.keys())[0] == "placeVisit":
-                placeVisit = item
-                point_output = parse_placeVisit_items(placeVisit)
-                try:
-                    point = Point(
-                        (point_output["centerLngE7"], point_output["centerLatE7"])
-                    )
-                except:
-                    point = Point(
-                        (point_output["longitudeE7"], point_output["latitudeE7"])
-                    )
-                point_features.append(Feature(geometry=point, properties=point_output))
-        except:
-            failed_features.append(item)
-    feature_collection_point = FeatureCollection(point_features)
-
-    with open(f"{output_folder}/point_{output_name}.geojson", "w") as f:
-        dump(feature_collection_point, f)
-    with open(f"{output_folder}/failed_point_{output_name}.geojson", "w") as f:
-        json.dump(failed_features, f)
-
-
-def create_line_file(input_json, output_folder, output_name):
-    line_features = []
-    failed_features = []
-    for item in input_json["timelineObjects"]:
+MONTHS = (
+    "JANUARY",
+    "FEBRUARY",
+    "MARCH",
+    "APRIL",
+    "MAY",
+    "JUNE",
+    "JULY",
+    "AUGUST",
+    "SEPTEMBER",
+    "OCTOBER",
+    "NOVEMBER",
+    "DECEMBER",
+)
+
+
+# Order monthly files (e.g. 2023/2023_NOVEMBER.json) by year and month
+def _month_sort_key(file_path):
+    name = splitext(os.path.basename(file_path))[0].upper()
+    month = name.rsplit("_", 1)[-1]
+    return (
+        os.path.dirname(file_path),
+        MONTHS.index(month) if month in MONTHS else len(MONTHS),
+        name,
+    )
+
+
+# List the JSON files of a Semantic Location History tree, or the file itself
+def find_legacy_files(in_path):
+    if not os.path.isdir(in_path):
+        return [in_path]
+    files = [
+        osjoin(folder, name)
+        for folder, _, names in os.walk(in_path)
+        for name in names
+        if name.lower().endswith(".json")
+    ]
+    return sorted(files, key=_month_sort_key)
+
+
+# Stream the timelineObjects of a file or a whole Semantic Location History
+# tree, keeping the file, index in the file and read offset of the last object
+# so that failures can be traced back to the input. The read offset is the
+# position of the parser in the file: the object ends before it, at most one
+# read buffer earlier. predicate, when given, keeps only the objects it
+# returns True for.
+class TimelineObjectReader:
+    def __init__(self, in_path, predicate=None):
+        self.in_path = in_path
+        self.predicate = predicate
+        self.file_path = None
+        self.index = None
+        self.offset = None
+
+    def __iter__(self):
+        import ijson
+
+        for file_path in find_legacy_files(self.in_path):
+            self.file_path = file_path
+            with open(file_path, "rb") as f:
+                items = ijson.items(f, "timelineObjects.item", use_float=True)
+                for self.index, item in enumerate(items):
+                    self.offset = f.tell()
+                    if self.predicate is None or self.predicate(item):
+                        yield item
+
+    # Position of the last object read
+    def position(self):
+        return {"file": self.file_path, "index": self.index, "offset": self.offset}
+
+
+def iter_timeline_objects(in_path):
+    return iter(TimelineObjectReader(in_path))
+
+
+# Streams the failures of a layer to a JSON Lines file: one record per failed
+# object with its position in the input, the exception type and message, and
+# the start of the raw object as a sample, then a summary line with the
+# number of failures per exception type. Only the first max_errors failures
+# are recorded and only counted after that, so a corrupted or schema-drifted
+# archive cannot fill memory or disk.
+class ErrorSink:
+    def __init__(self, file_path, max_errors=1000, sample_size=200):
+        self.file_path = file_path
+        self.max_errors = max_errors
+        self.sample_size = sample_size
+        self.count = 0
+        self.counts = {}
+        self._file = open(file_path, "w")
+
+    def add(self, item, error, position=None):
+        error_type = type(error).__name__
+        self.counts[error_type] = self.counts.get(error_type, 0) + 1
+        self.count += 1
+        if self.max_errors is not None and self.count > self.max_errors:
+            return
+        record = dict(position or {})
+        record["type"] = error_type
+        record["message"] = str(error)
+        if self.sample_size:
+            record["sample"] = json.dumps(item, default=str)[: self.sample_size]
+        self._file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        if self._file.closed:
+            return
+        recorded = self.count
+        if self.max_errors is not None:
+            recorded = min(recorded, self.max_errors)
+        summary = {"failed": self.count, "recorded": recorded, "types": self.counts}
+        self._file.write(json.dumps({"summary": summary}) + "\n")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Read the failure records and summary of a failed_ file
+def read_failures(file_path):
+    with open(file_path) as f:
+        records = [json.loads(line) for line in f]
+    if records and "summary" in records[-1]:
+        return records[:-1], records[-1]["summary"]
+    return records, None
+
+
+def build_point_feature(placeVisit, time_zone=None):
+    point_output = parse_placeVisit_items(placeVisit, time_zone)
+    if "centerLngE7" in point_output and "centerLatE7" in point_output:
+        point = Point((point_output["centerLngE7"], point_output["centerLatE7"]))
+    else:
+        point = Point((point_output["longitudeE7"], point_output["latitudeE7"]))
+    return Feature(geometry=point, properties=point_output)
+
+
+def build_line_feature(activitySegment, time_zone=None):
+    line_output = parse_activitySegment_items(activitySegment, time_zone)
+    line = LineString(line_output["waypoints"])
+    return Feature(geometry=line, properties=line_output)
+
+
+# Decode the points of a simplifiedRawPath into (lon, lat, epoch ms) arrays;
+# the time array is empty when the points have no timestamps
+def decode_raw_path(simplifiedRawPath):
+    points = simplifiedRawPath.get("points") or []
+    lon, lat = decode_e7(points)
+    if points and "timestamp" in points[0]:
+        epoch_ms = decode_timestamps([point["timestamp"] for point in points])[0]
+    elif points and "timestampMs" in points[0]:
+        epoch_ms = np.array([int(point["timestampMs"]) for point in points])
+    else:
+        epoch_ms = np.empty(0, dtype=np.int64)
+    return lon, lat, epoch_ms
+
+
+# LineString of the simplifiedRawPath of an activitySegment, or None when it
+# has fewer than two points
+def build_raw_path_feature(activitySegment, time_zone=None):
+    subset_activitySegment = activitySegment.get("activitySegment")
+    simplifiedRawPath = subset_activitySegment.get("simplifiedRawPath")
+    if not simplifiedRawPath:
+        return None
+    lon, lat, epoch_ms = decode_raw_path(simplifiedRawPath)
+    if len(lon) < 2:
+        return None
+    raw_output = {
+        key: value for key, value in simplifiedRawPath.items() if key != "points"
+    }
+    raw_output["activityType"] = subset_activitySegment.get("activityType")
+    raw_output["pointCount"] = len(lon)
+    if len(epoch_ms):
+        local_time = get_local_time(time_zone)
+        for prefix, value in (("start", epoch_ms.min()), ("end", epoch_ms.max())):
+            (
+                raw_output[prefix + "TimestamprecordDate"],
+                raw_output[prefix + "TimestamprecordTime"],
+            ) = local_time.date_time(int(value))
+    line = LineString(list(zip(lon.tolist(), lat.tolist())))
+    return Feature(geometry=line, properties=raw_output)
+
+
+# Builder and layer (True for points) of each timelineObjects key
+FEATURE_BUILDERS = {
+    "placeVisit": (build_point_feature, True),
+    "activitySegment": (build_line_feature, False),
+}
+
+
+# Layer key and file prefix of the optional raw path layer
+RAW_PATH = "rawpath"
+LAYER_PREFIXES = {True: "point", False: "line", RAW_PATH: "rawpath"}
+
+
+# Dispatch each object once, on its first key, to the point or line builder.
+# Yields (flag_point, feature, failure) with failure None or the (item,
+# exception, index in timeline_objects) of an object that failed; flag_point
+# is None for objects that fit neither layer, and RAW_PATH for the raw paths
+# of the activitySegments when raw_paths is set. layers, when given, holds
+# the flag_point of the layers to build; objects of the other layers are
+# skipped before they are parsed.
+def iter_features(timeline_objects, time_zone=None, raw_paths=False, layers=None):
+    local_time = get_local_time(time_zone)
+    for index, item in enumerate(timeline_objects):
+        if not isinstance(item, dict) or not item:
+            error = TypeError("timelineObjects entry is not a non-empty object")
+            yield None, None, (item, error, index)
+            continue
+        builder = FEATURE_BUILDERS.get(next(iter(item)))
+        if builder is None:
+            continue
+        build, flag_point = builder
+        if layers is not None and flag_point not in layers:
+            continue
         try:
-            if list(item.keys())[0] == "activitySegment":
-                activitySegment = item
-                line_output = parse_activitySegment_items(activitySegment)
-                line = LineString(line_output["waypoints"])
-                line_features.append(Feature(geometry=line, properties=line_output))
-        except:
-            failed_features.append(item)
-    feature_collection_line = FeatureCollection(line_features)
+            feature = build(item, local_time)
+        except Exception as e:
+            yield flag_point, None, (item, e, index)
+            continue
+        yield flag_point, feature, None
+        if raw_paths and not flag_point:
+            try:
+                feature = build_raw_path_feature(item, local_time)
+            except Exception as e:
+                yield RAW_PATH, None, (item, e, index)
+                continue
+            if feature is not None:
+                yield RAW_PATH, feature, None
+
+
+# Get value (either placeVisit or activitySegment) from input json
+def create_point_file(
+    input_json, output_folder, output_name, out_format="geojson", time_zone=None
+):
+    return _create_layer_file(
+        input_json, output_folder, output_name, True, out_format, time_zone
+    )
+
+
+def create_line_file(
+    input_json, output_folder, output_name, out_format="geojson", time_zone=None
+):
+    return _create_layer_file(
+        input_json, output_folder, output_name, False, out_format, time_zone
+    )
+
+
+def _create_layer_file(
+    input_json, output_folder, output_name, flag_point, out_format, time_zone=None
+):
+    features = []
+    timeline_objects = input_json["timelineObjects"]
+    with create_error_sink(output_folder, output_name, flag_point) as errors:
+        for _, feature, failure in iter_features(
+            timeline_objects, time_zone, layers=(flag_point,)
+        ):
+            if failure is not None:
+                item, error, index = failure
+                errors.add(item, error, {"index": index})
+            else:
+                features.append(feature)
+    write_feature_collection(
+        FeatureCollection(features), output_folder, output_name, flag_point, out_format
+    )
+    return len(features)
+
+
+# Error sink of the failed_point_, failed_line_ or failed_rawpath_ file
+def create_error_sink(
+    output_folder, output_name, flag_point, max_errors=1000, sample_size=200
+):
+    prefix = "failed_" + LAYER_PREFIXES[flag_point]
+    return ErrorSink(
+        f"{output_folder}/{prefix}_{output_name}.jsonl", max_errors, sample_size
+    )
+
+
+# Build the point and line layers in one walk of the timelineObjects. GeoJSON
+# and GeoJSONSeq outputs are written while walking, so a whole Semantic
+# Location History tree streams through with constant memory. With raw_paths
+# the simplifiedRawPath of the activitySegments is also written to a rawpath_
+# layer, and the counts are (points, lines, raw paths). Failures are streamed
+# to one failed_ JSON Lines file per layer, at most max_errors records each,
+# with samples of sample_size characters of the objects (0 for none).
+def create_layer_files(
+    timeline_objects,
+    output_folder,
+    output_name,
+    out_format="geojson",
+    line_name=None,
+    time_zone=None,
+    raw_paths=False,
+    max_errors=1000,
+    sample_size=200,
+):
+    from gtlparser.gtl2geojson import GEOJSON_DRIVERS, FeatureWriter
+
+    keys = (True, False, RAW_PATH) if raw_paths else (True, False)
+    names = {
+        key: output_name if key is True else line_name or output_name for key in keys
+    }
+    if isinstance(timeline_objects, dict):
+        timeline_objects = timeline_objects["timelineObjects"]
+    # Readers know the file and offset of the object being converted
+    position = getattr(timeline_objects, "position", None)
+    errors = {
+        key: create_error_sink(output_folder, names[key], key, max_errors, sample_size)
+        for key in keys
+    }
+    if out_format in ("geojson", "geojsonseq"):
+        driver = "GeoJSONSeq" if out_format == "geojsonseq" else "GeoJSON"
+        layers = {
+            key: FeatureWriter(
+                f"{output_folder}/{LAYER_PREFIXES[key]}_{names[key]}"
+                f"{GEOJSON_DRIVERS[driver]}",
+                driver,
+            )
+            for key in keys
+        }
+    else:
+        layers = {key: [] for key in keys}
+    try:
+        for flag_point, feature, failure in iter_features(
+            timeline_objects, time_zone, raw_paths
+        ):
+            if failure is not None:
+                item, error, index = failure
+                where = position() if position else {"index": index}
+                # Objects without a key used to fail both passes
+                for flag in (True, False) if flag_point is None else (flag_point,):
+                    errors[flag].add(item, error, where)
+            elif isinstance(layers[flag_point], list):
+                layers[flag_point].append(feature)
+            else:
+                layers[flag_point].write(feature)
+    finally:
+        for layer in layers.values():
+            if not isinstance(layer, list):
+                layer.close()
+        for sink in errors.values():
+            sink.close()
+    counts = []
+    for flag_point in keys:
+        layer = layers[flag_point]
+        if isinstance(layer, list):
+            write_feature_collection(
+                FeatureCollection(layer),
+                output_folder,
+                names[flag_point],
+                flag_point,
+                out_format,
+            )
+            counts.append(len(layer))
+        else:
+            counts.append(layer.count)
+    return tuple(counts)
 
-    with open(f"{output_folder}/line_{output_name}.geojson", "w") as f:
-        dump(feature_collection_line, f)
-    with open(f"{output_folder}/failed_line_{output_name}.geojson", "w") as f:
-        json.dump(failed_features, f)
+
+# Write the point/line layer as GeoJSON, GeoJSONSeq, GeoParquet or FlatGeobuf
+def write_feature_collection(
+    feature_collection, output_folder, output_name, flag_point, out_format="geojson"
+):
+    if out_format == "geojson":
+        prefix = LAYER_PREFIXES[flag_point]
+        with open(f"{output_folder}/{prefix}_{output_name}.geojson", "w") as f:
+            dump(feature_collection, f)
+    elif out_format == "geojsonseq":
+        from gtlparser.gtl2geojson import create_geojson_file
+
+        create_geojson_file(
+            output_folder, output_name, feature_collection, flag_point, "GeoJSONSeq"
+        )
+    else:
+        from gtlparser.export import create_export_file
+
+        create_export_file(
+            output_folder,
+            output_name,
+            feature_collection,
+            flag_point,
+            out_format,
+            prefix=LAYER_PREFIXES[flag_point],
+        )
 
 
 # -------------------------------------
+# Field mapping specs of the placeVisit and activitySegment flattening. Each
+# spec maps a key of an input object to the action writing it to the flat
+# properties dict:
+#   ("copy",)              properties[key] = value
+#   ("skip",)              drop the key
+#   ("rename", name)       properties[name] = value
+#   ("coordinate", name)   properties[name] = value / 1e7
+#   ("prepend", name)      properties[name] = value + " " + properties[name]
+#   ("source_info", p)     properties["p_sourceInfo"] = sub-key and
+#                          properties["p_<sub-key>"] = sub-value (no prefix
+#                          when p is None)
+#   ("duration",)          properties[<sub-key>recordDate/recordTime] of
+#                          every timestamp, as local date and time
+#   ("timestamp", name)    properties[name] = "%Y-%m-%d %H:%M:%S" timestamp
+#   ("waypoints", name)    properties[name] = [(lng, lat), ...]
+#   ("raw_path", name)     properties["name_<sub-key>"] = sub-value, with
+#                          the points replaced by name_pointCount
+#   ("parking_location",)  parkingEvent_point and parkingEvent_accuracyMetres
+#   ("nested", spec)       flatten the value (a dict) with spec
+#   ("first", spec)        flatten the first item of the value with spec
+# The "*" key holds the action of the keys a spec does not list (copy when
+# missing). Specs are compiled once into dicts of handlers, so flattening an
+# object is a dict lookup and a call per key. Handlers also get the context of
+# the record: (LocalTime of the recordDate/recordTime fields, the record).
+
+LOCATION_SPEC = {
+    "latitudeE7": ("coordinate", "latitudeE7"),
+    "longitudeE7": ("coordinate", "longitudeE7"),
+    "sourceInfo": ("source_info", None),
+}
+
+# The name of a child visit is prepended to the name of its parent
+CHILD_LOCATION_SPEC = dict(LOCATION_SPEC, name=("prepend", "name"))
+
+CHILD_VISIT_SPEC = {
+    "location": ("nested", CHILD_LOCATION_SPEC),
+    "duration": ("duration",),
+    "otherCandidateLocations": ("rename", "otherCandidateFields"),
+}
+
+PLACE_VISIT_SPEC = {
+    "location": ("nested", LOCATION_SPEC),
+    "childVisits": ("first", CHILD_VISIT_SPEC),
+    "duration": ("duration",),
+    "otherCandidateLocations": ("rename", "otherCandidateFields"),
+    "centerLatE7": ("coordinate", "centerLatE7"),
+    "centerLngE7": ("coordinate", "centerLngE7"),
+}
+
+START_LOCATION_SPEC = {
+    "latitudeE7": ("coordinate", "start_latitudeE7"),
+    "longitudeE7": ("coordinate", "start_longitudeE7"),
+    "sourceInfo": ("source_info", "start"),
+    "*": ("skip",),
+}
+
+END_LOCATION_SPEC = {
+    "latitudeE7": ("coordinate", "end_latitudeE7"),
+    "longitudeE7": ("coordinate", "end_longitudeE7"),
+    "sourceInfo": ("source_info", "end"),
+    "*": ("skip",),
+}
+
+WAYPOINT_PATH_SPEC = {
+    "waypoints": ("waypoints", "waypoints"),
+    "roadSegment": ("skip",),
+    "confidence": ("rename", "travelMode_confidence"),
+}
+
+PARKING_EVENT_SPEC = {
+    "location": ("parking_location",),
+    "method": ("rename", "parkingEvent_method"),
+    "locationSource": ("rename", "parkingEvent_locationSource"),
+    "timestamp": ("timestamp", "parkingEvent_timestamp"),
+    "*": ("skip",),
+}
+
+ACTIVITY_SEGMENT_SPEC = {
+    "startLocation": ("nested", START_LOCATION_SPEC),
+    "endLocation": ("nested", END_LOCATION_SPEC),
+    "duration": ("duration",),
+    "waypointPath": ("nested", WAYPOINT_PATH_SPEC),
+    "simplifiedRawPath": ("raw_path", "simplifiedRawPath"),
+    "parkingEvent": ("nested", PARKING_EVENT_SPEC),
+}
 
 
 def parse_coordinate(inputCoordinate):
     return inputCoordinate / 10000000
 
 
-def parse_sourceInfo(inputDict, temp_allFields_dict, withPrefix=False, prefix="start"):
-    if withPrefix == 0:
-        for subfield in inputDict:
-            temp_allFields_dict["sourceInfo"] = subfield
-            temp_allFields_dict[subfield] = inputDict.get(subfield)
+# The recordDate/recordTime fields have always been written in US Eastern
+# Standard Time (UTC-5); pass time_zone (an IANA name or UTC offset minutes)
+# to the parsers to write them in another zone. Records with their own
+# <start|end>TimeTimezoneUtcOffsetMinutes are written in that offset.
+DEFAULT_TIME_ZONE = -300
+DEFAULT_LOCAL_TIME = LocalTime(DEFAULT_TIME_ZONE)
+
+
+def get_local_time(time_zone=None):
+    if time_zone is None:
+        return DEFAULT_LOCAL_TIME
+    if isinstance(time_zone, LocalTime):
+        return time_zone
+    return LocalTime(time_zone)
+
+
+# Local "YYYY-MM-DD" date and "HH:MM:SS" time of a startTimestamp/endTimestamp
+# (ISO 8601) or startTimestampMs/endTimestampMs (epoch milliseconds) value
+def parse_record_time(key, timestamp, local_time=DEFAULT_LOCAL_TIME, offset=None):
+    if key.endswith("Ms"):
+        epoch_ms = int(timestamp)
     else:
-        for subfield in inputDict:
-            temp_allFields_dict[f"{prefix}_sourceInfo"] = subfield
-            temp_allFields_dict[f"{prefix}_" + subfield] = inputDict.get(subfield)
+        epoch_ms = parse_timestamp(timestamp)[0]
+    return local_time.date_time(epoch_ms, offset)
 
 
-# -------------------------------------
+# Handler factories of the spec actions. A handler writes one input key and
+# value to the flat properties dict: handler(properties, key, value).
 
 
-def parse_placeVisit_items(placeVisit):
-    # Get values (dict) from input placeVisit
-    subset_placeVisit = placeVisit.get("placeVisit")
-    # Create temporary dict
-    temp_allFields_dict = {}
-    # Get values (aggregated fields) from input
-    for aggregatedFields in subset_placeVisit:
-        if aggregatedFields == "location":
-            parse_placeVisit_location(
-                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "childVisits":
-            parse_placeVisit_childVisits(
-                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "duration":
-            parse_placeVisit_duration(
-                subset_placeVisit.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "otherCandidateLocations":
-            parse_placeVisit_location(
-                subset_placeVisit.get(aggregatedFields),
-                temp_allFields_dict,
-                otherCandidateLocation=True,
-            )
-        elif aggregatedFields == "centerLatE7" or aggregatedFields == "centerLngE7":
-            temp_allFields_dict[aggregatedFields] = parse_coordinate(
-                subset_placeVisit.get(aggregatedFields)
-            )
-        else:
-            temp_allFields_dict[aggregatedFields] = subset_placeVisit.get(
-                aggregatedFields
+_OFFSET_SUFFIX = "TimeTimezoneUtcOffsetMinutes"
+
+
+def _copy_handler():
+    def handler(out, key, value, context):
+        out[key] = value
+
+    return handler
+
+
+def _skip_handler():
+    def handler(out, key, value, context):
+        pass
+
+    return handler
+
+
+def _rename_handler(name):
+    def handler(out, key, value, context):
+        out[name] = value
+
+    return handler
+
+
+def _coordinate_handler(name):
+    def handler(out, key, value, context):
+        out[name] = value / 10000000
+
+    return handler
+
+
+def _prepend_handler(name):
+    def handler(out, key, value, context):
+        out[name] = value + " " + out[name]
+
+    return handler
+
+
+def _source_info_handler(prefix):
+    info_key = f"{prefix}_sourceInfo" if prefix else "sourceInfo"
+    sub_prefix = f"{prefix}_" if prefix else ""
+
+    def handler(out, key, value, context):
+        for subfield, subvalue in value.items():
+            out[info_key] = subfield
+            out[sub_prefix + subfield] = subvalue
+
+    return handler
+
+
+def _duration_handler():
+    def handler(out, key, value, context):
+        local_time, record = context
+        for subfield, timestamp in value.items():
+            if subfield.endswith(_OFFSET_SUFFIX):
+                continue
+            offset_key = subfield.split("Timestamp")[0] + _OFFSET_SUFFIX
+            offset = value.get(offset_key, record.get(offset_key))
+            out[subfield + "recordDate"], out[subfield + "recordTime"] = (
+                parse_record_time(subfield, timestamp, local_time, offset)
             )
+
+    return handler
+
+
+def _timestamp_handler(name):
+    def handler(out, key, value, context):
+        out[name] = datetime.datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+    return handler
+
+
+def _waypoints_handler(name):
+    def handler(out, key, value, context):
+        out[name] = [
+            (point["lngE7"] / 10000000, point["latE7"] / 10000000) for point in value
+        ]
+
+    return handler
+
+
+def _raw_path_handler(name):
+    def handler(out, key, value, context):
+        for subfield, subvalue in value.items():
+            if subfield == "points":
+                out[name + "_pointCount"] = len(subvalue)
+            else:
+                out[f"{name}_{subfield}"] = subvalue
+
+    return handler
+
+
+def _parking_location_handler():
+    def handler(out, key, value, context):
+        out["parkingEvent_point"] = (
+            value["longitudeE7"] / 10000000,
+            value["latitudeE7"] / 10000000,
+        )
+        out["parkingEvent_accuracyMetres"] = value["accuracyMetres"]
+
+    return handler
+
+
+def _nested_handler(spec):
+    handlers, default = compile_spec(spec)
+
+    def handler(out, key, value, context):
+        for subfield, subvalue in value.items():
+            handlers.get(subfield, default)(out, subfield, subvalue, context)
+
+    return handler
+
+
+def _first_handler(spec):
+    nested = _nested_handler(spec)
+
+    def handler(out, key, value, context):
+        nested(out, key, value[0], context)
+
+    return handler
+
+
+SPEC_ACTIONS = {
+    "copy": _copy_handler,
+    "skip": _skip_handler,
+    "rename": _rename_handler,
+    "coordinate": _coordinate_handler,
+    "prepend": _prepend_handler,
+    "source_info": _source_info_handler,
+    "duration": _duration_handler,
+    "timestamp": _timestamp_handler,
+    "waypoints": _waypoints_handler,
+    "raw_path": _raw_path_handler,
+    "parking_location": _parking_location_handler,
+    "nested": _nested_handler,
+    "first": _first_handler,
+}
+
+
+# Compile a field mapping spec to ({key: handler}, default handler)
+def compile_spec(spec):
+    def build(action):
+        name, *args = action
+        return SPEC_ACTIONS[name](*args)
+
+    handlers = {key: build(action) for key, action in spec.items() if key != "*"}
+    return handlers, build(spec.get("*", ("copy",)))
+
+
+# Flatten an object into a new properties dict with a compiled spec
+def flatten(compiled, inputDict, temp_allFields_dict=None, context=None):
+    handlers, default = compiled
+    if temp_allFields_dict is None:
+        temp_allFields_dict = {}
+    if context is None:
+        context = (DEFAULT_LOCAL_TIME, inputDict)
+    for key, value in inputDict.items():
+        handlers.get(key, default)(temp_allFields_dict, key, value, context)
     return temp_allFields_dict
 
 
+_PLACE_VISIT = compile_spec(PLACE_VISIT_SPEC)
+_LOCATION = compile_spec(LOCATION_SPEC)
+_CHILD_LOCATION = compile_spec(CHILD_LOCATION_SPEC)
+_CHILD_VISIT = compile_spec(CHILD_VISIT_SPEC)
+_ACTIVITY_SEGMENT = compile_spec(ACTIVITY_SEGMENT_SPEC)
+_START_LOCATION = compile_spec(START_LOCATION_SPEC)
+_END_LOCATION = compile_spec(END_LOCATION_SPEC)
+_WAYPOINT_PATH = compile_spec(WAYPOINT_PATH_SPEC)
+_PARKING_EVENT = compile_spec(PARKING_EVENT_SPEC)
+
+
+def parse_sourceInfo(inputDict, temp_allFields_dict, withPrefix=False, prefix="start"):
+    _source_info_handler(prefix if withPrefix else None)(
+        temp_allFields_dict, "sourceInfo", inputDict, None
+    )
+
+
+# -------------------------------------
+
+
+def parse_placeVisit_items(placeVisit, time_zone=None):
+    subset_placeVisit = placeVisit.get("placeVisit")
+    context = (get_local_time(time_zone), subset_placeVisit)
+    return flatten(_PLACE_VISIT, subset_placeVisit, context=context)
+
+
 def parse_placeVisit_location(
     inputDict, temp_allFields_dict, otherCandidateLocation=False, childVisit=False
 ):
-    if otherCandidateLocation == 0:
-        for subfield in inputDict:
-            if subfield == "latitudeE7" or subfield == "longitudeE7":
-                temp_allFields_dict[subfield] = parse_coordinate(
-                    inputDict.get(subfield)
-                )
-            elif subfield == "name":
-                if childVisit:
-                    temp_allFields_dict[subfield] = (
-                        inputDict.get(subfield) + " " + temp_allFields_dict[subfield]
-                    )
-                else:
-                    temp_allFields_dict[subfield] = inputDict.get(subfield)
-            elif subfield == "sourceInfo":
-                sourceInfo_dict = inputDict.get(subfield)
-                parse_sourceInfo(sourceInfo_dict, temp_allFields_dict)
-            else:
-                temp_allFields_dict[subfield] = inputDict.get(subfield)
-    else:  # to be continue
+    if otherCandidateLocation:
         temp_allFields_dict["otherCandidateFields"] = inputDict
+    else:
+        flatten(
+            _CHILD_LOCATION if childVisit else _LOCATION, inputDict, temp_allFields_dict
+        )
 
 
 def parse_placeVisit_childVisits(inputList, temp_allFields_dict):
-    childVisitDict = inputList[0]
-    for aggregatedFields in childVisitDict:
-        if aggregatedFields == "location":
-            parse_placeVisit_location(
-                childVisitDict.get(aggregatedFields),
-                temp_allFields_dict,
-                childVisit=True,
-            )
-        elif aggregatedFields == "duration":
-            parse_placeVisit_duration(
-                childVisitDict.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "otherCandidateLocations":
-            parse_placeVisit_location(
-                childVisitDict.get(aggregatedFields),
-                temp_allFields_dict,
-                otherCandidateLocation=True,
-            )
-        else:
-            temp_allFields_dict[aggregatedFields] = childVisitDict.get(aggregatedFields)
+    flatten(_CHILD_VISIT, inputList[0], temp_allFields_dict)
 
 
-# can customize the time zone
-def parse_placeVisit_duration(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        temp_time_string = datetime.datetime.fromisoformat(
-            inputDict.get(subfield)
-        ).strftime("%Y-%m-%d %H:%M:%S")
-        temp_time = datetime.datetime.strptime(temp_time_string, "%Y-%m-%d %H:%M:%S")
-        ETZ_datetime = temp_time - datetime.timedelta(hours=5)
-        temp_allFields_dict[subfield + "recordDate"] = ETZ_datetime.strftime("%Y-%m-%d")
-        temp_allFields_dict[subfield + "recordTime"] = ETZ_datetime.strftime("%H:%M:%S")
+def parse_placeVisit_duration(inputDict, temp_allFields_dict, time_zone=None):
+    context = (get_local_time(time_zone), inputDict)
+    _duration_handler()(temp_allFields_dict, "duration", inputDict, context)
 
 
 # ----------------------------------------
 
 
-def parse_activitySegment_items(activitySegment):
-    # Get values (dict) from input activitySegment
+def parse_activitySegment_items(activitySegment, time_zone=None):
     subset_activitySegment = activitySegment.get("activitySegment")
-    # Create temporary dict
-    temp_allFields_dict = {}
-    # Get values (aggregated fields) from input
-    for aggregatedFields in subset_activitySegment:
-        if aggregatedFields == "startLocation":
-            parse_activitySegment_startLocation(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "endLocation":
-            parse_activitySegment_endLocation(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "duration":
-            parse_activitySegment_duration(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "activities":
-            parse_activitySegment_activities(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "waypointPath":
-            parse_activitySegment_waypointPath(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "simplifiedRawPath":
-            parse_activitySegment_simplifiedRawPath(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        elif aggregatedFields == "parkingEvent":
-            parse_activitySegment_parkingEvent(
-                subset_activitySegment.get(aggregatedFields), temp_allFields_dict
-            )
-        else:
-            temp_allFields_dict[aggregatedFields] = subset_activitySegment.get(
-                aggregatedFields
-            )
-    return temp_allFields_dict
+    context = (get_local_time(time_zone), subset_activitySegment)
+    return flatten(_ACTIVITY_SEGMENT, subset_activitySegment, context=context)
 
 
 def parse_activitySegment_startLocation(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        if subfield == "latitudeE7":
-            temp_allFields_dict["start_latitudeE7"] = parse_coordinate(
-                inputDict.get(subfield)
-            )
-        elif subfield == "longitudeE7":
-            temp_allFields_dict["start_longitudeE7"] = parse_coordinate(
-                inputDict.get(subfield)
-            )
-        elif subfield == "sourceInfo":
-            sourceInfo_dict = inputDict.get(subfield)
-            parse_sourceInfo(sourceInfo_dict, temp_allFields_dict, withPrefix=True)
+    flatten(_START_LOCATION, inputDict, temp_allFields_dict)
 
 
 def parse_activitySegment_endLocation(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        if subfield == "latitudeE7":
-            temp_allFields_dict["end_latitudeE7"] = parse_coordinate(
-                inputDict.get(subfield)
-            )
-        elif subfield == "longitudeE7":
-            temp_allFields_dict["end_longitudeE7"] = parse_coordinate(
-                inputDict.get(subfield)
-            )
-        elif subfield == "sourceInfo":
-            sourceInfo_dict = inputDict.get(subfield)
-            parse_sourceInfo(
-                sourceInfo_dict, temp_allFields_dict, withPrefix=True, prefix="end"
-            )
+    flatten(_END_LOCATION, inputDict, temp_allFields_dict)
 
 
-def parse_activitySegment_duration(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        temp_time_string = datetime.datetime.fromisoformat(
-            inputDict.get(subfield)
-        ).strftime("%Y-%m-%d %H:%M:%S")
-        temp_time = datetime.datetime.strptime(temp_time_string, "%Y-%m-%d %H:%M:%S")
-        ETZ_datetime = temp_time - datetime.timedelta(hours=5)
-        temp_allFields_dict[subfield + "recordDate"] = ETZ_datetime.strftime("%Y-%m-%d")
-        temp_allFields_dict[subfield + "recordTime"] = ETZ_datetime.strftime("%H:%M:%S")
+def parse_activitySegment_duration(inputDict, temp_allFields_dict, time_zone=None):
+    parse_placeVisit_duration(inputDict, temp_allFields_dict, time_zone)
 
 
 def parse_activitySegment_activities(inputDict, temp_allFields_dict):
@@ -273,56 +757,23 @@ def parse_activitySegment_activities(inputDict, temp_allFields_dict):
 
 
 def parse_activitySegment_waypointPath(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        if subfield == "waypoints":
-            temp_allFields_dict["waypoints"] = parse_activitySegment_waypoints(
-                inputDict.get(subfield), temp_allFields_dict
-            )
-        elif subfield == "roadSegment":
-            continue
-        elif subfield == "confidence":
-            temp_allFields_dict["travelMode_confidence"] = inputDict.get(subfield)
-        else:
-            temp_allFields_dict[subfield] = inputDict.get(subfield)
+    flatten(_WAYPOINT_PATH, inputDict, temp_allFields_dict)
 
 
 def parse_activitySegment_waypoints(inputDict, temp_allFields_dict):
-    temp_points_list = []
-    for point_dict in inputDict:
-        temp_points_list.append(
-            (
-                parse_coordinate(point_dict["lngE7"]),
-                parse_coordinate(point_dict["latE7"]),
-            )
-        )
-    return temp_points_list
+    temp_points = {}
+    _waypoints_handler("waypoints")(temp_points, "waypoints", inputDict, None)
+    return temp_points["waypoints"]
 
 
 def parse_activitySegment_simplifiedRawPath(inputDict, temp_allFields_dict):
-    temp_allFields_dict["simplifiedRawPath"] = inputDict
+    _raw_path_handler("simplifiedRawPath")(
+        temp_allFields_dict, "simplifiedRawPath", inputDict, None
+    )
 
 
 def parse_activitySegment_parkingEvent(inputDict, temp_allFields_dict):
-    for subfield in inputDict:
-        if subfield == "location":
-            subDict = inputDict.get(subfield)
-            temp_allFields_dict["parkingEvent_point"] = (
-                parse_coordinate(subDict["longitudeE7"]),
-                parse_coordinate(subDict["latitudeE7"]),
-            )
-            temp_allFields_dict["parkingEvent_accuracyMetres"] = subDict[
-                "accuracyMetres"
-            ]
-        elif subfield == "method":
-            temp_allFields_dict["parkingEvent_method"] = inputDict.get(subfield)
-        elif subfield == "locationSource":
-            temp_allFields_dict["parkingEvent_locationSource"] = inputDict.get(subfield)
-        elif subfield == "timestamp":
-            temp_allFields_dict["parkingEvent_timestamp"] = (
-                datetime.datetime.fromisoformat(inputDict.get(subfield)).strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
-            )
+    flatten(_PARKING_EVENT, inputDict, temp_allFields_dict)
 
 
 # ----------------------------------------
@@ -334,22 +785,52 @@ def init_parser():
     parser.add_argument(
         "location_history_file",
         type=str,
-        help="Path to location history file to analyze.",
+        help="Path to location history file to analyze, or to a "
+        "Semantic Location History folder of monthly files.",
     )
     parser.add_argument(
         "output_location", type=str, help="Path to folder to write output"
     )
     parser.add_argument("output_name_point", type=str, help="Name of output Point file")
     parser.add_argument("output_name_line", type=str, help="Name of output Line file")
+    parser.add_argument(
+        "--format",
+        choices=["geojson", "geojsonseq", "parquet", "flatgeobuf"],
+        default="geojson",
+        help="Output file format",
+    )
+    parser.add_argument(
+        "--raw-paths",
+        action="store_true",
+        help="Also write the simplifiedRawPath of the activitySegments to a "
+        "rawpath_ layer",
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=1000,
+        help="Failed objects recorded per layer",
+    )
+    parser.add_argument(
+        "--timezone",
+        help="IANA time zone of the recordDate/recordTime fields " "(default: UTC-5)",
+    )
     return parser
 
 
 def main():
     parser = init_parser()
     args = parser.parse_args()
-    reader = make_reader(args.location_history_file)
-    create_point_file(reader, args.output_location, args.output_name_point)
-    create_line_file(reader, args.output_location, args.output_name_line)
+    create_layer_files(
+        TimelineObjectReader(args.location_history_file),
+        args.output_location,
+        args.output_name_point,
+        args.format,
+        line_name=args.output_name_line,
+        time_zone=args.timezone,
+        raw_paths=args.raw_paths,
+        max_errors=args.max_errors,
+    )
 
 
 if __name__ == "__main__":
@@ -4,5 +4,45 @@ __author__ = """GGweelplay"""
 __email__ = "tiger30311@gmail.com"
 __version__ = "0.2.0"
 
-from .gtlparser import *
+import importlib
+
 from .gtl2geojson import *
+
+# The mapping modules pull in ipyleaflet/ipywidgets or folium, so they are
+# only imported when one of their names is first accessed (PEP 562).
+_LAZY_ATTRIBUTES = {"Map": "gtlparser"}
+_LAZY_SUBMODULES = (
+    "batch",
+    "cache",
+    "cli",
+    "columnar",
+    "common",
+    "decoders",
+    "export",
+    "fetch",
+    "foliumap",
+    "gtlparser",
+    "heatmap",
+    "incremental",
+    "index",
+    "metrics",
+    "places",
+    "simplify",
+    "stays",
+    "tiles",
+)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_SUBMODULES))
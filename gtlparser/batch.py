@@ -0,0 +1,175 @@
+"""The batch module converts many Timeline exports in parallel."""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .gtl2geojson import write_timeline
+
+# Optional layers of a conversion, counted in the results next to the points
+# and lines.
+EXTRA_LAYERS = ("activities", "raw_paths", "stays", "trips")
+
+
+def find_timeline_files(inputs, pattern="*.json"):
+    """
+    Find the Timeline exports referenced by files, directories or glob patterns.
+
+    Args:
+        inputs (str or list): A file, a directory, a glob pattern, or a list of these.
+        pattern (str): Pattern of the files picked up inside directories.
+
+    Returns:
+        list: Sorted list of unique file paths.
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "**", pattern), recursive=True))
+        elif os.path.isfile(item):
+            files.add(item)
+        else:
+            files.update(glob.glob(item, recursive=True))
+    return sorted(path for path in files if os.path.isfile(path))
+
+
+def get_output_names(files):
+    """
+    Derive one unique output name per input file.
+
+    The file name without extension is used, unless several inputs share it;
+    in that case the path relative to the common parent folder is used, with
+    separators replaced by underscores.
+
+    Args:
+        files (list): Paths of the input files.
+
+    Returns:
+        list: Output names, in the order of files.
+    """
+    names = [os.path.splitext(os.path.basename(path))[0] for path in files]
+    if len(set(names)) == len(names):
+        return names
+    root = os.path.commonpath([os.path.abspath(path) for path in files])
+    if len(files) == 1:
+        root = os.path.dirname(root)
+    return [
+        os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0].replace(
+            os.sep, "_"
+        )
+        for path in files
+    ]
+
+
+def convert_file(in_json, output_path, output_name, flag_allField=0, driver="GeoJSON"):
+    """
+    Convert one Timeline export to point and line GeoJSON files.
+
+    The export is streamed straight to the output files with write_timeline.
+
+    Args:
+        in_json (str): Path of the Timeline export.
+        output_path (str): The folder where the GeoJSON files will be saved.
+        output_name (str): The name used for the point_ and line_ output files.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+
+    Returns:
+        dict: Summary with the input, output_name, points, lines, seconds and
+            error (None on success) of the conversion.
+    """
+    start = time.perf_counter()
+    result = {
+        "input": in_json,
+        "output_name": output_name,
+        "points": 0,
+        "lines": 0,
+        "seconds": 0.0,
+        "error": None,
+    }
+    try:
+        result["points"], result["lines"] = write_timeline(
+            in_json, output_path, output_name, flag_allField, driver=driver
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def convert_batch(
+    inputs, output_path, workers=None, flag_allField=0, driver="GeoJSON", verbose=True
+):
+    """
+    Convert many Timeline exports in parallel over a process pool.
+
+    Args:
+        inputs (str or list): Files, directories or glob patterns of the exports.
+        output_path (str): The folder where the GeoJSON files will be saved.
+        workers (int): Number of worker processes. Defaults to the number of
+            CPUs; 1 converts the files in the current process.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+        verbose (bool): Whether to print the batch summary.
+
+    Returns:
+        list: One summary dict per file (see convert_file), in input order.
+    """
+    files = find_timeline_files(inputs)
+    output_names = get_output_names(files)
+    os.makedirs(output_path, exist_ok=True)
+    args = (
+        files,
+        [output_path] * len(files),
+        output_names,
+        [flag_allField] * len(files),
+        [driver] * len(files),
+    )
+
+    start = time.perf_counter()
+    if workers == 1 or len(files) <= 1:
+        results = list(map(convert_file, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(convert_file, *args))
+    if verbose:
+        print(format_batch_summary(results, time.perf_counter() - start))
+    return results
+
+
+def format_batch_summary(results, total_seconds=None):
+    """
+    Format the per-file results of a batch conversion as a text table.
+
+    The features written to the EXTRA_LAYERS get a column each when any of
+    the results has them.
+
+    Args:
+        results (list): Summary dicts returned by convert_batch.
+        total_seconds (float): Wall-clock time of the whole batch.
+
+    Returns:
+        str: The summary table.
+    """
+    layers = [
+        layer for layer in EXTRA_LAYERS if any(layer in result for result in results)
+    ]
+    header = f"{'file':<40} {'points':>8} {'lines':>8}"
+    for layer in layers:
+        header += f" {layer:>{max(8, len(layer))}}"
+    lines = [f"{header} {'seconds':>8}  status"]
+    for result in results:
+        status = "ok" if result["error"] is None else result["error"]
+        row = f"{result['output_name']:<40} {result['points']:>8} {result['lines']:>8}"
+        for layer in layers:
+            row += f" {result.get(layer, 0):>{max(8, len(layer))}}"
+        lines.append(f"{row} {result['seconds']:>8.2f}  {status}")
+    failed = sum(result["error"] is not None for result in results)
+    summary = f"{len(results)} files, {failed} failed"
+    if total_seconds is not None:
+        summary += f", {total_seconds:.2f} s"
+    lines.append(summary)
+    return "\n".join(lines)
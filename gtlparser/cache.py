@@ -0,0 +1,256 @@
+"""The cache module keeps parsed Timeline exports on disk between calls.
+
+Parsed exports are stored as the arrays of their VisitColumns and PathColumns
+tables in NumPy .npz files. Entries are keyed by the source path, size and
+modification time (or content hash) plus the parse options, and the least
+recently used entries are evicted once the cache grows past its size cap.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from .columnar import PathColumns, VisitColumns, parse_timeline_columns
+
+# Bump when the cached table layout changes, to invalidate old entries
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def get_default_cache_dir():
+    """
+    Get the default cache folder.
+
+    Returns:
+        str: $GTLPARSER_CACHE_DIR if set, otherwise ~/.cache/gtlparser.
+    """
+    return os.environ.get(
+        "GTLPARSER_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "gtlparser"),
+    )
+
+
+def evict_files(cache_dir, suffix, max_bytes, sidecar_suffixes=()):
+    """
+    Remove the least recently used files of a cache folder until they fit a cap.
+
+    The modification time of a file records its last use.
+
+    Args:
+        cache_dir (str): The cache folder.
+        suffix (str): Suffix of the entry files, e.g. ".npz".
+        max_bytes (int): Size cap of the entry files in bytes.
+        sidecar_suffixes (tuple): Suffixes appended to the name of an entry
+            file for the files removed along with it, e.g. (".meta",).
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(suffix):
+            try:
+                stat = os.stat(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        for file_name in (name,) + tuple(name + s for s in sidecar_suffixes):
+            try:
+                os.remove(os.path.join(cache_dir, file_name))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed Timeline exports with LRU eviction.
+
+    The modification time of an entry file records its last use, so the
+    cache needs no separate index and can be shared between processes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, use_hash=False):
+        """
+        Initializes the cache.
+
+        Args:
+            cache_dir (str): Folder of the cache files. Defaults to
+                get_default_cache_dir().
+            max_bytes (int): Size cap of the cache in bytes.
+            use_hash (bool): Key entries by the SHA-256 of the file content
+                instead of its size and modification time.
+        """
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.max_bytes = max_bytes
+        self.use_hash = use_hash
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, in_json, **options):
+        """
+        Build the cache key of a source file and parse options.
+
+        Args:
+            in_json (str): Path of the source file.
+            **options: Parse options that change the cached result.
+
+        Returns:
+            str: The hexadecimal key.
+        """
+        source = os.path.abspath(in_json)
+        if self.use_hash:
+            from .incremental import hash_file
+
+            identity = hash_file(source)
+        else:
+            stat = os.stat(source)
+            identity = [stat.st_size, stat.st_mtime_ns]
+        payload = json.dumps(
+            [CACHE_VERSION, source, identity, options], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Read an entry and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: The cached arrays, or None if the entry does not exist.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        os.utime(entry_path)
+        return arrays
+
+    def put(self, key, arrays):
+        """
+        Write an entry, then evict old entries if the cache is over its cap.
+
+        Args:
+            key (str): The cache key.
+            arrays (dict): The arrays to store.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, self._entry_path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its cap."""
+        evict_files(self.cache_dir, ".npz", self.max_bytes)
+
+    def clear(self):
+        """Remove every entry of the cache."""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def load_columns(self, in_json):
+        """
+        Get the columnar tables of a Timeline export, parsing it only on a cache miss.
+
+        Args:
+            in_json (str): Path of the Timeline export.
+
+        Returns:
+            tuple: (VisitColumns, PathColumns).
+        """
+        key = self.make_key(in_json, parser="timeline_columns")
+        arrays = self.get(key)
+        if arrays is not None:
+            return columns_from_arrays(arrays)
+        visits, paths = parse_timeline_columns(in_json)
+        self.put(key, columns_to_arrays(visits, paths))
+        return visits, paths
+
+    def load_index(self, in_json, **kwargs):
+        """
+        Get the TimelineIndex of a Timeline export, building it only on a cache miss.
+
+        The index arrays are stored in their own entry, next to the columnar
+        tables of the export.
+
+        Args:
+            in_json (str): Path of the Timeline export.
+            **kwargs: Keyword arguments of TimelineIndex.
+
+        Returns:
+            TimelineIndex: The index.
+        """
+        from .index import TimelineIndex
+
+        visits, paths = self.load_columns(in_json)
+        key = self.make_key(in_json, parser="timeline_index", **kwargs)
+        arrays = self.get(key)
+        if arrays is not None:
+            return TimelineIndex.from_arrays(visits, paths, arrays)
+        index = TimelineIndex(visits, paths, **kwargs)
+        self.put(key, index.to_arrays())
+        return index
+
+
+def columns_to_arrays(visits, paths):
+    """
+    Flatten columnar tables into a dict of named arrays.
+
+    Args:
+        visits (VisitColumns): The visit table.
+        paths (PathColumns): The path table.
+
+    Returns:
+        dict: Arrays named "visit_<field>" and "path_<field>".
+    """
+    arrays = {f"visit_{field}": getattr(visits, field) for field in visits.fields}
+    arrays.update({f"path_{field}": getattr(paths, field) for field in paths.fields})
+    return arrays
+
+
+def columns_from_arrays(arrays):
+    """
+    Rebuild columnar tables from the arrays written by columns_to_arrays.
+
+    Args:
+        arrays (dict): Arrays named "visit_<field>" and "path_<field>".
+
+    Returns:
+        tuple: (VisitColumns, PathColumns).
+    """
+    visits = VisitColumns(
+        **{field: arrays[f"visit_{field}"] for field in VisitColumns.fields}
+    )
+    paths = PathColumns(
+        **{field: arrays[f"path_{field}"] for field in PathColumns.fields}
+    )
+    return visits, paths
+
+
+def get_cache(cache):
+    """
+    Resolve the cache argument of the parse functions.
+
+    Args:
+        cache (bool or ParseCache): True for the default cache, or a ParseCache.
+
+    Returns:
+        ParseCache: The cache to use, or None if caching is disabled.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ParseCache()
+    return cache
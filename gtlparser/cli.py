@@ -0,0 +1,573 @@
+"""The cli module provides the gtlparser command.
+
+The command converts Google Timeline exports of both the current
+(semanticSegments) and the legacy (timelineObjects) format to point and line
+layers. The pipeline can be chosen from the command line: in-memory parsing,
+single-pass streaming with constant memory (--stream), or columnar parsing,
+over a process pool with --workers, for GeoParquet output (--format parquet)
+and vector tiles (--format mbtiles).
+"""
+
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from functools import partial
+
+OUTPUT_FORMATS = ("geojson", "geojsonseq", "parquet", "mbtiles")
+# Formats written from the columnar tables, which can be parsed in parallel
+COLUMNAR_FORMATS = ("parquet", "mbtiles")
+TIMELINE_FORMATS = ("semanticSegments", "timelineObjects")
+
+
+def detect_timeline_format(in_json):
+    """
+    Detect whether a Timeline export uses the current or the legacy format.
+
+    Only the top-level keys are read, with the incremental JSON parser, so the
+    file is not loaded. URLs are assumed to use the current format.
+
+    Args:
+        in_json (str): Path or URL of the Timeline export.
+
+    Returns:
+        str: "semanticSegments" or "timelineObjects".
+
+    Raises:
+        ValueError: If the file has neither top-level key.
+    """
+    if in_json.startswith("http://") or in_json.startswith("https://"):
+        return "semanticSegments"
+
+    import ijson
+
+    with open(in_json, "rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if prefix == "" and event == "map_key" and value in TIMELINE_FORMATS:
+                return value
+    raise ValueError(f"'{in_json}' is not a Google Timeline export.")
+
+
+def _load_columns(in_json, args, filters):
+    """
+    Get the filtered visit and path tables of an export, from the parse cache with --cache.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns).
+    """
+    from .columnar import filter_columns, parse_timeline_columns
+
+    if args.cache:
+        from .cache import ParseCache
+
+        return filter_columns(*ParseCache().load_columns(in_json), **filters)
+    return parse_timeline_columns(
+        in_json, assume_sorted=args.assume_sorted, workers=args.workers, **filters
+    )
+
+
+def _convert_semantic(in_json, args, output_name, since, until):
+    """
+    Convert one export of the current format with the pipeline chosen in args.
+
+    The time and bounding-box filters are pushed down into the parsers, so
+    segments outside them are skipped before they are decoded.
+
+    Returns:
+        dict: The points and lines written, and the (original, simplified)
+            vertex counts of the lines as "vertices" when they are known, and
+            the "activities", "stays" and "trips" written when requested.
+    """
+    from . import gtl2geojson
+    from . import simplify
+
+    if args.raw_paths:
+        raise ValueError("--raw-paths is only supported for legacy exports.")
+    filters = {"start": since, "end": until, "bbox": args.bbox}
+    if args.activities:
+        extra_layers = {
+            "activities": _write_activities(in_json, args, output_name, filters)
+        }
+    else:
+        extra_layers = {}
+    if args.stays:
+        extra_layers.update(_write_stays(in_json, args, output_name, filters))
+    simplify_options = {
+        "simplify": args.simplify,
+        "simplify_method": args.simplify_method,
+    }
+    if args.format == "mbtiles":
+        from .tiles import write_mbtiles
+
+        visits, paths = _load_columns(in_json, args, filters)
+        zooms = args.zooms or (2, 14)
+        write_mbtiles(
+            (visits, paths),
+            f"{args.output_path}/{output_name}.mbtiles",
+            min(zooms),
+            max(zooms),
+        )
+        lines = int((paths.vertex_count > 1).sum())
+        return {"points": len(visits), "lines": lines, **extra_layers}
+
+    if args.format == "parquet":
+        from .export import create_export_file
+
+        visits, paths = _load_columns(in_json, args, filters)
+        paths = paths.select(paths.vertex_count > 1)
+        original_vertices = len(paths.lon)
+        if args.simplify is not None:
+            paths = simplify.simplify_paths(paths, args.simplify, args.simplify_method)
+        create_export_file(args.output_path, output_name, visits, True, "parquet")
+        create_export_file(args.output_path, output_name, paths, False, "parquet")
+        if args.zooms:
+            for zoom, zoom_paths in simplify.simplify_multiresolution(
+                paths, args.zooms, args.simplify_method
+            ).items():
+                create_export_file(
+                    args.output_path, f"{output_name}_z{zoom}", zoom_paths, False
+                )
+        return {
+            "points": len(visits),
+            "lines": len(paths),
+            "vertices": (original_vertices, len(paths.lon)),
+            **extra_layers,
+        }
+
+    driver = "GeoJSONSeq" if args.format == "geojsonseq" else "GeoJSON"
+    if args.stream:
+        points, lines = gtl2geojson.write_timeline(
+            in_json,
+            args.output_path,
+            output_name,
+            args.all_fields,
+            args.vertex_time,
+            driver,
+            assume_sorted=args.assume_sorted,
+            **filters,
+            **simplify_options,
+        )
+        return {"points": points, "lines": lines, **extra_layers}
+
+    points, lines = gtl2geojson.parse_timeline(
+        in_json,
+        flag_allField=args.all_fields,
+        flag_vertexTime=args.vertex_time,
+        cache=args.cache,
+        assume_sorted=args.assume_sorted,
+        **filters,
+        **simplify_options,
+    )
+    if args.zooms:
+        for zoom, zoom_lines in simplify.simplify_features_multiresolution(
+            lines, args.zooms, args.simplify_method
+        ).items():
+            gtl2geojson.create_geojson_file(
+                args.output_path, f"{output_name}_z{zoom}", zoom_lines, False, driver
+            )
+    return {
+        "points": gtl2geojson.create_geojson_file(
+            args.output_path, output_name, points, True, driver
+        ),
+        "lines": gtl2geojson.create_geojson_file(
+            args.output_path, output_name, lines, False, driver
+        ),
+        "vertices": simplify.get_vertex_reduction(lines)[:2],
+        **extra_layers,
+    }
+
+
+def _legacy_in_time_range(item, since, until):
+    """Check the start of a legacy timelineObjects entry against the bounds."""
+    from .decoders import parse_timestamp
+    from .gtl2geojson import compare_time
+
+    for value in item.values():
+        duration = value.get("duration", {}) if isinstance(value, dict) else {}
+        if "startTimestamp" in duration:
+            epoch_ms = parse_timestamp(duration["startTimestamp"])[0]
+            return compare_time(epoch_ms, since, until) == 0
+        if "startTimestampMs" in duration:
+            epoch_ms = int(duration["startTimestampMs"])
+            return compare_time(epoch_ms, since, until) == 0
+    return False
+
+
+def _write_activities(in_json, args, output_name, filters):
+    """
+    Write the activity layer of an export, in a separate pass over the file.
+
+    Returns:
+        int: The number of activities written.
+    """
+    if args.format == "parquet":
+        from .columnar import parse_activity_columns
+        from .export import to_geodataframe
+
+        activities = parse_activity_columns(
+            in_json, assume_sorted=args.assume_sorted, **filters
+        )
+        to_geodataframe(activities).to_parquet(
+            f"{args.output_path}/activity_{output_name}.parquet", index=False
+        )
+        return len(activities)
+
+    from .gtl2geojson import GEOJSON_DRIVERS, FeatureWriter, iter_activity
+
+    driver = "GeoJSONSeq" if args.format == "geojsonseq" else "GeoJSON"
+    file_path = f"{args.output_path}/activity_{output_name}{GEOJSON_DRIVERS[driver]}"
+    with FeatureWriter(file_path, driver) as writer:
+        for feature in iter_activity(
+            in_json, assume_sorted=args.assume_sorted, **filters
+        ):
+            writer.write(feature)
+    return writer.count
+
+
+def _write_stays(in_json, args, output_name, filters):
+    """
+    Write the stay points and trips derived from the path vertices of an export.
+
+    Returns:
+        dict: The number of "stays" and "trips" written.
+    """
+    from .stays import segment_timeline
+
+    _, paths = _load_columns(in_json, args, filters)
+    stays, trips = segment_timeline(paths, args.stay_distance, args.stay_duration * 60)
+    layers = {"stay": stays, "trip": trips}
+    if args.format == "parquet":
+        from .export import to_geodataframe
+
+        for prefix, layer in layers.items():
+            to_geodataframe(layer).to_parquet(
+                f"{args.output_path}/{prefix}_{output_name}.parquet", index=False
+            )
+    else:
+        from .gtl2geojson import GEOJSON_DRIVERS, FeatureWriter
+
+        driver = "GeoJSONSeq" if args.format == "geojsonseq" else "GeoJSON"
+        for prefix, layer in layers.items():
+            file_path = (
+                f"{args.output_path}/{prefix}_{output_name}{GEOJSON_DRIVERS[driver]}"
+            )
+            with FeatureWriter(file_path, driver) as writer:
+                for feature in layer.to_features():
+                    writer.write(feature)
+    return {"stays": len(stays), "trips": len(trips)}
+
+
+def _convert_legacy(in_json, args, output_name, since, until):
+    """
+    Convert one export of the legacy format with Convert_GTL_2_GeoJSON, in one
+    streaming pass over its timelineObjects.
+
+    Returns:
+        dict: The points and lines written, and the "raw_paths" when requested.
+    """
+    from . import Convert_GTL_2_GeoJSON as legacy
+
+    if args.bbox is not None:
+        raise ValueError("--bbox is not supported for legacy exports.")
+    if args.simplify is not None or args.zooms:
+        raise ValueError("--simplify and --zooms are not supported for legacy exports.")
+    if args.format == "mbtiles":
+        raise ValueError("--format mbtiles is not supported for legacy exports.")
+    if args.stays:
+        raise ValueError("--stays is not supported for legacy exports.")
+    if since is not None or until is not None:
+        predicate = partial(_legacy_in_time_range, since=since, until=until)
+    else:
+        predicate = None
+    counts = legacy.create_layer_files(
+        legacy.TimelineObjectReader(in_json, predicate),
+        args.output_path,
+        output_name,
+        args.format,
+        time_zone=args.timezone,
+        raw_paths=args.raw_paths,
+        max_errors=args.max_errors,
+    )
+    if args.raw_paths:
+        return dict(zip(("points", "lines", "raw_paths"), counts))
+    return dict(zip(("points", "lines"), counts))
+
+
+def convert(in_json, args, output_name):
+    """
+    Convert one Timeline export as requested on the command line.
+
+    Args:
+        in_json (str): Path or URL of the Timeline export.
+        args (Namespace): The parsed command line arguments, with since and
+            until already converted by gtl2geojson.get_time_bound.
+        output_name (str): The name used for the point_ and line_ output files.
+
+    Returns:
+        dict: Summary with the input, output_name, points, lines, seconds and
+            error (None on success) of the conversion, as in batch.convert_file,
+            plus the (original, simplified) line "vertices" when known and the
+            features written to the batch.EXTRA_LAYERS requested.
+    """
+    start = time.perf_counter()
+    result = {
+        "input": in_json,
+        "output_name": output_name,
+        "points": 0,
+        "lines": 0,
+        "seconds": 0.0,
+        "error": None,
+    }
+    try:
+        if detect_timeline_format(in_json) == "timelineObjects":
+            converter = _convert_legacy
+        else:
+            converter = _convert_semantic
+        result.update(converter(in_json, args, output_name, args.since, args.until))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def init_parser():
+    """
+    Build the argument parser of the gtlparser command.
+
+    Returns:
+        ArgumentParser: The parser.
+    """
+    parser = ArgumentParser(
+        prog="gtlparser",
+        description="Convert Google Timeline exports to point and line layers.",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Timeline exports: files, folders, glob patterns or URLs.",
+    )
+    parser.add_argument(
+        "-o", "--output-path", default=".", help="Folder to write the output files to."
+    )
+    parser.add_argument(
+        "-n",
+        "--name",
+        help="Name of the output files (single input only). "
+        "Defaults to the input file name.",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="geojson",
+        help="Output format.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes; several exports are converted in parallel, and "
+        "a single one is parsed in parallel with --format parquet or mbtiles. "
+        "0 uses all CPUs.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write features as they are parsed, in one pass with constant memory.",
+    )
+    parser.add_argument(
+        "--since", help="Keep segments starting at or after this ISO 8601 time."
+    )
+    parser.add_argument(
+        "--until", help="Keep segments starting before this ISO 8601 time."
+    )
+    parser.add_argument(
+        "--timezone",
+        help="IANA time zone of the recordDate/recordTime fields of legacy "
+        "exports (default: UTC-5).",
+    )
+    parser.add_argument(
+        "--bbox",
+        nargs=4,
+        type=float,
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+        help="Keep segments inside this bounding box.",
+    )
+    parser.add_argument(
+        "--assume-sorted",
+        action="store_true",
+        help="Stop reading an export at the first segment starting after --until.",
+    )
+    parser.add_argument(
+        "--activities",
+        action="store_true",
+        help="Also write the activity segments to an activity_ layer.",
+    )
+    parser.add_argument(
+        "--raw-paths",
+        action="store_true",
+        help="Also write the simplifiedRawPath of legacy activity segments to "
+        "a rawpath_ layer.",
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Failed legacy objects recorded per layer in the failed_ files.",
+    )
+    parser.add_argument(
+        "--stays",
+        action="store_true",
+        help="Also write stay points and trips derived from the line vertices "
+        "to stay_ and trip_ layers.",
+    )
+    parser.add_argument(
+        "--stay-distance",
+        type=float,
+        default=200.0,
+        metavar="METRES",
+        help="Radius of a stay point in metres.",
+    )
+    parser.add_argument(
+        "--stay-duration",
+        type=float,
+        default=20.0,
+        metavar="MINUTES",
+        help="Minimum duration of a stay point in minutes.",
+    )
+    parser.add_argument(
+        "--simplify",
+        type=float,
+        metavar="METRES",
+        help="Simplify the lines with this tolerance in metres.",
+    )
+    parser.add_argument(
+        "--simplify-method",
+        choices=("douglas-peucker", "visvalingam"),
+        default="douglas-peucker",
+        help="Line simplification algorithm.",
+    )
+    parser.add_argument(
+        "--zooms",
+        type=int,
+        nargs="+",
+        metavar="ZOOM",
+        help="Also write one simplified line layer per web map zoom level; "
+        "with --format mbtiles, the tiles span these zoom levels (2 to 14).",
+    )
+    parser.add_argument(
+        "--all-fields",
+        action="store_const",
+        const=1,
+        default=0,
+        help="Include all visit fields in the point output.",
+    )
+    parser.add_argument(
+        "--vertex-time",
+        action="store_const",
+        const=1,
+        default=0,
+        help="Include the vertex times in the line output.",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse parsed exports from the on-disk parse cache.",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the features written and the time taken per file.",
+    )
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the gtlparser command.
+
+    Args:
+        argv (list): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit status, 1 if any conversion failed.
+    """
+    parser = init_parser()
+    args = parser.parse_args(argv)
+    if args.stream and args.format in ("parquet", "mbtiles"):
+        parser.error("--stream writes GeoJSON; use --format geojson or geojsonseq.")
+    if args.stream and args.zooms:
+        parser.error("--zooms needs the whole line layer; drop --stream.")
+    from .gtl2geojson import get_time_bound
+
+    try:
+        args.since = get_time_bound(args.since)
+        args.until = get_time_bound(args.until)
+    except ValueError as e:
+        parser.error(f"invalid --since/--until value: {e}")
+    if args.workers == 0:
+        args.workers = None
+
+    from .batch import find_timeline_files, format_batch_summary, get_output_names
+
+    urls = [item for item in args.inputs if item.startswith(("http://", "https://"))]
+    files = find_timeline_files([item for item in args.inputs if item not in urls])
+    inputs = files + urls
+    if not inputs:
+        parser.error("no Timeline exports found.")
+    if args.workers != 1 and len(inputs) == 1 and args.format not in COLUMNAR_FORMATS:
+        parser.error(
+            "a single export is only parsed in parallel with --format parquet "
+            "or mbtiles; drop --workers."
+        )
+    if args.name is not None:
+        if len(inputs) > 1:
+            parser.error("--name can only be used with a single input.")
+        output_names = [args.name]
+    else:
+        output_names = get_output_names(files) + [
+            os.path.splitext(os.path.basename(url.split("?")[0]))[0] or "timeline"
+            for url in urls
+        ]
+    os.makedirs(args.output_path, exist_ok=True)
+
+    start = time.perf_counter()
+    if len(inputs) > 1 and args.workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        from copy import copy
+
+        # The exports are spread over the pool, each parsed in a single process.
+        file_args = copy(args)
+        file_args.workers = 1
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(
+                executor.map(convert, inputs, [file_args] * len(inputs), output_names)
+            )
+    else:
+        results = [
+            convert(in_json, args, output_name)
+            for in_json, output_name in zip(inputs, output_names)
+        ]
+    for result in results:
+        if result["error"] is not None:
+            print(f"{result['input']}: {result['error']}", file=sys.stderr)
+    if args.stats:
+        print(format_batch_summary(results, time.perf_counter() - start))
+        if args.simplify is not None:
+            from .simplify import vertex_reduction_ratio
+
+            for result in results:
+                if "vertices" in result:
+                    original, simplified = result["vertices"]
+                    ratio = vertex_reduction_ratio(original, simplified)
+                    print(
+                        f"{result['output_name']}: {original} -> {simplified} "
+                        f"line vertices ({ratio:.1%} fewer)"
+                    )
+    return int(any(result["error"] is not None for result in results))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,816 @@
+"""The columnar module stores parsed Timeline exports as NumPy arrays.
+
+Instead of one geojson Feature per visit and one tuple per path vertex, the
+tables in this module keep every attribute in a flat, typed NumPy array.
+Analytics and mapping code can work on the arrays directly, and GeoJSON is
+only built when it is asked for.
+"""
+
+import os
+from array import array
+
+import numpy as np
+from geojson import Point, LineString, Feature, FeatureCollection
+
+from .decoders import decode_latlng, decode_timestamps, format_timestamp
+from .gtl2geojson import (
+    compare_start_time,
+    get_segment_type,
+    get_time_bound,
+    iter_semanticSegments,
+)
+
+# Number of strings decoded per bulk decoder call while parsing
+DECODE_CHUNK_SIZE = 65536
+
+
+def _as_mask(selection, length):
+    """Convert a boolean mask or an array of rows to a boolean mask."""
+    selection = np.asarray(selection)
+    if selection.dtype == bool:
+        return selection
+    mask = np.zeros(length, dtype=bool)
+    mask[selection.astype(np.int64)] = True
+    return mask
+
+
+class VisitColumns:
+    """
+    Columnar table of the visit segments of a Timeline export.
+
+    Attributes:
+        segment_id (ndarray): Index of the visit in semanticSegments (int64).
+        lon, lat (ndarray): Coordinates of the top candidate place (float64).
+        start_time, end_time (ndarray): Epoch milliseconds (int64).
+        start_offset, end_offset (ndarray): UTC offsets in minutes (int16).
+        hierarchy_level (ndarray): Visit hierarchy level (int16).
+        probability (ndarray): Visit probability (float64).
+        place_id (ndarray): Top candidate place ID (str).
+        semantic_type (ndarray): Top candidate semantic type (str).
+        top_probability (ndarray): Top candidate probability (float64).
+    """
+
+    fields = (
+        "segment_id",
+        "lon",
+        "lat",
+        "start_time",
+        "end_time",
+        "start_offset",
+        "end_offset",
+        "hierarchy_level",
+        "probability",
+        "place_id",
+        "semantic_type",
+        "top_probability",
+    )
+
+    def __init__(self, **columns):
+        """
+        Initializes the table from one array per field.
+
+        Args:
+            **columns: One array-like per name in VisitColumns.fields.
+        """
+        for field in self.fields:
+            setattr(self, field, np.asarray(columns[field]))
+
+    def __len__(self):
+        return len(self.segment_id)
+
+    def select(self, mask):
+        """
+        Get the rows of the table selected by a boolean mask.
+
+        Args:
+            mask (ndarray): One boolean per visit, or the rows to keep.
+
+        Returns:
+            VisitColumns: A new table with the selected visits, in table order.
+        """
+        mask = _as_mask(mask, len(self))
+        return VisitColumns(
+            **{field: getattr(self, field)[mask] for field in self.fields}
+        )
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Stack tables into one, in order.
+
+        Args:
+            tables (list): The VisitColumns to stack, at least one.
+
+        Returns:
+            VisitColumns: The stacked table.
+        """
+        return cls(
+            **{
+                field: np.concatenate([getattr(table, field) for table in tables])
+                for field in cls.fields
+            }
+        )
+
+    def to_features(self, flag_allField=0):
+        """
+        Build point features from the table.
+
+        Args:
+            flag_allField (int): Flag to indicate whether to include all fields in the output.
+
+        Yields:
+            Feature: One point feature per visit, as parse_visitPoint builds them.
+        """
+        for i in range(len(self)):
+            point_output = {
+                "startTime": format_timestamp(self.start_time[i], self.start_offset[i]),
+                "endTime": format_timestamp(self.end_time[i], self.end_offset[i]),
+            }
+            if flag_allField == 1:
+                point_output["hierarchyLevel"] = int(self.hierarchy_level[i])
+                point_output["probability"] = float(self.probability[i])
+                point_output["placeId"] = str(self.place_id[i])
+                point_output["semanticType"] = str(self.semantic_type[i])
+                point_output["topCadidate_probability"] = float(self.top_probability[i])
+            yield Feature(
+                geometry=Point((float(self.lon[i]), float(self.lat[i]))),
+                properties=point_output,
+            )
+
+    def to_feature_collection(self, flag_allField=0):
+        """
+        Convert the table to a point FeatureCollection.
+
+        Args:
+            flag_allField (int): Flag to indicate whether to include all fields in the output.
+
+        Returns:
+            FeatureCollection: The same collection parse_visitPoint returns.
+        """
+        return FeatureCollection(list(self.to_features(flag_allField)))
+
+
+class PathColumns:
+    """
+    Columnar table of the timelinePath segments of a Timeline export.
+
+    The vertices of all paths are stored back to back; the vertices of path i
+    are lon[offsets[i]:offsets[i + 1]] and lat[offsets[i]:offsets[i + 1]].
+
+    Attributes:
+        segment_id (ndarray): Index of the path in semanticSegments (int64).
+        start_time, end_time (ndarray): Epoch milliseconds (int64).
+        start_offset, end_offset (ndarray): UTC offsets in minutes (int16).
+        offsets (ndarray): Vertex offsets, one longer than the table (int64).
+        lon, lat (ndarray): Vertex coordinates (float64).
+        time (ndarray): Vertex times in epoch milliseconds (int64).
+    """
+
+    fields = (
+        "segment_id",
+        "start_time",
+        "end_time",
+        "start_offset",
+        "end_offset",
+        "offsets",
+        "lon",
+        "lat",
+        "time",
+    )
+
+    def __init__(self, **columns):
+        """
+        Initializes the table from one array per field.
+
+        Args:
+            **columns: One array-like per name in PathColumns.fields.
+        """
+        for field in self.fields:
+            setattr(self, field, np.asarray(columns[field]))
+
+    def __len__(self):
+        return len(self.segment_id)
+
+    @property
+    def vertex_count(self):
+        """ndarray: Number of vertices of each path (int64)."""
+        return np.diff(self.offsets)
+
+    def get_path(self, i):
+        """
+        Get the vertices of one path.
+
+        Args:
+            i (int): Row of the path in the table.
+
+        Returns:
+            tuple: (lon, lat) arrays of the path vertices.
+        """
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.lon[start:stop], self.lat[start:stop]
+
+    def get_times(self, i):
+        """
+        Get the vertex times of one path.
+
+        Args:
+            i (int): Row of the path in the table.
+
+        Returns:
+            ndarray: Epoch milliseconds of the path vertices.
+        """
+        return self.time[self.offsets[i] : self.offsets[i + 1]]
+
+    def select(self, mask):
+        """
+        Get the rows of the table selected by a boolean mask.
+
+        Args:
+            mask (ndarray): One boolean per path, or the rows to keep.
+
+        Returns:
+            PathColumns: A new table with the selected paths and their
+                vertices, in table order.
+        """
+        mask = _as_mask(mask, len(self))
+        vertex_count = self.vertex_count
+        vertex_mask = np.repeat(mask, vertex_count)
+        offsets = np.zeros(mask.sum() + 1, dtype=np.int64)
+        np.cumsum(vertex_count[mask], out=offsets[1:])
+        return PathColumns(
+            segment_id=self.segment_id[mask],
+            start_time=self.start_time[mask],
+            end_time=self.end_time[mask],
+            start_offset=self.start_offset[mask],
+            end_offset=self.end_offset[mask],
+            offsets=offsets,
+            lon=self.lon[vertex_mask],
+            lat=self.lat[vertex_mask],
+            time=self.time[vertex_mask],
+        )
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Stack tables into one, in order, shifting the vertex offsets.
+
+        Args:
+            tables (list): The PathColumns to stack, at least one.
+
+        Returns:
+            PathColumns: The stacked table.
+        """
+        columns = {
+            field: np.concatenate([getattr(table, field) for table in tables])
+            for field in cls.fields
+            if field != "offsets"
+        }
+        shifts = np.cumsum([0] + [table.offsets[-1] for table in tables[:-1]])
+        columns["offsets"] = np.concatenate(
+            [[0]] + [table.offsets[1:] + shift for table, shift in zip(tables, shifts)]
+        ).astype(np.int64)
+        return cls(**columns)
+
+    def to_features(self, flag_vertexTime=0):
+        """
+        Build line features from the table.
+
+        Paths with fewer than two vertices are skipped, as in parse_timelinePath.
+
+        Args:
+            flag_vertexTime (int): Flag to indicate whether to include the vertex times in the output.
+
+        Yields:
+            Feature: One line feature per path.
+        """
+        for i in range(len(self)):
+            lon, lat = self.get_path(i)
+            if len(lon) < 2:
+                continue
+            line_output = {
+                "startTime": format_timestamp(self.start_time[i], self.start_offset[i]),
+                "endTime": format_timestamp(self.end_time[i], self.end_offset[i]),
+            }
+            if flag_vertexTime == 1:
+                line_output["vertexTimes"] = self.get_times(i).tolist()
+            yield Feature(
+                geometry=LineString(list(zip(lon.tolist(), lat.tolist()))),
+                properties=line_output,
+            )
+
+    def to_feature_collection(self, flag_vertexTime=0):
+        """
+        Convert the table to a line FeatureCollection.
+
+        Args:
+            flag_vertexTime (int): Flag to indicate whether to include the vertex times in the output.
+
+        Returns:
+            FeatureCollection: The same collection parse_timelinePath returns.
+        """
+        return FeatureCollection(list(self.to_features(flag_vertexTime)))
+
+
+class ActivityColumns:
+    """
+    Columnar table of the activity segments of a Timeline export.
+
+    Attributes:
+        segment_id (ndarray): Index of the activity in semanticSegments (int64).
+        start_lon, start_lat (ndarray): Start location (float64).
+        end_lon, end_lat (ndarray): End location (float64).
+        start_time, end_time (ndarray): Epoch milliseconds (int64).
+        start_offset, end_offset (ndarray): UTC offsets in minutes (int16).
+        distance_meters (ndarray): Distance reported by Timeline (float64).
+        activity_type (ndarray): Top candidate activity type (str).
+        probability (ndarray): Top candidate probability (float64).
+    """
+
+    fields = (
+        "segment_id",
+        "start_lon",
+        "start_lat",
+        "end_lon",
+        "end_lat",
+        "start_time",
+        "end_time",
+        "start_offset",
+        "end_offset",
+        "distance_meters",
+        "activity_type",
+        "probability",
+    )
+
+    def __init__(self, **columns):
+        """
+        Initializes the table from one array per field.
+
+        Args:
+            **columns: One array-like per name in ActivityColumns.fields.
+        """
+        for field in self.fields:
+            setattr(self, field, np.asarray(columns[field]))
+
+    def __len__(self):
+        return len(self.segment_id)
+
+    def select(self, mask):
+        """
+        Get the rows of the table selected by a boolean mask.
+
+        Args:
+            mask (ndarray): One boolean per activity, or the rows to keep.
+
+        Returns:
+            ActivityColumns: A new table with the selected activities, in table order.
+        """
+        mask = _as_mask(mask, len(self))
+        return ActivityColumns(
+            **{field: getattr(self, field)[mask] for field in self.fields}
+        )
+
+    def to_features(self):
+        """
+        Build line features from the table.
+
+        Yields:
+            Feature: One line feature per activity, as parse_activity builds them.
+        """
+        for i in range(len(self)):
+            line_output = {
+                "startTime": format_timestamp(self.start_time[i], self.start_offset[i]),
+                "endTime": format_timestamp(self.end_time[i], self.end_offset[i]),
+                "activityType": str(self.activity_type[i]) or None,
+                "probability": _optional_float(self.probability[i]),
+                "distanceMeters": _optional_float(self.distance_meters[i]),
+            }
+            yield Feature(
+                geometry=LineString(
+                    [
+                        (float(self.start_lon[i]), float(self.start_lat[i])),
+                        (float(self.end_lon[i]), float(self.end_lat[i])),
+                    ]
+                ),
+                properties=line_output,
+            )
+
+    def to_feature_collection(self):
+        """
+        Convert the table to an activity FeatureCollection.
+
+        Returns:
+            FeatureCollection: The same collection parse_activity returns.
+        """
+        return FeatureCollection(list(self.to_features()))
+
+
+def _optional_float(value):
+    """Convert a NaN placeholder back to None."""
+    return None if np.isnan(value) else float(value)
+
+
+class _ColumnBuilder:
+    """Accumulates raw strings and decodes them in bulk into typed buffers."""
+
+    def __init__(self, time_fields, latlng_field=None):
+        """
+        Initializes the builder.
+
+        Args:
+            time_fields (dict): Maps an output column to the (time, offset)
+                buffers its strings are decoded into.
+            latlng_field (tuple): Names of the (lat, lon) output buffers for
+                the pending latLng strings, if any.
+        """
+        self.columns = {}
+        self.pending = {}
+        self.time_fields = time_fields
+        self.latlng_field = latlng_field
+        for time_field, offset_field in time_fields.values():
+            self.columns[time_field] = array("q")
+            if offset_field is not None:
+                self.columns[offset_field] = array("h")
+            self.pending[time_field] = []
+        if latlng_field is not None:
+            for field in latlng_field:
+                self.columns[field] = array("d")
+            self.pending["latLng"] = []
+
+    def add_time(self, name, value):
+        """Queues a timestamp string for the column name."""
+        self.pending[self.time_fields[name][0]].append(value)
+
+    def add_latlng(self, value):
+        """Queues a "lat°, lng°" string."""
+        self.pending["latLng"].append(value)
+
+    def flush(self, force=False):
+        """Decodes the queued strings once enough are pending, or when forced."""
+        if not force and all(
+            len(values) < DECODE_CHUNK_SIZE for values in self.pending.values()
+        ):
+            return
+        for time_field, offset_field in self.time_fields.values():
+            epoch_ms, offset = decode_timestamps(self.pending[time_field])
+            self.columns[time_field].extend(epoch_ms.tolist())
+            if offset_field is not None:
+                self.columns[offset_field].extend(offset.tolist())
+            self.pending[time_field] = []
+        if self.latlng_field is not None:
+            lat, lon = decode_latlng(self.pending["latLng"])
+            self.columns[self.latlng_field[0]].extend(lat.tolist())
+            self.columns[self.latlng_field[1]].extend(lon.tolist())
+            self.pending["latLng"] = []
+
+
+def _find_real_quotes(buffer, data):
+    """Get the positions of the quotes of a JSON document that delimit strings."""
+    quotes = np.flatnonzero(buffer == ord('"'))
+    if b"\\" not in data:
+        return quotes
+    escaped = []
+    for position in quotes[buffer[np.maximum(quotes - 1, 0)] == ord("\\")]:
+        backslashes = 0
+        while position - backslashes > 0 and data[position - backslashes - 1] == 92:
+            backslashes += 1
+        if backslashes % 2:
+            escaped.append(position)
+    return np.setdiff1d(quotes, escaped, assume_unique=True)
+
+
+def find_segment_ranges(in_json, chunk_size=10000):
+    """
+    Split the semanticSegments array of a Timeline export into byte ranges.
+
+    The structure of the file is found with vectorized NumPy scans rather
+    than by parsing it: the brackets outside strings give the nesting depth,
+    and the objects one level inside the semanticSegments array are the
+    segments. Each range can then be parsed on its own.
+
+    Args:
+        in_json (str): Path of the Timeline export.
+        chunk_size (int): Number of segments per range.
+
+    Returns:
+        list: (first segment index, start byte, end byte) tuples, in order.
+
+    Raises:
+        ValueError: If the file has no semanticSegments array.
+    """
+    with open(in_json, "rb") as f:
+        data = f.read()
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    quotes = _find_real_quotes(buffer, data)
+    # "[" and "]" are "{" and "}" with bit 5 cleared, so one pass finds all four
+    folded = buffer | 0x20
+    brackets = np.flatnonzero((folded == ord("{")) | (folded == ord("}")))
+    # An even number of quotes before a bracket puts it outside strings
+    brackets = brackets[np.searchsorted(quotes, brackets) % 2 == 0]
+    step = np.where(folded[brackets] == ord("{"), 1, -1).astype(np.int8)
+    depth = np.cumsum(step, dtype=np.int64)
+
+    key = data.find(b'"semanticSegments"')
+    while key >= 0:
+        opening = np.searchsorted(brackets, key)
+        if (
+            np.searchsorted(quotes, key) % 2 == 0
+            and opening < len(brackets)
+            and depth[opening] == 2
+            and data[brackets[opening]] == ord("[")
+            and data[key + 18 : brackets[opening]].strip() == b":"
+        ):
+            break
+        key = data.find(b'"semanticSegments"', key + 1)
+    else:
+        raise ValueError(f"'{in_json}' has no semanticSegments array.")
+    closing = opening + 1 + np.argmax(depth[opening + 1 :] == 1)
+    inside = slice(opening + 1, closing)
+    starts = brackets[inside][(step[inside] == 1) & (depth[inside] == 3)]
+    ends = brackets[inside][(step[inside] == -1) & (depth[inside] == 2)] + 1
+    return [
+        (i, int(starts[i]), int(ends[min(i + chunk_size, len(ends)) - 1]))
+        for i in range(0, len(starts), chunk_size)
+    ]
+
+
+def parse_timeline_columns(
+    in_json,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    workers=1,
+    chunk_size=10000,
+):
+    """
+    Parse the visits and timeline paths of a Timeline export into columnar tables.
+
+    The export is read once with iter_semanticSegments. Coordinate and time
+    strings are queued and decoded in bulk with the decoders module, so no
+    per-feature objects are created.
+
+    With more than one worker, a local file is split with find_segment_ranges
+    into byte ranges of chunk_size segments. Each worker reads and parses its
+    own ranges and returns their tables, which are stacked in order, so the
+    parent process neither parses the JSON nor handles per-segment objects.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to
+            keep, applied to the decoded coordinate arrays.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        workers (int): Number of worker processes for local files; None uses
+            all CPUs, 1 parses serially.
+        chunk_size (int): Number of segments parsed by a worker at once.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns).
+    """
+    start = get_time_bound(start)
+    end = get_time_bound(end)
+    if workers != 1 and isinstance(in_json, str) and os.path.isfile(in_json):
+        ranges = find_segment_ranges(in_json, chunk_size)
+        if len(ranges) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                tables = list(
+                    executor.map(
+                        _parse_segment_range,
+                        [in_json] * len(ranges),
+                        ranges,
+                        [(start, end, bbox, assume_sorted)] * len(ranges),
+                    )
+                )
+            return (
+                VisitColumns.concat([visits for visits, _ in tables]),
+                PathColumns.concat([paths for _, paths in tables]),
+            )
+    return _build_timeline_columns(
+        iter_semanticSegments(in_json), 0, start, end, bbox, assume_sorted
+    )
+
+
+def _parse_segment_range(in_json, segment_range, filters):
+    """
+    Parse the segments in one byte range of a Timeline export into tables.
+
+    Args:
+        in_json (str): Path of the Timeline export.
+        segment_range (tuple): (first segment index, start byte, end byte) as
+            returned by find_segment_ranges.
+        filters (tuple): (start, end, bbox, assume_sorted) of
+            parse_timeline_columns, with the times in epoch milliseconds.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns).
+    """
+    import ijson
+
+    first_id, start_byte, end_byte = segment_range
+    with open(in_json, "rb") as f:
+        f.seek(start_byte)
+        data = f.read(end_byte - start_byte)
+    items = ijson.items(b"[" + data + b"]", "item", use_float=True)
+    segments = ((get_segment_type(item), item) for item in items)
+    return _build_timeline_columns(segments, first_id, *filters)
+
+
+def _build_timeline_columns(segments, first_id, start, end, bbox, assume_sorted):
+    """
+    Build the visit and path tables of a sequence of semantic segments.
+
+    Args:
+        segments (iterable): (segment_type, item) pairs as yielded by iter_semanticSegments.
+        first_id (int): Index of the first segment in semanticSegments.
+        start (int): Keep segments starting at or after this time.
+        end (int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop at the first segment starting at or after end.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns).
+    """
+    segment_times = {
+        "startTime": ("start_time", "start_offset"),
+        "endTime": ("end_time", "end_offset"),
+    }
+    visit_builder = _ColumnBuilder(segment_times, latlng_field=("lat", "lon"))
+    path_builder = _ColumnBuilder(segment_times)
+    vertex_builder = _ColumnBuilder(
+        {"time": ("time", None)}, latlng_field=("lat", "lon")
+    )
+    visits = {
+        "segment_id": array("q"),
+        "hierarchy_level": array("h"),
+        "probability": array("d"),
+        "place_id": [],
+        "semantic_type": [],
+        "top_probability": array("d"),
+    }
+    paths = {
+        "segment_id": array("q"),
+        "offsets": array("q", [0]),
+    }
+
+    for segment_id, (segment_type, item) in enumerate(segments, first_id):
+        if start is not None or end is not None:
+            position = compare_start_time(item, start, end)
+            if position > 0 and assume_sorted:
+                break
+            if position != 0:
+                continue
+        if segment_type == "visit":
+            builder = visit_builder
+            subset_visit = item["visit"]
+            top_candidate = subset_visit.get("topCandidate", {})
+            visit_builder.add_latlng(top_candidate["placeLocation"]["latLng"])
+            visits["segment_id"].append(segment_id)
+            visits["hierarchy_level"].append(subset_visit.get("hierarchyLevel", -1))
+            visits["probability"].append(subset_visit.get("probability", np.nan))
+            visits["place_id"].append(top_candidate.get("placeId", ""))
+            visits["semantic_type"].append(top_candidate.get("semanticType", ""))
+            visits["top_probability"].append(top_candidate.get("probability", np.nan))
+        elif segment_type == "timelinePath":
+            builder = path_builder
+            for timeline_path in item["timelinePath"]:
+                vertex_builder.add_latlng(timeline_path["point"])
+                vertex_builder.add_time("time", timeline_path["time"])
+            paths["segment_id"].append(segment_id)
+            paths["offsets"].append(paths["offsets"][-1] + len(item["timelinePath"]))
+            vertex_builder.flush()
+        else:
+            continue
+        builder.add_time("startTime", item["startTime"])
+        builder.add_time("endTime", item["endTime"])
+        builder.flush()
+
+    for builder in (visit_builder, path_builder, vertex_builder):
+        builder.flush(force=True)
+    visits.update(visit_builder.columns)
+    paths.update(path_builder.columns)
+    paths.update(vertex_builder.columns)
+    visits["place_id"] = np.array(visits["place_id"], dtype=str)
+    visits["semantic_type"] = np.array(visits["semantic_type"], dtype=str)
+    if bbox is not None:
+        return filter_columns(VisitColumns(**visits), PathColumns(**paths), bbox=bbox)
+    return VisitColumns(**visits), PathColumns(**paths)
+
+
+def parse_activity_columns(
+    in_json, start=None, end=None, bbox=None, assume_sorted=False
+):
+    """
+    Parse the activity segments of a Timeline export into a columnar table.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat); activities are kept
+            if their start or end is in the box.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+
+    Returns:
+        ActivityColumns: The activity table.
+    """
+    start = get_time_bound(start)
+    end = get_time_bound(end)
+    start_builder = _ColumnBuilder(
+        {
+            "startTime": ("start_time", "start_offset"),
+            "endTime": ("end_time", "end_offset"),
+        },
+        latlng_field=("start_lat", "start_lon"),
+    )
+    end_builder = _ColumnBuilder({}, latlng_field=("end_lat", "end_lon"))
+    activities = {
+        "segment_id": array("q"),
+        "distance_meters": array("d"),
+        "activity_type": [],
+        "probability": array("d"),
+    }
+
+    for segment_id, (segment_type, item) in enumerate(iter_semanticSegments(in_json)):
+        if start is not None or end is not None:
+            position = compare_start_time(item, start, end)
+            if position > 0 and assume_sorted:
+                break
+            if position != 0:
+                continue
+        if segment_type != "activity":
+            continue
+        activity = item["activity"]
+        top_candidate = activity.get("topCandidate", {})
+        start_builder.add_latlng(activity["start"]["latLng"])
+        end_builder.add_latlng(activity["end"]["latLng"])
+        start_builder.add_time("startTime", item["startTime"])
+        start_builder.add_time("endTime", item["endTime"])
+        activities["segment_id"].append(segment_id)
+        activities["distance_meters"].append(activity.get("distanceMeters", np.nan))
+        activities["activity_type"].append(top_candidate.get("type") or "")
+        activities["probability"].append(top_candidate.get("probability", np.nan))
+        start_builder.flush()
+        end_builder.flush()
+
+    for builder in (start_builder, end_builder):
+        builder.flush(force=True)
+        activities.update(builder.columns)
+    activities["activity_type"] = np.array(activities["activity_type"], dtype=str)
+    table = ActivityColumns(**activities)
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        inside = [
+            (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+            for lon, lat in (
+                (table.start_lon, table.start_lat),
+                (table.end_lon, table.end_lat),
+            )
+        ]
+        table = table.select(inside[0] | inside[1])
+    return table
+
+
+def filter_columns(visits, paths, start=None, end=None, bbox=None):
+    """
+    Select the visits and paths that start in [start, end) and lie in a bounding box.
+
+    Visits are tested by their location; paths are kept if any of their
+    vertices falls in the box, as in gtl2geojson.filter_segments.
+
+    Args:
+        visits (VisitColumns): The visit table.
+        paths (PathColumns): The path table.
+        start (int): Keep rows starting at or after this time, in epoch milliseconds.
+        end (int): Keep rows starting before this time, in epoch milliseconds.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the rows to keep.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns) with the selected rows.
+    """
+
+    def time_mask(start_time):
+        mask = np.ones(len(start_time), dtype=bool)
+        if start is not None:
+            mask &= start_time >= start
+        if end is not None:
+            mask &= start_time < end
+        return mask
+
+    def bbox_mask(lon, lat):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        return (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+
+    visit_mask = time_mask(visits.start_time)
+    path_mask = time_mask(paths.start_time)
+    if bbox is not None:
+        visit_mask &= bbox_mask(visits.lon, visits.lat)
+        inside = np.concatenate(([0], np.cumsum(bbox_mask(paths.lon, paths.lat))))
+        path_mask &= inside[paths.offsets[1:]] > inside[paths.offsets[:-1]]
+    return visits.select(visit_mask), paths.select(path_mask)
@@ -0,0 +1,290 @@
+"""The decoders module converts Timeline coordinate and time strings in bulk.
+
+Timeline exports store every coordinate as a "lat°, lng°" string and every
+time as an ISO 8601 string. The functions in this module decode whole lists
+of these strings at once into NumPy arrays instead of one value at a time.
+"""
+
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_LOCAL_EPOCH = datetime(1970, 1, 1)
+_DAY_MS = 86400000
+
+# Fixed layout written by Google Timeline: "2023-11-06T13:20:20.000-05:00"
+_ISO_LENGTH = 29
+_ISO_SEPARATORS = {
+    4: "-",
+    7: "-",
+    10: "T",
+    13: ":",
+    16: ":",
+    19: ".",
+    26: ":",
+}
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp into epoch milliseconds and its UTC offset.
+
+    Args:
+        value (str): The timestamp, e.g. "2023-11-06T13:20:20.000-05:00".
+
+    Returns:
+        tuple: (epoch milliseconds as int, UTC offset in minutes as int).
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    temp_time = datetime.fromisoformat(value)
+    if temp_time.tzinfo is None:
+        temp_time = temp_time.replace(tzinfo=timezone.utc)
+    offset = temp_time.utcoffset() // timedelta(minutes=1)
+    return (temp_time - _EPOCH) // timedelta(milliseconds=1), offset
+
+
+def format_timestamp(epoch_ms, offset=0):
+    """
+    Format epoch milliseconds as the ISO 8601 layout used by Google Timeline.
+
+    Args:
+        epoch_ms (int): Milliseconds since the Unix epoch.
+        offset (int): UTC offset in minutes of the output timestamp.
+
+    Returns:
+        str: The timestamp, e.g. "2023-11-06T13:20:20.000-05:00".
+    """
+    temp_time = _EPOCH + timedelta(milliseconds=int(epoch_ms))
+    temp_time = temp_time.astimezone(timezone(timedelta(minutes=int(offset))))
+    return temp_time.isoformat(timespec="milliseconds")
+
+
+class LocalTime:
+    """
+    Convert epoch milliseconds to wall-clock dates and times of a time zone.
+
+    The UTC offsets of an IANA zone are memoized per UTC day, so a history of
+    years looks each day up once instead of every timestamp; days holding a
+    transition are not memoized and are looked up per timestamp.
+
+    Args:
+        zone (str or int): IANA time zone name, e.g. "America/New_York", or a
+            fixed UTC offset in minutes. Defaults to UTC. Zone names need the
+            zoneinfo module of Python 3.9+; fixed offsets work on any version.
+
+    Raises:
+        ValueError: If zone is a name and zoneinfo is not available.
+    """
+
+    def __init__(self, zone=0):
+        if isinstance(zone, str):
+            try:
+                from zoneinfo import ZoneInfo
+            except ImportError:
+                raise ValueError(
+                    f"Time zone names such as '{zone}' need Python 3.9 or later; "
+                    "pass a UTC offset in minutes instead."
+                ) from None
+
+            self.zone = ZoneInfo(zone)
+            self.fixed_offset = None
+        else:
+            self.zone = timezone(timedelta(minutes=int(zone)))
+            self.fixed_offset = int(zone)
+        self._offsets = {}
+        self._dates = {}
+
+    def _utc_offset(self, epoch_ms):
+        temp_time = _EPOCH + timedelta(milliseconds=epoch_ms)
+        return temp_time.astimezone(self.zone).utcoffset() // timedelta(minutes=1)
+
+    def offset(self, epoch_ms):
+        """
+        Get the UTC offset of the zone at a time.
+
+        Args:
+            epoch_ms (int): Milliseconds since the Unix epoch.
+
+        Returns:
+            int: The UTC offset in minutes.
+        """
+        if self.fixed_offset is not None:
+            return self.fixed_offset
+        day = epoch_ms // _DAY_MS
+        offset = self._offsets.get(day)
+        if offset is None:
+            offset = self._utc_offset(day * _DAY_MS)
+            if offset != self._utc_offset((day + 1) * _DAY_MS - 1):
+                return self._utc_offset(epoch_ms)
+            self._offsets[day] = offset
+        return offset
+
+    def date_time(self, epoch_ms, offset=None):
+        """
+        Format a time as its local date and time, to the second.
+
+        Args:
+            epoch_ms (int): Milliseconds since the Unix epoch.
+            offset (int): UTC offset in minutes to use instead of the zone's,
+                e.g. the one recorded with the timestamp.
+
+        Returns:
+            tuple: ("YYYY-MM-DD", "HH:MM:SS") strings.
+        """
+        if offset is None:
+            offset = self.offset(epoch_ms)
+        days, seconds = divmod(epoch_ms // 1000 + int(offset) * 60, 86400)
+        date = self._dates.get(days)
+        if date is None:
+            date = (_LOCAL_EPOCH + timedelta(days=days)).date().isoformat()
+            self._dates[days] = date
+        hours, seconds = divmod(seconds, 3600)
+        minutes, seconds = divmod(seconds, 60)
+        return date, f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def decode_latlng(values):
+    """
+    Decode "lat°, lng°" strings into coordinate arrays.
+
+    Args:
+        values (list): The coordinate strings, e.g. ["35.9571299°, -83.927834°"].
+
+    Returns:
+        tuple: (lat, lon) float64 arrays.
+
+    Raises:
+        ValueError: If a value is not a valid coordinate string.
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+    # Joining the values loses their boundaries, so each one must hold exactly
+    # one comma for the numbers to pair up as (lat, lng) per value.
+    for value in values:
+        if value.count(",") != 1:
+            raise ValueError(f"Invalid latLng value in input: {value!r}.")
+    text = ",".join(values).replace("°", "")
+    try:
+        coordinates = np.fromstring(text, dtype=np.float64, sep=",")
+    except ValueError:
+        coordinates = None
+    if coordinates is None or len(coordinates) != 2 * len(values):
+        raise ValueError("Invalid latLng value in input.")
+    return coordinates[0::2], coordinates[1::2]
+
+
+def decode_e7(points, lat_key="latE7", lng_key="lngE7"):
+    """
+    Decode the E7 coordinates of point objects into coordinate arrays.
+
+    Legacy exports store coordinates as integer degrees times 10^7, e.g.
+    {"latE7": 359571299, "lngE7": -839278340}. All points are read in one
+    pass per axis and scaled with NumPy.
+
+    Args:
+        points (list): The point objects.
+        lat_key (str): Key of the E7 latitude.
+        lng_key (str): Key of the E7 longitude.
+
+    Returns:
+        tuple: (lon, lat) float64 arrays.
+
+    Raises:
+        KeyError: If a point has no latitude or longitude.
+    """
+    lon = np.fromiter(map(itemgetter(lng_key), points), np.float64, len(points))
+    lat = np.fromiter(map(itemgetter(lat_key), points), np.float64, len(points))
+    lon /= 10000000
+    lat /= 10000000
+    return lon, lat
+
+
+def _days_from_civil(year, month, day):
+    """
+    Count the days since 1970-01-01 for arrays of proleptic Gregorian dates.
+
+    Args:
+        year, month, day (ndarray): Integer date components.
+
+    Returns:
+        ndarray: Days since the Unix epoch (int64).
+    """
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _decode_fixed_iso(values):
+    """
+    Decode timestamps that all follow the fixed "YYYY-MM-DDTHH:MM:SS.fff±HH:MM" layout.
+
+    Args:
+        values (list): The timestamp strings.
+
+    Returns:
+        tuple: (epoch milliseconds, UTC offset minutes) arrays, or None if a
+            value does not follow the layout.
+    """
+    try:
+        buffer = "".join(values).encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    if len(buffer) != _ISO_LENGTH * len(values):
+        return None
+    chars = np.frombuffer(buffer, dtype=np.uint8).reshape(len(values), _ISO_LENGTH)
+    for position, separator in _ISO_SEPARATORS.items():
+        if not np.all(chars[:, position] == ord(separator)):
+            return None
+    sign = chars[:, 23]
+    if not np.all((sign == ord("+")) | (sign == ord("-"))):
+        return None
+    digits = chars.astype(np.int64) - ord("0")
+    digit_columns = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18, 20, 21, 22]
+    digit_columns += [24, 25, 27, 28]
+    if np.any((digits[:, digit_columns] < 0) | (digits[:, digit_columns] > 9)):
+        return None
+
+    def number(start, stop):
+        result = np.zeros(len(values), dtype=np.int64)
+        for position in range(start, stop):
+            result = result * 10 + digits[:, position]
+        return result
+
+    days = _days_from_civil(number(0, 4), number(5, 7), number(8, 10))
+    seconds = ((days * 24 + number(11, 13)) * 60 + number(14, 16)) * 60
+    seconds += number(17, 19)
+    offset = np.where(sign == ord("-"), -1, 1) * (number(24, 26) * 60 + number(27, 29))
+    epoch_ms = (seconds - offset * 60) * 1000 + number(20, 23)
+    return epoch_ms, offset.astype(np.int16)
+
+
+def decode_timestamps(values):
+    """
+    Decode ISO 8601 timestamp strings into epoch milliseconds in bulk.
+
+    Values in the fixed layout Google writes ("2023-11-06T13:20:20.000-05:00")
+    are decoded with vectorized NumPy arithmetic; any other layout falls back
+    to parse_timestamp.
+
+    Args:
+        values (list): The timestamp strings.
+
+    Returns:
+        tuple: (epoch milliseconds int64 array, UTC offset minutes int16 array).
+    """
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int16)
+    decoded = _decode_fixed_iso(values)
+    if decoded is not None:
+        return decoded
+    epoch_ms = np.empty(len(values), dtype=np.int64)
+    offset = np.empty(len(values), dtype=np.int16)
+    for i, value in enumerate(values):
+        epoch_ms[i], offset[i] = parse_timestamp(value)
+    return epoch_ms, offset
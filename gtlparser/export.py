@@ -0,0 +1,316 @@
+"""The export module writes Timeline layers to binary columnar formats.
+
+GeoParquet and FlatGeobuf files keep typed columns (timestamps, floats,
+integers) and binary geometries, so they are much smaller than GeoJSON text
+and load back into GeoPandas without re-parsing. Both writers require
+geopandas; GeoParquet also requires pyarrow.
+"""
+
+import json
+
+import numpy as np
+
+from .columnar import ActivityColumns, PathColumns, VisitColumns, parse_timeline_columns
+from .metrics import activity_metrics, path_metrics
+from .places import PlaceColumns
+from .stays import StayColumns
+
+EXPORT_FORMATS = {"parquet": ".parquet", "flatgeobuf": ".fgb"}
+
+
+def _to_datetime(epoch_ms):
+    """
+    Convert epoch milliseconds to a timezone-aware pandas datetime column.
+
+    Args:
+        epoch_ms (ndarray): Milliseconds since the Unix epoch.
+
+    Returns:
+        DatetimeIndex: UTC timestamps with millisecond resolution.
+    """
+    import pandas as pd
+
+    return pd.to_datetime(np.asarray(epoch_ms, dtype=np.int64), unit="ms", utc=True)
+
+
+def visits_to_geodataframe(visits):
+    """
+    Convert a VisitColumns table to a GeoDataFrame of points.
+
+    Args:
+        visits (VisitColumns): The visit table.
+
+    Returns:
+        GeoDataFrame: One row per visit with typed columns, in EPSG:4326.
+    """
+    import geopandas as gpd
+
+    return gpd.GeoDataFrame(
+        {
+            "segmentId": visits.segment_id,
+            "startTime": _to_datetime(visits.start_time),
+            "endTime": _to_datetime(visits.end_time),
+            "startTimeUtcOffsetMinutes": visits.start_offset,
+            "endTimeUtcOffsetMinutes": visits.end_offset,
+            "hierarchyLevel": visits.hierarchy_level,
+            "probability": visits.probability,
+            "placeId": visits.place_id.astype(object),
+            "semanticType": visits.semantic_type.astype(object),
+            "topCadidate_probability": visits.top_probability,
+        },
+        geometry=gpd.points_from_xy(visits.lon, visits.lat),
+        crs="EPSG:4326",
+    )
+
+
+def paths_to_geodataframe(paths):
+    """
+    Convert a PathColumns table to a GeoDataFrame of lines.
+
+    Paths with fewer than two vertices are skipped, as in parse_timelinePath.
+    The length, duration and average speed of every path are computed with
+    metrics.path_metrics.
+
+    Args:
+        paths (PathColumns): The path table.
+
+    Returns:
+        GeoDataFrame: One row per path with typed columns, in EPSG:4326.
+    """
+    import geopandas as gpd
+    import shapely
+
+    metrics = path_metrics(paths)
+
+    vertex_count = paths.vertex_count
+    keep = np.flatnonzero(vertex_count > 1)
+    vertex_keep = np.repeat(vertex_count > 1, vertex_count)
+    coordinates = np.column_stack((paths.lon, paths.lat))[vertex_keep]
+    indices = np.repeat(np.arange(len(keep)), vertex_count[keep])
+    return gpd.GeoDataFrame(
+        {
+            "segmentId": paths.segment_id[keep],
+            "startTime": _to_datetime(paths.start_time[keep]),
+            "endTime": _to_datetime(paths.end_time[keep]),
+            "startTimeUtcOffsetMinutes": paths.start_offset[keep],
+            "endTimeUtcOffsetMinutes": paths.end_offset[keep],
+            "vertexCount": vertex_count[keep],
+            "distanceMeters": metrics["distance"][keep],
+            "durationSeconds": metrics["duration"][keep],
+            "speedMetersPerSecond": metrics["speed"][keep],
+        },
+        geometry=shapely.linestrings(coordinates, indices=indices),
+        crs="EPSG:4326",
+    )
+
+
+def activities_to_geodataframe(activities):
+    """
+    Convert an ActivityColumns table to a GeoDataFrame of start-to-end lines.
+
+    Args:
+        activities (ActivityColumns): The activity table.
+
+    Returns:
+        GeoDataFrame: One row per activity with typed columns and its
+            metrics.activity_metrics, in EPSG:4326.
+    """
+    import geopandas as gpd
+    import shapely
+
+    metrics = activity_metrics(activities)
+    coordinates = np.column_stack(
+        (
+            activities.start_lon,
+            activities.start_lat,
+            activities.end_lon,
+            activities.end_lat,
+        )
+    ).reshape(-1, 2)
+    indices = np.repeat(np.arange(len(activities)), 2)
+    return gpd.GeoDataFrame(
+        {
+            "segmentId": activities.segment_id,
+            "startTime": _to_datetime(activities.start_time),
+            "endTime": _to_datetime(activities.end_time),
+            "startTimeUtcOffsetMinutes": activities.start_offset,
+            "endTimeUtcOffsetMinutes": activities.end_offset,
+            "activityType": activities.activity_type.astype(object),
+            "probability": activities.probability,
+            "distanceMeters": metrics["distance"],
+            "straightDistanceMeters": metrics["straight_distance"],
+            "durationSeconds": metrics["duration"],
+            "speedMetersPerSecond": metrics["speed"],
+        },
+        geometry=(
+            shapely.linestrings(coordinates, indices=indices) if len(activities) else []
+        ),
+        crs="EPSG:4326",
+    )
+
+
+def stays_to_geodataframe(stays):
+    """
+    Convert a StayColumns table to a GeoDataFrame of points.
+
+    Args:
+        stays (StayColumns): The stay table.
+
+    Returns:
+        GeoDataFrame: One row per stay with typed columns, in EPSG:4326.
+    """
+    import geopandas as gpd
+
+    return gpd.GeoDataFrame(
+        {
+            "startTime": _to_datetime(stays.start_time),
+            "endTime": _to_datetime(stays.end_time),
+            "startTimeUtcOffsetMinutes": stays.start_offset,
+            "endTimeUtcOffsetMinutes": stays.end_offset,
+            "durationSeconds": (stays.end_time - stays.start_time) / 1000,
+            "vertexCount": stays.vertex_count,
+        },
+        geometry=gpd.points_from_xy(stays.lon, stays.lat),
+        crs="EPSG:4326",
+    )
+
+
+def places_to_geodataframe(places):
+    """
+    Convert a PlaceColumns table to a GeoDataFrame of points.
+
+    Args:
+        places (PlaceColumns): The place table.
+
+    Returns:
+        GeoDataFrame: One row per place with typed columns, in EPSG:4326.
+    """
+    import geopandas as gpd
+
+    return gpd.GeoDataFrame(
+        {
+            "placeId": places.place_id.astype(object),
+            "visitCount": places.visit_count,
+            "dwellTimeSeconds": places.dwell_time,
+            "firstSeen": _to_datetime(places.first_seen),
+            "lastSeen": _to_datetime(places.last_seen),
+            "firstSeenUtcOffsetMinutes": places.first_offset,
+            "lastSeenUtcOffsetMinutes": places.last_offset,
+        },
+        geometry=gpd.points_from_xy(places.lon, places.lat),
+        crs="EPSG:4326",
+    )
+
+
+def features_to_geodataframe(features):
+    """
+    Convert GeoJSON features to a GeoDataFrame with flat columns.
+
+    Nested properties (lists and dicts) are stored as JSON strings so that
+    every column has a single type in the binary formats.
+
+    Args:
+        features (FeatureCollection or list): The features to convert.
+
+    Returns:
+        GeoDataFrame: One row per feature, in EPSG:4326.
+    """
+    import geopandas as gpd
+
+    if isinstance(features, dict):
+        features = features["features"]
+    gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
+    for column in gdf.columns:
+        if column == "geometry" or gdf[column].dtype != object:
+            continue
+        if gdf[column].map(lambda value: isinstance(value, (dict, list))).any():
+            gdf[column] = gdf[column].map(
+                lambda value: None if value is None else json.dumps(value)
+            )
+    return gdf
+
+
+def to_geodataframe(data):
+    """
+    Convert parser output of any kind to a GeoDataFrame.
+
+    Args:
+        data (VisitColumns, PathColumns, ActivityColumns, StayColumns,
+            PlaceColumns, GeoDataFrame, FeatureCollection or list of
+            features): The layer to convert.
+
+    Returns:
+        GeoDataFrame: The layer as a GeoDataFrame.
+    """
+    if isinstance(data, VisitColumns):
+        return visits_to_geodataframe(data)
+    if isinstance(data, ActivityColumns):
+        return activities_to_geodataframe(data)
+    if isinstance(data, StayColumns):
+        return stays_to_geodataframe(data)
+    if isinstance(data, PlaceColumns):
+        return places_to_geodataframe(data)
+    if isinstance(data, PathColumns):
+        return paths_to_geodataframe(data)
+    if hasattr(data, "to_parquet"):
+        return data
+    return features_to_geodataframe(data)
+
+
+def create_export_file(
+    output_path, output_name, data, flag_point=True, file_format="parquet", prefix=None
+):
+    """
+    Write a point or line layer to a GeoParquet or FlatGeobuf file.
+
+    Args:
+        output_path (str): The folder where the file will be saved.
+        output_name (str): The name of the output file.
+        data (VisitColumns, PathColumns, GeoDataFrame, FeatureCollection or
+            list of features): The layer to write.
+        flag_point (bool): Flag to indicate whether the features are points or lines.
+        file_format (str): "parquet" for GeoParquet, or "flatgeobuf" for
+            FlatGeobuf with a packed Hilbert R-tree spatial index.
+        prefix (str): Prefix of the file name. Defaults to "point" or "line"
+            depending on flag_point.
+
+    Returns:
+        str: The path of the written file.
+
+    Raises:
+        ValueError: If the file format is not supported.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Format '{file_format}' not supported, use one of {list(EXPORT_FORMATS)}."
+        )
+    if prefix is None:
+        prefix = "point" if flag_point else "line"
+    file_path = f"{output_path}/{prefix}_{output_name}{EXPORT_FORMATS[file_format]}"
+    gdf = to_geodataframe(data)
+    if file_format == "parquet":
+        gdf.to_parquet(file_path, index=False)
+    else:
+        gdf.to_file(file_path, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+    return file_path
+
+
+def export_timeline(in_json, output_path, output_name, file_format="parquet"):
+    """
+    Parse a Timeline export and write its point and line layers to binary files.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        output_path (str): The folder where the files will be saved.
+        output_name (str): The name used for the point_ and line_ output files.
+        file_format (str): "parquet" or "flatgeobuf".
+
+    Returns:
+        tuple: (path of the point file, path of the line file).
+    """
+    visits, paths = parse_timeline_columns(in_json)
+    return (
+        create_export_file(output_path, output_name, visits, True, file_format),
+        create_export_file(output_path, output_name, paths, False, file_format),
+    )
@@ -0,0 +1,208 @@
+"""The fetch module downloads Timeline exports over HTTP.
+
+All requests go through one pooled requests.Session with bounded retries and
+timeouts. Response bodies are streamed to the caller (usually the
+incremental JSON parser) while a copy is written to a local cache, and later
+requests for the same URL are revalidated with ETag/If-Modified-Since so that
+unchanged exports are not downloaded again. The downloaded copies share the
+size cap and least-recently-used eviction of the parse cache.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from .cache import DEFAULT_MAX_BYTES, evict_files, get_default_cache_dir
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (10, 60)
+DEFAULT_RETRIES = 3
+
+_SESSION = None
+
+
+def get_session(retries=DEFAULT_RETRIES, backoff_factor=0.5, pool_maxsize=10):
+    """
+    Get the shared HTTP session, creating it on first use.
+
+    Args:
+        retries (int): Number of retries on connection errors and 429/5xx responses.
+        backoff_factor (float): Exponential backoff factor between retries.
+        pool_maxsize (int): Maximum number of pooled connections per host.
+
+    Returns:
+        requests.Session: The session.
+    """
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_maxsize)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _SESSION = session
+    return _SESSION
+
+
+def get_http_cache_dir():
+    """
+    Get the default folder of downloaded exports.
+
+    Returns:
+        str: The "http" folder inside the parse cache folder.
+    """
+    return os.path.join(get_default_cache_dir(), "http")
+
+
+class _CachingReader:
+    """File-like reader over a streamed response that copies the body to a cache file."""
+
+    def __init__(self, response, cache_path, meta, max_bytes=DEFAULT_MAX_BYTES):
+        self.response = response
+        self.raw = response.raw
+        self.raw.decode_content = True
+        self.cache_path = cache_path
+        self.meta = meta
+        self.max_bytes = max_bytes
+        self.complete = False
+        fd, self.temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(cache_path), suffix=".tmp"
+        )
+        self.sink = os.fdopen(fd, "wb")
+
+    def read(self, size=-1):
+        if size == 0:
+            return b""
+        data = self.raw.read(size if size > 0 else None)
+        if data:
+            self.sink.write(data)
+        else:
+            self.complete = True
+        return data
+
+    def close(self):
+        if self.sink.closed:
+            return
+        self.sink.close()
+        self.response.close()
+        if not self.complete:
+            os.remove(self.temp_path)
+            return
+        # The old validators go first, so a crash before the new ones are in
+        # place leaves a copy that is downloaded again, never a stale ETag.
+        meta_path = self.cache_path + ".meta"
+        try:
+            os.remove(meta_path)
+        except FileNotFoundError:
+            pass
+        os.replace(self.temp_path, self.cache_path)
+        cache_dir = os.path.dirname(self.cache_path)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, meta_path)
+        evict_files(cache_dir, ".json", self.max_bytes, (".meta",))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _StreamReader:
+    """File-like reader over a streamed response, without caching."""
+
+    def __init__(self, response):
+        self.response = response
+        self.raw = response.raw
+        self.raw.decode_content = True
+
+    def read(self, size=-1):
+        if size == 0:
+            return b""
+        return self.raw.read(size if size > 0 else None)
+
+    def close(self):
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_url(
+    url,
+    cache_dir=None,
+    timeout=DEFAULT_TIMEOUT,
+    session=None,
+    max_bytes=DEFAULT_MAX_BYTES,
+):
+    """
+    Open a URL as a binary file-like object with a streamed body.
+
+    If a cached copy of the URL exists, the request carries its ETag and
+    Last-Modified values; a 304 response opens the cached copy instead of
+    downloading the body again. Otherwise the body is streamed to the caller
+    and saved to the cache once it has been read to the end, after which the
+    least recently used copies are evicted until the cache fits max_bytes.
+
+    Args:
+        url (str): The URL of the JSON document.
+        cache_dir (str or bool): Folder of the downloaded copies. Defaults to
+            get_http_cache_dir(); False disables caching.
+        timeout (float or tuple): Connect and read timeouts in seconds.
+        session (requests.Session): Session to use. Defaults to get_session().
+        max_bytes (int): Size cap of the downloaded copies in bytes.
+
+    Returns:
+        file-like: An object with read() and close(), usable as a context manager.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails.
+    """
+    session = session or get_session()
+    if cache_dir is False:
+        response = session.get(url, stream=True, timeout=timeout)
+        response.raise_for_status()
+        return _StreamReader(response)
+
+    cache_dir = cache_dir or get_http_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(
+        cache_dir, hashlib.sha256(url.encode("utf8")).hexdigest() + ".json"
+    )
+    headers = {}
+    meta = {}
+    if os.path.exists(cache_path) and os.path.exists(cache_path + ".meta"):
+        with open(cache_path + ".meta") as f:
+            meta = json.load(f)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = session.get(url, stream=True, timeout=timeout, headers=headers)
+    if response.status_code == 304 and headers:
+        response.close()
+        os.utime(cache_path)
+        return open(cache_path, "rb")
+    response.raise_for_status()
+    meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    return _CachingReader(response, cache_path, meta, max_bytes)
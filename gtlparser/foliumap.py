@@ -35,7 +35,7 @@ class Map(folium.Map):
 
     def add_vector(self, data, **kwargs):
         """
-        Adds vector data (GeoJSON/Shapefile) to the map.
+        Adds vector data (GeoJSON/Shapefile/FlatGeobuf/GeoParquet) to the map.
 
         Args:
             data (str or GeoDataFrame): The vector data to be added to the map.
@@ -48,7 +48,10 @@ class Map(folium.Map):
         import geopandas as gpd
 
         if isinstance(data, str):
-            gdf = gpd.read_file(data)
+            if data.endswith(".parquet"):
+                gdf = gpd.read_parquet(data)
+            else:
+                gdf = gpd.read_file(data)
             self.add_gdf(gdf, **kwargs)
         elif isinstance(data, gpd.GeoDataFrame):
             self.add_gdf(data, **kwargs)
@@ -124,6 +127,111 @@ class Map(folium.Map):
         geojson = gdf.__geo_interface__
         self.add_geojson(geojson, **kwargs)
 
+    def add_timeline_heatmap(
+        self,
+        data,
+        resolution=None,
+        bbox=None,
+        max_cells=512,
+        colormap="inferno",
+        opacity=0.7,
+        name="Timeline heatmap",
+        **kwargs,
+    ):
+        """
+        Adds a density raster of the visits and path vertices of a Timeline export.
+
+        The locations are binned into a grid before anything is sent to the
+        browser, so years of history are shown as one small image instead of
+        one feature per visit and path.
+
+        Args:
+            data (str, dict or tuple): Path or URL of the Timeline export, the
+                already loaded JSON data, or a (VisitColumns, PathColumns) tuple.
+            resolution (float): Width of a grid cell in degrees of longitude.
+            bbox (tuple): (min_lon, min_lat, max_lon, max_lat) extent of the grid.
+            max_cells (int): Cells along the longer side when resolution is None.
+            colormap (str): Name of a matplotlib colormap.
+            opacity (float): Opacity of the overlay (0.0 to 1.0).
+            name (str): Name of the layer.
+            **kwargs: Additional keyword arguments for heatmap.timeline_density.
+
+        Returns:
+            None: Adds the heatmap to the map.
+        """
+        from .heatmap import density_image, timeline_density
+
+        grid, (min_lon, min_lat, max_lon, max_lat) = timeline_density(
+            data, bbox=bbox, resolution=resolution, max_cells=max_cells, **kwargs
+        )
+        folium.raster_layers.ImageOverlay(
+            image=density_image(grid, colormap),
+            bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+            opacity=opacity,
+            name=name,
+        ).add_to(self)
+        self.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
+
+    def add_timeline_tiles(
+        self,
+        data,
+        min_zoom=2,
+        max_zoom=14,
+        layer_styles=None,
+        name="Timeline tiles",
+        port=0,
+        **kwargs,
+    ):
+        """
+        Adds the visits and paths of a Timeline export as a vector tile layer.
+
+        The export is written to an MBTiles file unless one is given, and the
+        tiles are served from a local tile server, so the map only loads the
+        tiles in view.
+
+        Args:
+            data (str, dict or tuple): An MBTiles file written by
+                tiles.write_mbtiles, or a Timeline export to write to one.
+            min_zoom (int): Lowest zoom level of the tiles.
+            max_zoom (int): Highest zoom level of the tiles; the map zooms
+                further in on the tiles of this level.
+            layer_styles (dict): Leaflet.VectorGrid styles of the "visits" and
+                "paths" layers.
+            name (str): Name of the layer.
+            port (int): Port of the tile server; 0 picks a free port.
+            **kwargs: Additional keyword arguments for tiles.write_mbtiles.
+
+        Returns:
+            TileServer: The tile server, which runs until it is stopped.
+        """
+        from folium.plugins import VectorGridProtobuf
+
+        from .tiles import TileServer, prepare_tiles
+
+        if layer_styles is None:
+            layer_styles = {
+                "visits": {
+                    "radius": 4,
+                    "color": "blue",
+                    "fillColor": "#3388ff",
+                    "fillOpacity": 0.8,
+                    "fill": True,
+                    "weight": 1,
+                },
+                "paths": {"color": "blue", "weight": 2, "opacity": 0.8},
+            }
+        file_path = prepare_tiles(data, min_zoom, max_zoom, **kwargs)
+        server = TileServer(file_path, port=port)
+        VectorGridProtobuf(
+            server.url,
+            name=name,
+            options={
+                "vectorTileLayerStyles": layer_styles,
+                "maxNativeZoom": max_zoom,
+            },
+        ).add_to(self)
+        return server
+
     def add_split_map(self, left="openstreetmap", right="cartodbpositron", **kwargs):
         """
         Adds a split map to the map.
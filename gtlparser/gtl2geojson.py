@@ -1,10 +1,12 @@
 from argparse import ArgumentParser
 import datetime
 from datetime import datetime
-import json
 import os
 from os.path import join as osjoin, splitext
-from geojson import Point, LineString, Feature, FeatureCollection, dump
+from geojson import Point, LineString, Feature, FeatureCollection, dumps
+
+from .decoders import decode_latlng, decode_timestamps
+from .simplify import simplify_mask
 
 
 def parse_point_latlong(subset_visit):
@@ -90,156 +92,931 @@ def parse_topCadidate_probability(subset_visit):
     return subset_visit["topCandidate"]["probability"]
 
 
-def read_json_from_url(url):
+SEGMENT_TYPES = ("visit", "timelinePath", "activity", "timelineMemory")
+
+
+def get_segment_type(item):
     """
-    Read JSON data from a URL.
+    Get the type of a semantic segment.
 
     Args:
-        url (str): The URL to read the JSON data from.
+        item (dict): A single entry of the semanticSegments list.
 
     Returns:
-        dict: The JSON data as a dictionary.
+        str: One of SEGMENT_TYPES, or None if the segment type is unknown.
     """
+    for segment_type in SEGMENT_TYPES:
+        if segment_type in item:
+            return segment_type
+    return None
 
-    import requests
-    import json
 
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed: {e}")
-        return None
-    except json.decoder.JSONDecodeError as e:
-        print(f"JSON Decode error: {e}")
+def iter_semanticSegments(in_json):
+    """
+    Iterate over the semanticSegments of a Timeline export in a single pass.
+
+    Local files and URLs are read with an incremental JSON parser (ijson), so
+    only one segment is held in memory at a time regardless of the file size.
+    URL bodies are streamed straight into the parser through fetch.open_url,
+    which also keeps a revalidated local copy of the download.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+
+    Yields:
+        tuple: (segment_type, item) where segment_type is one of SEGMENT_TYPES
+            (or None) and item is the segment dictionary.
+    """
+    if isinstance(in_json, dict):
+        items = in_json["semanticSegments"]
+    elif in_json.startswith("http://") or in_json.startswith("https://"):
+        items = _iter_json_items(in_json, "semanticSegments.item")
+    elif os.path.exists(in_json):
+        items = _iter_json_items(in_json, "semanticSegments.item")
+    else:
+        raise FileNotFoundError(f"Timeline file '{in_json}' not found.")
+
+    for item in items:
+        yield get_segment_type(item), item
+
+
+def _iter_json_items(in_json, prefix):
+    """
+    Incrementally read the items found under prefix in a JSON file or URL.
+
+    Args:
+        in_json (str): Path or URL of the JSON file.
+        prefix (str): ijson prefix of the items, e.g. "semanticSegments.item".
+
+    Yields:
+        dict: The parsed items, one at a time.
+    """
+    import ijson
+
+    if in_json.startswith("http://") or in_json.startswith("https://"):
+        from .fetch import open_url
+
+        f = open_url(in_json)
+    else:
+        f = open(in_json, "rb")
+    with f:
+        yield from ijson.items(f, prefix, use_float=True)
+
+
+def get_time_bound(value):
+    """
+    Convert a time filter bound to epoch milliseconds.
+
+    Args:
+        value (str, datetime or int): An ISO 8601 date or timestamp, a
+            datetime, or epoch milliseconds. Values without a UTC offset are
+            read as UTC.
+
+    Returns:
+        int: Milliseconds since the Unix epoch, or None if value is None.
+    """
+    if value is None:
         return None
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    if isinstance(value, str):
+        from .decoders import parse_timestamp
 
+        return parse_timestamp(value)[0]
+    return int(value)
 
-def parse_visitPoint(in_json, flag_allField=0):
+
+def compare_start_time(item, start=None, end=None):
     """
-    Parse the visit point from the json_data dictionary.
+    Locate the start time of a segment relative to a time window.
 
     Args:
-        json_data (dict): The JSON data containing the visit point information.
+        item (dict): The semantic segment.
+        start (int): Start of the window in epoch milliseconds, inclusive.
+        end (int): End of the window in epoch milliseconds, exclusive.
+
+    Returns:
+        int: -1 if the segment starts before start, 1 if it starts at or after
+            end, and 0 if it starts in the window.
+    """
+    from .decoders import parse_timestamp
+
+    return compare_time(parse_timestamp(item["startTime"])[0], start, end)
+
+
+def compare_time(epoch_ms, start=None, end=None):
+    """
+    Locate a time relative to a time window.
+
+    Args:
+        epoch_ms (int): The time in epoch milliseconds.
+        start (int): Start of the window in epoch milliseconds, inclusive.
+        end (int): End of the window in epoch milliseconds, exclusive.
+
+    Returns:
+        int: -1 if the time is before start, 1 if it is at or after end, and 0
+            if it is in the window.
+    """
+    if end is not None and epoch_ms >= end:
+        return 1
+    if start is not None and epoch_ms < start:
+        return -1
+    return 0
+
+
+def segment_in_bbox(segment_type, item, bbox):
+    """
+    Check whether a visit, timelinePath or activity segment lies in a bounding box.
+
+    Visits are tested by their top candidate location; paths are kept if any
+    of their vertices falls in the box, and activities if their start or end
+    does.
+
+    Args:
+        segment_type (str): The type of the segment, as returned by get_segment_type.
+        item (dict): The semantic segment.
+        bbox (tuple): (min lon, min lat, max lon, max lat).
+
+    Returns:
+        bool: True if the segment is in the box.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if segment_type == "visit":
+        lat, lon = parse_point_latlong(item["visit"])
+        return min_lon <= lon <= max_lon and min_lat <= lat <= max_lat
+    if segment_type in ("timelinePath", "activity"):
+        lat, lon = decode_latlng(_get_segment_latlngs(segment_type, item))
+        inside = (
+            (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        )
+        return bool(inside.any())
+    return True
+
+
+def filter_segments(segments, start=None, end=None, bbox=None, assume_sorted=False):
+    """
+    Keep the semantic segments that start in [start, end) and lie in a bounding box.
+
+    The start time is checked first, so segments outside the time window are
+    dropped before any of their coordinates or properties are decoded.
+
+    Args:
+        segments (iterable): (segment_type, item) pairs as yielded by iter_semanticSegments.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): The segments are sorted by startTime, so the
+            iteration stops at the first segment starting at or after end.
+
+    Yields:
+        tuple: The (segment_type, item) pairs that pass the filters.
+    """
+    start = get_time_bound(start)
+    end = get_time_bound(end)
+    for segment_type, item in segments:
+        if start is not None or end is not None:
+            position = compare_start_time(item, start, end)
+            if position > 0 and assume_sorted:
+                return
+            if position != 0:
+                continue
+        if bbox is not None and not segment_in_bbox(segment_type, item, bbox):
+            continue
+        yield segment_type, item
+
+
+def _get_segment_latlngs(segment_type, item):
+    """Get the "lat°, lng°" strings of the vertices of a path or activity segment."""
+    if segment_type == "timelinePath":
+        return [vertex["point"] for vertex in item["timelinePath"]]
+    activity = item["activity"]
+    return [activity["start"]["latLng"], activity["end"]["latLng"]]
+
+
+def _iter_filtered_segments(in_json, start, end, bbox, assume_sorted):
+    """Iterate over the segments of an export, through filter_segments if any filter is set."""
+    segments = iter_semanticSegments(in_json)
+    if start is None and end is None and bbox is None:
+        return segments
+    return filter_segments(segments, start, end, bbox, assume_sorted)
+
+
+def build_visitPoint_feature(item, flag_allField=0):
+    """
+    Build a point feature from a visit segment.
+
+    Args:
+        item (dict): The semantic segment containing the visit.
         flag_allField (int): Flag to indicate whether to include all fields in the output.
 
     Returns:
-        FeatureCollection: A collection of point features extracted from the JSON data.
+        Feature: The point feature of the visit.
     """
-    if in_json.startswith("http://") or in_json.startswith("https://"):
-        json_data = read_json_from_url(in_json)
-    elif os.path.exists(in_json):
-        json_data = json.loads(open(in_json, encoding="utf8").read())
+    temp_startTime = item.get("startTime")
+    temp_endTime = item.get("endTime")
+    subset_visit = item.get("visit")
+    temp_lat, temp_long = parse_point_latlong(subset_visit)
+    temp_point = Point((temp_long, temp_lat))
+    if flag_allField == 1:
+        point_output = {
+            "startTime": temp_startTime,
+            "endTime": temp_endTime,
+            "hierarchyLevel": parse_hierarchyLevel(subset_visit),
+            "probability": parse_probability(subset_visit),
+            "placeId": parse_topCadidate_placeId(subset_visit),
+            "semanticType": parse_topCadidate_semanticType(subset_visit),
+            "topCadidate_probability": parse_topCadidate_probability(subset_visit),
+        }
+    else:
+        point_output = {
+            "startTime": temp_startTime,
+            "endTime": temp_endTime,
+        }
+    return Feature(geometry=temp_point, properties=point_output)
+
+
+def build_timelinePath_feature(
+    item, flag_vertexTime=0, simplify=None, simplify_method="douglas-peucker"
+):
+    """
+    Build a line feature from a timelinePath segment.
+
+    Args:
+        item (dict): The semantic segment containing the timelinePath.
+        flag_vertexTime (int): Flag to indicate whether to include the time of
+            every vertex, in epoch milliseconds, as the "vertexTimes" property.
+        simplify (float): Simplify the line with this tolerance in metres; the
+            vertex count before simplification is kept as "originalVertexCount".
+        simplify_method (str): "douglas-peucker" or "visvalingam".
 
+    Returns:
+        Feature: The line feature of the path, or None if the path has fewer
+            than two points.
+    """
+    timeline_path = item["timelinePath"]
+    if len(timeline_path) < 2:
+        return None
+    latitude, longitude = decode_latlng([vertex["point"] for vertex in timeline_path])
+    line_output = {
+        "startTime": item.get("startTime"),
+        "endTime": item.get("endTime"),
+    }
+    if simplify is not None:
+        mask = simplify_mask(longitude, latitude, simplify, simplify_method)
+        longitude, latitude = longitude[mask], latitude[mask]
+    if flag_vertexTime == 1:
+        epoch_ms, _ = decode_timestamps([vertex["time"] for vertex in timeline_path])
+        if simplify is not None:
+            epoch_ms = epoch_ms[mask]
+        line_output["vertexTimes"] = epoch_ms.tolist()
+    if simplify is not None:
+        line_output["originalVertexCount"] = len(timeline_path)
+    return Feature(
+        geometry=LineString(list(zip(longitude.tolist(), latitude.tolist()))),
+        properties=line_output,
+    )
+
+
+def build_activity_feature(item):
+    """
+    Build a line feature from an activity segment.
+
+    The line joins the start and end locations of the activity; the route in
+    between is only recorded in the timelinePath segments.
+
+    Args:
+        item (dict): The semantic segment containing the activity.
+
+    Returns:
+        Feature: The line feature of the activity, with its start and end
+            times, activity type, probability and distance in metres.
+    """
+    activity = item["activity"]
+    latitude, longitude = decode_latlng(_get_segment_latlngs("activity", item))
+    top_candidate = activity.get("topCandidate", {})
+    line_output = {
+        "startTime": item.get("startTime"),
+        "endTime": item.get("endTime"),
+        "activityType": top_candidate.get("type"),
+        "probability": top_candidate.get("probability"),
+        "distanceMeters": activity.get("distanceMeters"),
+    }
+    return Feature(
+        geometry=LineString(list(zip(longitude.tolist(), latitude.tolist()))),
+        properties=line_output,
+    )
+
+
+def build_features(
+    segments,
+    flag_allField=0,
+    flag_vertexTime=0,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
+    """
+    Build the point and line features of a sequence of semantic segments.
+
+    Args:
+        segments (iterable): (segment_type, item) pairs as yielded by iter_semanticSegments.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        flag_vertexTime (int): Flag to indicate whether to include the vertex times in the line output.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        tuple: (list of point features, list of line features).
+    """
     point_features = []
-    for item in json_data["semanticSegments"]:
+    line_features = []
+    for segment_type, item in segments:
         try:
-            item_keys = list(
-                item.keys()
-            )  # visit, timelinePath, timelineMemory, activity
-            if "visit" in item_keys:
-                # print("processing point...")
-                temp_startTime = item.get("startTime")
-                temp_endTime = item.get("endTime")
-                subset_visit = item.get("visit")
-                temp_lat, temp_long = parse_point_latlong(subset_visit)
-                temp_point = Point((temp_long, temp_lat))
-                if flag_allField == 1:
-                    point_output = {
-                        "startTime": temp_startTime,
-                        "endTime": temp_endTime,
-                        "hierarchyLevel": parse_hierarchyLevel(subset_visit),
-                        "probability": parse_probability(subset_visit),
-                        "placeId": parse_topCadidate_placeId(subset_visit),
-                        "semanticType": parse_topCadidate_semanticType(subset_visit),
-                        "topCadidate_probability": parse_topCadidate_probability(
-                            subset_visit
-                        ),
-                    }
-                    point_features.append(
-                        Feature(geometry=temp_point, properties=point_output)
-                    )
-                else:
-                    point_output = {
-                        "startTime": temp_startTime,
-                        "endTime": temp_endTime,
-                    }
-                    point_features.append(
-                        Feature(geometry=temp_point, properties=point_output)
-                    )
+            if segment_type == "visit":
+                point_features.append(build_visitPoint_feature(item, flag_allField))
+            elif segment_type == "timelinePath":
+                line_feature = build_timelinePath_feature(
+                    item, flag_vertexTime, simplify, simplify_method
+                )
+                if line_feature is not None:
+                    line_features.append(line_feature)
         except Exception as e:
             raise Exception(e)
+    return point_features, line_features
+
+
+def _parse_features(
+    in_json,
+    segment_types,
+    flag_allField=0,
+    flag_vertexTime=0,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
+    """
+    Build the features of the selected segment types.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        segment_types (tuple): The segment types to build features for.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        flag_vertexTime (int): Flag to indicate whether to include the vertex times in the line output.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        tuple: (list of point features, list of line features).
+    """
+    segments = (
+        (segment_type, item)
+        for segment_type, item in iter_semanticSegments(in_json)
+        if segment_type in segment_types
+    )
+    if start is not None or end is not None or bbox is not None:
+        segments = filter_segments(segments, start, end, bbox, assume_sorted)
+    return build_features(
+        segments, flag_allField, flag_vertexTime, simplify, simplify_method
+    )
+
+
+def _load_cached_columns(in_json, cache, start=None, end=None, bbox=None):
+    """
+    Get the columnar tables of a local export from the parse cache.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        cache (bool or ParseCache): True for the default cache, or a ParseCache.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+
+    Returns:
+        tuple: (VisitColumns, PathColumns), or None if the input cannot be cached.
+    """
+    from .cache import get_cache
+
+    cache = get_cache(cache)
+    if cache is None or not isinstance(in_json, str) or not os.path.isfile(in_json):
+        return None
+    visits, paths = cache.load_columns(in_json)
+    if start is None and end is None and bbox is None:
+        return visits, paths
+    from .columnar import filter_columns
+
+    return filter_columns(
+        visits, paths, get_time_bound(start), get_time_bound(end), bbox
+    )
+
+
+def _simplify_features(feature_collection, simplify, simplify_method):
+    """Simplify the lines of a FeatureCollection built from cached tables."""
+    if simplify is None:
+        return feature_collection
+    from .simplify import simplify_feature
+
+    return FeatureCollection(
+        [
+            simplify_feature(feature, simplify, simplify_method)
+            for feature in feature_collection["features"]
+        ]
+    )
+
+
+def parse_timeline(
+    in_json,
+    flag_allField=0,
+    flag_vertexTime=0,
+    cache=None,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
+    """
+    Parse both the visit points and the timeline paths in one pass.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        flag_vertexTime (int): Flag to indicate whether to include the vertex times in the line output.
+        cache (bool or ParseCache): Read the parsed export from, and store it
+            in, an on-disk cache (True for the default one). Local files only.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        tuple: (FeatureCollection of points, FeatureCollection of lines).
+    """
+    columns = _load_cached_columns(in_json, cache, start, end, bbox)
+    if columns is not None:
+        visits, paths = columns
+        return (
+            visits.to_feature_collection(flag_allField),
+            _simplify_features(
+                paths.to_feature_collection(flag_vertexTime), simplify, simplify_method
+            ),
+        )
+    point_features, line_features = _parse_features(
+        in_json,
+        ("visit", "timelinePath"),
+        flag_allField=flag_allField,
+        flag_vertexTime=flag_vertexTime,
+        start=start,
+        end=end,
+        bbox=bbox,
+        assume_sorted=assume_sorted,
+        simplify=simplify,
+        simplify_method=simplify_method,
+    )
+    return FeatureCollection(point_features), FeatureCollection(line_features)
+
+
+def parse_visitPoint(
+    in_json,
+    flag_allField=0,
+    cache=None,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+):
+    """
+    Parse the visit point from the json_data dictionary.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        flag_allField (int): Flag to indicate whether to include all fields in the output.
+        cache (bool or ParseCache): Read the parsed export from, and store it
+            in, an on-disk cache (True for the default one). Local files only.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+
+    Returns:
+        FeatureCollection: A collection of point features extracted from the JSON data.
+    """
+    columns = _load_cached_columns(in_json, cache, start, end, bbox)
+    if columns is not None:
+        return columns[0].to_feature_collection(flag_allField)
+    point_features, _ = _parse_features(
+        in_json,
+        ("visit",),
+        flag_allField=flag_allField,
+        start=start,
+        end=end,
+        bbox=bbox,
+        assume_sorted=assume_sorted,
+    )
     feature_collection_point = FeatureCollection(point_features)
     return feature_collection_point
 
 
-def parse_timelinePath(in_json):
+def parse_timelinePath(
+    in_json,
+    flag_vertexTime=0,
+    cache=None,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
     """
     Parse the timeline path from the json_data dictionary.
 
     Args:
-        json_data (dict): The JSON data containing the timeline path information.
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        flag_vertexTime (int): Flag to indicate whether to include the time of
+            every vertex, in epoch milliseconds, as the "vertexTimes" property.
+        cache (bool or ParseCache): Read the parsed export from, and store it
+            in, an on-disk cache (True for the default one). Local files only.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
 
     Returns:
         FeatureCollection: A collection of line features extracted from the JSON data.
     """
-    if in_json.startswith("http://") or in_json.startswith("https://"):
-        json_data = read_json_from_url(in_json)
-    elif os.path.exists(in_json):
-        json_data = json.loads(open(in_json, encoding="utf8").read())
-
-    line_features = []
-    for item in json_data["semanticSegments"]:
-        try:
-            item_keys = list(
-                item.keys()
-            )  # visit, timelinePath, timelineMemory, activity
-            if "timelinePath" in item_keys:
-                temp_startTime = item.get("startTime")
-                temp_endTime = item.get("endTime")
-                list_points = []
-                for timeline_path in item["timelinePath"]:
-                    latitude, longitude = (
-                        timeline_path["point"].replace("°", "").split(", ")
-                    )
-                    time = datetime.strptime(
-                        timeline_path["time"], "%Y-%m-%dT%H:%M:%S.%f%z"
-                    )
-                    list_points.append((float(longitude), float(latitude)))
-                if len(list_points) > 1:
-                    temp_line = LineString(list_points)
-                    line_features.append(
-                        Feature(
-                            geometry=temp_line,
-                            properties={
-                                "startTime": temp_startTime,
-                                "endTime": temp_endTime,
-                            },
-                        )
-                    )
-        except Exception as e:
-            raise Exception(e)
+    columns = _load_cached_columns(in_json, cache, start, end, bbox)
+    if columns is not None:
+        return _simplify_features(
+            columns[1].to_feature_collection(flag_vertexTime),
+            simplify,
+            simplify_method,
+        )
+    _, line_features = _parse_features(
+        in_json,
+        ("timelinePath",),
+        flag_vertexTime=flag_vertexTime,
+        start=start,
+        end=end,
+        bbox=bbox,
+        assume_sorted=assume_sorted,
+        simplify=simplify,
+        simplify_method=simplify_method,
+    )
     feature_collection_line = FeatureCollection(line_features)
     return feature_collection_line
 
 
-def create_geojson_file(output_path, output_name, feature_collection, flag_point=True):
+def iter_visitPoint(
+    in_json, flag_allField=0, start=None, end=None, bbox=None, assume_sorted=False
+):
+    """
+    Iterate over the visit point features of a Timeline export.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        flag_allField (int): Flag to indicate whether to include all fields in the output.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+
+    Yields:
+        Feature: One point feature per visit, without holding the others in memory.
+    """
+    for segment_type, item in _iter_filtered_segments(
+        in_json, start, end, bbox, assume_sorted
+    ):
+        if segment_type == "visit":
+            try:
+                yield build_visitPoint_feature(item, flag_allField)
+            except Exception as e:
+                raise Exception(e)
+
+
+def iter_timelinePath(
+    in_json,
+    flag_vertexTime=0,
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
+    """
+    Iterate over the timeline path features of a Timeline export.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        flag_vertexTime (int): Flag to indicate whether to include the vertex times in the output.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
+
+    Yields:
+        Feature: One line feature per path with at least two points.
+    """
+    for segment_type, item in _iter_filtered_segments(
+        in_json, start, end, bbox, assume_sorted
+    ):
+        if segment_type == "timelinePath":
+            try:
+                line_feature = build_timelinePath_feature(
+                    item, flag_vertexTime, simplify, simplify_method
+                )
+            except Exception as e:
+                raise Exception(e)
+            if line_feature is not None:
+                yield line_feature
+
+
+def iter_activity(in_json, start=None, end=None, bbox=None, assume_sorted=False):
+    """
+    Iterate over the activity line features of a Timeline export.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+
+    Yields:
+        Feature: One line feature per activity, from its start to its end.
+    """
+    for segment_type, item in _iter_filtered_segments(
+        in_json, start, end, bbox, assume_sorted
+    ):
+        if segment_type == "activity":
+            try:
+                yield build_activity_feature(item)
+            except Exception as e:
+                raise Exception(e)
+
+
+def parse_activity(in_json, start=None, end=None, bbox=None, assume_sorted=False):
+    """
+    Parse the activity segments of a Timeline export.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+
+    Returns:
+        FeatureCollection: A collection of activity line features.
+    """
+    return FeatureCollection(
+        list(iter_activity(in_json, start, end, bbox, assume_sorted))
+    )
+
+
+GEOJSON_DRIVERS = {"GeoJSON": ".geojson", "GeoJSONSeq": ".geojsons"}
+
+
+def get_geojson_file_path(output_path, output_name, flag_point=True, driver="GeoJSON"):
+    """
+    Get the path of a point or line output file.
+
+    Args:
+        output_path (str): The folder of the output file.
+        output_name (str): The name of the output file.
+        flag_point (bool): Flag to indicate whether the features are points or lines.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+
+    Returns:
+        str: The file path, e.g. "<output_path>/point_<output_name>.geojson".
+    """
+    prefix = "point" if flag_point else "line"
+    return f"{output_path}/{prefix}_{output_name}{GEOJSON_DRIVERS[driver]}"
+
+
+def _reopen_features_array(file_path):
+    """
+    Remove the closing brackets of a FeatureCollection file written by FeatureWriter.
+
+    Returns:
+        bool: Whether the features array is empty.
+    """
+    with open(file_path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_start = max(0, size - 4096)
+        f.seek(tail_start)
+        tail = f.read()
+        close = tail.rfind(b"]")
+        if close < 0:
+            raise ValueError(f"'{file_path}' is not a GeoJSON FeatureCollection.")
+        f.truncate(tail_start + close)
+    return tail[:close].rstrip().endswith(b"[")
+
+
+class FeatureWriter:
+    """
+    Writes features to a file one at a time.
+
+    With the "GeoJSON" driver the file is a regular FeatureCollection; with
+    "GeoJSONSeq" it is a GeoJSON text sequence (RFC 8142), one record
+    separator prefixed feature per line. Only the current feature is held in
+    memory, and the file can be consumed while it is still being written.
+    """
+
+    def __init__(self, file_path, driver="GeoJSON", mode="w"):
+        """
+        Opens the output file.
+
+        Args:
+            file_path (str): Path of the output file.
+            driver (str): "GeoJSON" or "GeoJSONSeq".
+            mode (str): "w" to create the file, or "a" to append to it. The
+                features array of an existing FeatureCollection is reopened
+                in place, so the features before it are not rewritten.
+
+        Raises:
+            ValueError: If the driver is not supported, or an existing
+                GeoJSON file does not end with a features array.
+        """
+        if driver not in GEOJSON_DRIVERS:
+            raise ValueError(
+                f"Driver '{driver}' not supported, use one of {list(GEOJSON_DRIVERS)}."
+            )
+        if mode == "a" and not os.path.exists(file_path):
+            mode = "w"
+        self.driver = driver
+        self.count = 0
+        self._separator = ""
+        if mode == "a" and driver == "GeoJSON":
+            if not _reopen_features_array(file_path):
+                self._separator = ", "
+        self.file = open(file_path, mode)
+        if mode == "w" and driver == "GeoJSON":
+            self.file.write('{"type": "FeatureCollection", "features": [')
+
+    def write(self, feature):
+        """
+        Writes one feature.
+
+        Args:
+            feature (Feature or dict): The feature to write.
+        """
+        if self.driver == "GeoJSONSeq":
+            self.file.write("\x1e" + dumps(feature) + "\n")
+        else:
+            self.file.write(self._separator + dumps(feature))
+            self._separator = ", "
+        self.count += 1
+
+    def tell(self):
+        """
+        Get the byte offset of the end of the features written so far.
+
+        Returns:
+            int: The offset, e.g. for truncating the file back to it later.
+        """
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        """Finishes and closes the output file."""
+        if self.file.closed:
+            return
+        if self.driver == "GeoJSON":
+            self.file.write("]}")
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def create_geojson_file(
+    output_path, output_name, feature_collection, flag_point=True, driver="GeoJSON"
+):
     """
     Create a GeoJSON file from the feature collection.
 
+    Features are written one at a time, so feature_collection can also be a
+    generator such as iter_visitPoint, in which case the output is never held
+    in memory as a whole.
+
     Args:
         output_path (str): The path where the GeoJSON file will be saved.
         output_name (str): The name of the output GeoJSON file.
-        feature_collection (FeatureCollection): The feature collection to be saved.
+        feature_collection (FeatureCollection or iterable): The feature
+            collection, or any iterable of features, to be saved.
         flag_point (bool): Flag to indicate whether the features are points or lines.
+        driver (str): "GeoJSON" for a FeatureCollection file, or "GeoJSONSeq"
+            for a newline-delimited GeoJSON text sequence (.geojsons).
 
     Returns:
-        None
+        int: The number of features written.
     """
-    if flag_point:
-        with open(f"{output_path}/point_{output_name}.geojson", "w") as f:
-            dump(feature_collection, f)
-    else:
-        with open(f"{output_path}/line_{output_name}.geojson", "w") as f:
-            dump(feature_collection, f)
+    if isinstance(feature_collection, dict):
+        feature_collection = feature_collection["features"]
+    file_path = get_geojson_file_path(output_path, output_name, flag_point, driver)
+    with FeatureWriter(file_path, driver) as writer:
+        for feature in feature_collection:
+            writer.write(feature)
+    return writer.count
+
+
+def write_timeline(
+    in_json,
+    output_path,
+    output_name,
+    flag_allField=0,
+    flag_vertexTime=0,
+    driver="GeoJSON",
+    start=None,
+    end=None,
+    bbox=None,
+    assume_sorted=False,
+    simplify=None,
+    simplify_method="douglas-peucker",
+):
+    """
+    Stream the point and line layers of a Timeline export to files in one pass.
+
+    Each segment is read, converted and written before the next one is read,
+    so neither the export nor the outputs are ever held in memory.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        output_path (str): The folder where the files will be saved.
+        output_name (str): The name used for the point_ and line_ output files.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        flag_vertexTime (int): Flag to indicate whether to include the vertex times in the line output.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+        start (str, datetime or int): Keep segments starting at or after this time.
+        end (str, datetime or int): Keep segments starting before this time.
+        bbox (tuple): (min lon, min lat, max lon, max lat) of the segments to keep.
+        assume_sorted (bool): Stop reading at the first segment starting at or
+            after end, for exports sorted by startTime.
+        simplify (float): Simplify the lines with this tolerance in metres
+            before they are returned (see the simplify module).
+        simplify_method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        tuple: (number of points written, number of lines written).
+    """
+    point_file = get_geojson_file_path(output_path, output_name, True, driver)
+    line_file = get_geojson_file_path(output_path, output_name, False, driver)
+    with FeatureWriter(point_file, driver) as point_writer, FeatureWriter(
+        line_file, driver
+    ) as line_writer:
+        for segment_type, item in _iter_filtered_segments(
+            in_json, start, end, bbox, assume_sorted
+        ):
+            point_features, line_features = build_features(
+                [(segment_type, item)],
+                flag_allField,
+                flag_vertexTime,
+                simplify,
+                simplify_method,
+            )
+            for feature in point_features:
+                point_writer.write(feature)
+            for feature in line_features:
+                line_writer.write(feature)
+    return point_writer.count, line_writer.count
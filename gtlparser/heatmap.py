@@ -0,0 +1,226 @@
+"""The heatmap module aggregates Timeline locations into density rasters.
+
+Years of visits and paths are too many features for a web map, so the visit
+points and path vertices are binned into a grid with NumPy instead, and only
+the grid is sent to the browser: as a small PNG image overlay, or as the
+occupied cells. Rows are spaced evenly in Web Mercator, so the image lines
+up with the basemap at any latitude.
+"""
+
+import base64
+import io
+
+import numpy as np
+from geojson import Feature, FeatureCollection, Polygon
+
+# Latitude limit of the Web Mercator projection
+_MAX_LATITUDE = 85.05112878
+
+
+def _mercator_y(lat):
+    """Project latitudes in degrees to Web Mercator y in degrees."""
+    lat = np.radians(np.clip(lat, -_MAX_LATITUDE, _MAX_LATITUDE))
+    return np.degrees(np.log(np.tan(np.pi / 4 + lat / 2)))
+
+
+def _mercator_lat(y):
+    """Get the latitudes in degrees of Web Mercator y values in degrees."""
+    return np.degrees(2 * np.arctan(np.exp(np.radians(y))) - np.pi / 2)
+
+
+def density_grid(lon, lat, bbox=None, resolution=None, max_cells=512, weights=None):
+    """
+    Bin locations into a density grid.
+
+    Args:
+        lon, lat (ndarray): Locations in degrees.
+        bbox (tuple): (min_lon, min_lat, max_lon, max_lat) extent of the grid.
+            Defaults to the extent of the locations.
+        resolution (float): Width of a cell in degrees of longitude; cells are
+            square in Web Mercator. Defaults to the resolution that fits
+            max_cells cells along the longer side of the extent.
+        max_cells (int): Cells along the longer side when resolution is None.
+        weights (ndarray): Weight of every location. Defaults to 1.
+
+    Returns:
+        tuple: (grid, bbox) with the grid as a float64 array of rows from
+            north to south and columns from west to east, and the extent of
+            the grid as (min_lon, min_lat, max_lon, max_lat).
+
+    Raises:
+        ValueError: If there are no locations and no bbox.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if bbox is None:
+        if len(lon) == 0:
+            raise ValueError("No locations to bin and no bbox given.")
+        bbox = (lon.min(), lat.min(), lon.max(), lat.max())
+    min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox)
+    min_y, max_y = _mercator_y(min_lat), _mercator_y(max_lat)
+    # Widen a degenerate extent to one cell around the locations
+    if max_lon - min_lon <= 0:
+        min_lon, max_lon = min_lon - 1e-4, max_lon + 1e-4
+    if max_y - min_y <= 0:
+        min_y, max_y = min_y - 1e-4, max_y + 1e-4
+    if resolution is None:
+        resolution = max(max_lon - min_lon, max_y - min_y) / max_cells
+    columns = max(int(np.ceil((max_lon - min_lon) / resolution)), 1)
+    rows = max(int(np.ceil((max_y - min_y) / resolution)), 1)
+    max_lon = min_lon + columns * resolution
+    max_y = min_y + rows * resolution
+    grid, _, _ = np.histogram2d(
+        _mercator_y(lat),
+        lon,
+        bins=(rows, columns),
+        range=((min_y, max_y), (min_lon, max_lon)),
+        weights=weights,
+    )
+    return grid[::-1], (
+        min_lon,
+        float(_mercator_lat(min_y)),
+        max_lon,
+        float(_mercator_lat(max_y)),
+    )
+
+
+def timeline_density(
+    data,
+    bbox=None,
+    resolution=None,
+    max_cells=512,
+    visits=True,
+    paths=True,
+    start=None,
+    end=None,
+    cache=None,
+):
+    """
+    Bin the visit points and path vertices of a Timeline export into a density grid.
+
+    Args:
+        data (str, dict or tuple): Path or URL of the Timeline export, the
+            already loaded JSON data, or a (VisitColumns, PathColumns) tuple.
+        bbox (tuple): (min_lon, min_lat, max_lon, max_lat) extent of the grid;
+            locations outside it are not parsed. Defaults to the extent of
+            the locations.
+        resolution (float): Width of a cell in degrees of longitude.
+        max_cells (int): Cells along the longer side when resolution is None.
+        visits (bool): Whether to bin the visit points.
+        paths (bool): Whether to bin the path vertices.
+        start (str or int): Keep segments starting at or after this time;
+            segments that started earlier are dropped even if they end after it.
+        end (str or int): Keep segments starting before this time.
+        cache (ParseCache): Parse cache to load the tables from.
+
+    Returns:
+        tuple: (grid, bbox) as returned by density_grid.
+    """
+    from .columnar import filter_columns, parse_timeline_columns
+    from .gtl2geojson import get_time_bound
+
+    start = get_time_bound(start)
+    end = get_time_bound(end)
+    if isinstance(data, tuple):
+        visit_table, path_table = filter_columns(*data, start=start, end=end, bbox=bbox)
+    elif cache is not None:
+        visit_table, path_table = filter_columns(
+            *cache.load_columns(data), start=start, end=end, bbox=bbox
+        )
+    else:
+        visit_table, path_table = parse_timeline_columns(
+            data, start=start, end=end, bbox=bbox
+        )
+    tables = [
+        table for table, keep in ((visit_table, visits), (path_table, paths)) if keep
+    ]
+    return density_grid(
+        np.concatenate([table.lon for table in tables] + [np.empty(0)]),
+        np.concatenate([table.lat for table in tables] + [np.empty(0)]),
+        bbox,
+        resolution,
+        max_cells,
+    )
+
+
+def density_to_rgba(grid, colormap="inferno", log_scale=True):
+    """
+    Colour a density grid, with empty cells transparent.
+
+    Args:
+        grid (ndarray): The density grid.
+        colormap (str): Name of a matplotlib colormap.
+        log_scale (bool): Whether to colour the logarithm of the densities,
+            so that rarely visited places stay visible.
+
+    Returns:
+        ndarray: RGBA image of the grid (uint8, rows x columns x 4).
+    """
+    from matplotlib import colormaps
+
+    values = np.log1p(grid) if log_scale else np.asarray(grid, dtype=np.float64)
+    top = values.max() if values.size else 0
+    scaled = values / top if top > 0 else values
+    image = colormaps[colormap](scaled, bytes=True)
+    image[grid <= 0, 3] = 0
+    return image
+
+
+def density_image(grid, colormap="inferno", log_scale=True):
+    """
+    Encode a density grid as a PNG data URL for an image overlay.
+
+    Args:
+        grid (ndarray): The density grid.
+        colormap (str): Name of a matplotlib colormap.
+        log_scale (bool): Whether to colour the logarithm of the densities.
+
+    Returns:
+        str: The "data:image/png;base64,..." URL of the image.
+    """
+    from matplotlib.image import imsave
+
+    buffer = io.BytesIO()
+    imsave(buffer, density_to_rgba(grid, colormap, log_scale), format="png")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def density_cells(grid, bbox):
+    """
+    Convert the occupied cells of a density grid to polygon features.
+
+    Args:
+        grid (ndarray): The density grid.
+        bbox (tuple): The extent of the grid, as returned by density_grid.
+
+    Returns:
+        FeatureCollection: One square polygon per non-empty cell, with its
+            "count" property.
+    """
+    rows, columns = grid.shape
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lon_edges = np.linspace(min_lon, max_lon, columns + 1)
+    lat_edges = _mercator_lat(
+        np.linspace(_mercator_y(max_lat), _mercator_y(min_lat), rows + 1)
+    )
+    features = []
+    for row, column in zip(*np.nonzero(grid)):
+        west, east = float(lon_edges[column]), float(lon_edges[column + 1])
+        north, south = float(lat_edges[row]), float(lat_edges[row + 1])
+        features.append(
+            Feature(
+                geometry=Polygon(
+                    [
+                        [
+                            (west, south),
+                            (east, south),
+                            (east, north),
+                            (west, north),
+                            (west, south),
+                        ]
+                    ]
+                ),
+                properties={"count": float(grid[row, column])},
+            )
+        )
+    return FeatureCollection(features)
@@ -0,0 +1,247 @@
+"""The incremental module converts only the segments added since the last run.
+
+A small JSON state file records, for every source export, its size and
+modification time and the point where the next run resumes. Segments are
+streamed to the outputs as they are parsed, except for those that may still
+be growing, i.e. those ending at or after the latest startTime converted:
+they form the tail of the outputs. The next run truncates the outputs back to
+the byte offset where the tail starts, and parses and appends again every
+segment starting at or after the first startTime of the tail. Timeline
+exports are sorted by startTime, so the segments before it are skipped.
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+
+from .decoders import parse_timestamp
+from .gtl2geojson import (
+    FeatureWriter,
+    build_features,
+    get_geojson_file_path,
+    iter_semanticSegments,
+)
+
+STATE_FILE_NAME = ".gtlparser_state.json"
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 hash of a file.
+
+    Args:
+        file_path (str): Path of the file.
+        chunk_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(state_file):
+    """
+    Load the incremental conversion state.
+
+    Args:
+        state_file (str): Path of the state file.
+
+    Returns:
+        dict: The state, with one entry per source under "sources".
+    """
+    if not os.path.exists(state_file):
+        return {"version": 1, "sources": {}}
+    with open(state_file, encoding="utf8") as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    """
+    Save the incremental conversion state atomically.
+
+    Args:
+        state_file (str): Path of the state file.
+        state (dict): The state to save.
+    """
+    temp_file = state_file + ".tmp"
+    with open(temp_file, "w", encoding="utf8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_file, state_file)
+
+
+def append_geojson_features(file_path, features, driver="GeoJSON"):
+    """
+    Append features to a GeoJSON file without rewriting it.
+
+    GeoJSON text sequences are simply appended to. For FeatureCollection
+    files, the features array is reopened in place by FeatureWriter. If the
+    file does not exist yet, it is created.
+
+    Args:
+        file_path (str): Path of the GeoJSON file written by this package.
+        features (iterable): The features to append.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+
+    Raises:
+        ValueError: If the file does not end with a features array.
+    """
+    with FeatureWriter(file_path, driver, mode="a") as writer:
+        for feature in features:
+            writer.write(feature)
+
+
+def truncate_geojson_features(file_path, offset, driver="GeoJSON"):
+    """
+    Remove the features written after a byte offset of an output file.
+
+    Args:
+        file_path (str): Path of the GeoJSON file written by this package.
+        offset (int): Offset returned by FeatureWriter.tell before the
+            features were written.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+    """
+    with open(file_path, "r+b") as f:
+        f.truncate(offset)
+        if driver != "GeoJSONSeq":
+            f.seek(offset)
+            f.write(b"]}")
+
+
+def _pop_settled(tail, last_startTime):
+    """
+    Pop the segments at the front of the tail that can no longer grow.
+
+    A segment may still grow while it ends at or after the latest startTime.
+    Segments sharing a startTime leave the tail together, because the next
+    run resumes from a startTime.
+
+    Args:
+        tail (deque): (startTime, endTime, segment_type, item) tuples in
+            startTime order.
+        last_startTime (int): The latest startTime parsed so far.
+
+    Returns:
+        list: The (segment_type, item) pairs popped.
+    """
+    settled = []
+    while tail:
+        group_size = 1
+        while group_size < len(tail) and tail[group_size][0] == tail[0][0]:
+            group_size += 1
+        if any(tail[i][1] >= last_startTime for i in range(group_size)):
+            break
+        for _ in range(group_size):
+            _, _, segment_type, item = tail.popleft()
+            settled.append((segment_type, item))
+    return settled
+
+
+def _write_segments(writers, segments, flag_allField):
+    """Write the point and line features of segments to the point and line writers."""
+    for writer, features in zip(writers, build_features(segments, flag_allField)):
+        for feature in features:
+            writer.write(feature)
+
+
+def convert_incremental(
+    in_json,
+    output_path,
+    output_name,
+    state_file=None,
+    flag_allField=0,
+    driver="GeoJSON",
+):
+    """
+    Convert a Timeline export, processing only the segments added since the last run.
+
+    The segments that may still have been growing at the last run, such as
+    a timelinePath whose endTime moves on in the next export, are converted
+    again and replace their previous features. Only those are held in memory;
+    the other segments are written as they are parsed.
+
+    Args:
+        in_json (str): Path of the Timeline export.
+        output_path (str): The folder where the GeoJSON files are saved.
+        output_name (str): The name used for the point_ and line_ output files.
+        state_file (str): Path of the state file. Defaults to
+            STATE_FILE_NAME inside output_path.
+        flag_allField (int): Flag to indicate whether to include all fields in the point output.
+        driver (str): "GeoJSON" or "GeoJSONSeq".
+
+    Returns:
+        dict: Summary with the number of points and lines written, and
+            whether the source was skipped because it did not change.
+    """
+    if state_file is None:
+        state_file = os.path.join(output_path, STATE_FILE_NAME)
+    point_file = get_geojson_file_path(output_path, output_name, True, driver)
+    line_file = get_geojson_file_path(output_path, output_name, False, driver)
+
+    state = load_state(state_file)
+    source = os.path.abspath(in_json)
+    entry = state["sources"].get(source)
+    stat = os.stat(in_json)
+    outputs_exist = os.path.exists(point_file) and os.path.exists(line_file)
+    if (
+        not outputs_exist
+        or entry is None
+        or entry.get("output_name") != output_name
+        or entry.get("flag_allField") != flag_allField
+        or "resume_startTime" not in entry
+    ):
+        entry = None
+    if (
+        entry is not None
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return {"points": 0, "lines": 0, "skipped": True}
+
+    if entry is None:
+        resume_startTime = None
+        for file_path in (point_file, line_file):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+    else:
+        resume_startTime = entry["resume_startTime"]
+        truncate_geojson_features(point_file, entry["resume_offsets"][0], driver)
+        truncate_geojson_features(line_file, entry["resume_offsets"][1], driver)
+
+    tail = deque()
+    last_startTime = None
+    with FeatureWriter(point_file, driver, mode="a") as point_writer, FeatureWriter(
+        line_file, driver, mode="a"
+    ) as line_writer:
+        writers = (point_writer, line_writer)
+        for segment_type, item in iter_semanticSegments(in_json):
+            if segment_type not in ("visit", "timelinePath"):
+                continue
+            startTime, _ = parse_timestamp(item["startTime"])
+            if resume_startTime is not None and startTime < resume_startTime:
+                continue
+            endTime, _ = parse_timestamp(item["endTime"])
+            if last_startTime is None or startTime > last_startTime:
+                last_startTime = startTime
+            tail.append((startTime, endTime, segment_type, item))
+            _write_segments(writers, _pop_settled(tail, last_startTime), flag_allField)
+
+        if tail:
+            resume_startTime = tail[0][0]
+        resume_offsets = [writer.tell() for writer in writers]
+        _write_segments(writers, [(t, item) for _, _, t, item in tail], flag_allField)
+
+    state["sources"][source] = {
+        "output_name": output_name,
+        "flag_allField": flag_allField,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "resume_startTime": resume_startTime,
+        "resume_offsets": resume_offsets,
+    }
+    save_state(state_file, state)
+    return {"points": point_writer.count, "lines": line_writer.count, "skipped": False}
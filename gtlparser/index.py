@@ -0,0 +1,408 @@
+"""The index module answers time and space queries over parsed Timeline exports.
+
+A TimelineIndex is built from the VisitColumns and PathColumns tables. Visits
+and paths are sorted by start time, with the running maximum of their end
+times alongside, so time-window queries are two binary searches. Their
+locations are bucketed in a sorted loose grid, so bounding-box and
+nearest-visit queries only look at the cells they touch.
+The index is made of plain NumPy arrays and can be saved next to the parse
+cache.
+"""
+
+import numpy as np
+
+from .columnar import parse_timeline_columns
+from .gtl2geojson import get_time_bound
+from .metrics import EARTH_RADIUS, haversine
+
+# Metres per degree of latitude
+_METRES_PER_DEGREE = np.pi * EARTH_RADIUS / 180
+
+
+class _Grid:
+    """
+    Sorted loose grid of bounding boxes, queried with binary searches.
+
+    Every box is registered once, in the cell holding its centre, at the
+    level whose cells are at least as large as the box: the cells of level l
+    are cell_size * 2**l degrees wide. Queries widen their box by half a cell
+    at every level, so a long path or one spanning the antimeridian costs one
+    entry like a short one.
+    """
+
+    # Keys of level l start at l * _LEVEL_STRIDE
+    _LEVEL_STRIDE = 1 << 40
+
+    def __init__(self, cell_size, keys, rows):
+        """
+        Initializes the grid from its sorted cell entries.
+
+        Args:
+            cell_size (float): Size of the level 0 cells in degrees.
+            keys (ndarray): Sorted cell key of every entry (int64).
+            rows (ndarray): Table row of every entry (int64).
+        """
+        self.cell_size = float(cell_size)
+        self.keys = keys
+        self.rows = rows
+        if keys is not None:
+            self.levels = np.unique(keys // self._LEVEL_STRIDE).tolist()
+
+    @classmethod
+    def build(cls, cell_size, min_lon, min_lat, max_lon, max_lat):
+        """
+        Build a grid where every box is registered by its centre.
+
+        Args:
+            cell_size (float): Size of the level 0 cells in degrees.
+            min_lon, min_lat, max_lon, max_lat (ndarray): The boxes.
+
+        Returns:
+            _Grid: The grid.
+        """
+        grid = cls(cell_size, None, None)
+        extent = np.maximum(max_lon - min_lon, max_lat - min_lat)
+        level = np.ceil(np.log2(np.maximum(extent / grid.cell_size, 1)))
+        level = level.astype(np.int64)
+        keys = np.empty(len(level), dtype=np.int64)
+        for value in np.unique(level):
+            selected = level == value
+            x, y = grid.cell(
+                (min_lon[selected] + max_lon[selected]) / 2,
+                (min_lat[selected] + max_lat[selected]) / 2,
+                value,
+            )
+            keys[selected] = value * cls._LEVEL_STRIDE + y * grid.columns(value) + x
+        order = np.argsort(keys, kind="stable")
+        grid.keys = keys[order]
+        grid.rows = order.astype(np.int64)
+        grid.levels = np.unique(level).tolist()
+        return grid
+
+    def columns(self, level):
+        """Get the number of cell columns of a level."""
+        return int(np.ceil(360 / (self.cell_size * 2.0**level))) + 1
+
+    def cell(self, lon, lat, level=0):
+        """Get the (column, row) cell coordinates of positions at a level."""
+        size = self.cell_size * 2.0**level
+        x = np.floor((np.asarray(lon) + 180) / size).astype(np.int64)
+        y = np.floor((np.asarray(lat) + 90) / size).astype(np.int64)
+        # Positions off the globe, e.g. paths without vertices, go to the edges
+        columns = self.columns(level)
+        return np.clip(x, 0, columns - 1), np.clip(y, 0, columns // 2)
+
+    def query(self, bbox):
+        """
+        Get the rows registered in the cells where boxes overlapping a box can be.
+
+        Args:
+            bbox (tuple): (min lon, min lat, max lon, max lat).
+
+        Returns:
+            ndarray: Sorted unique rows.
+        """
+        runs = []
+        for level in self.levels:
+            pad = self.cell_size * 2.0**level / 2
+            x0, y0 = self.cell(bbox[0] - pad, bbox[1] - pad, level)
+            x1, y1 = self.cell(bbox[2] + pad, bbox[3] + pad, level)
+            # Each grid row of the box is one contiguous run of keys
+            row_keys = level * self._LEVEL_STRIDE + np.arange(
+                y0, y1 + 1, dtype=np.int64
+            ) * self.columns(level)
+            lower = np.searchsorted(self.keys, row_keys + x0, side="left")
+            upper = np.searchsorted(self.keys, row_keys + x1, side="right")
+            runs.extend(self.rows[i:j] for i, j in zip(lower, upper))
+        if not runs:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(runs))
+
+
+class TimelineIndex:
+    """
+    Time and spatial index over the visits and paths of a Timeline export.
+
+    Query methods return row numbers of the visits and paths tables, which
+    can be passed to VisitColumns.select and PathColumns.select.
+    """
+
+    def __init__(self, visits, paths, cell_size=0.01, path_cell_size=0.1):
+        """
+        Builds the index.
+
+        Args:
+            visits (VisitColumns): The visit table.
+            paths (PathColumns): The path table.
+            cell_size (float): Grid cell size of the visit index in degrees.
+            path_cell_size (float): Grid cell size of the path index in degrees.
+        """
+        self.visits = visits
+        self.paths = paths
+
+        self.visit_order = np.argsort(visits.start_time, kind="stable")
+        self.visit_start = visits.start_time[self.visit_order]
+        self.visit_end_max = _running_end_max(visits, self.visit_order)
+        self.path_order = np.argsort(paths.start_time, kind="stable")
+        self.path_start = paths.start_time[self.path_order]
+        self.path_end_max = _running_end_max(paths, self.path_order)
+
+        self.visit_grid = _Grid.build(
+            cell_size, visits.lon, visits.lat, visits.lon, visits.lat
+        )
+        self.path_bounds = _path_bounds(paths)
+        self.path_grid = _Grid.build(path_cell_size, *self.path_bounds)
+
+    @classmethod
+    def from_timeline(cls, in_json, cache=None, **kwargs):
+        """
+        Parse a Timeline export and index it.
+
+        Args:
+            in_json (str or dict): Path or URL of the Timeline export, or the
+                already loaded JSON data.
+            cache (bool or ParseCache): Read the index from, and store it in,
+                an on-disk cache (True for the default one). Local files only.
+            **kwargs: Keyword arguments of TimelineIndex.
+
+        Returns:
+            TimelineIndex: The index.
+        """
+        import os
+
+        from .cache import get_cache
+
+        cache = get_cache(cache)
+        if cache is not None and isinstance(in_json, str) and os.path.isfile(in_json):
+            return cache.load_index(in_json, **kwargs)
+        return cls(*parse_timeline_columns(in_json), **kwargs)
+
+    def query_time(self, start=None, end=None):
+        """
+        Find the visits and paths that overlap a time window.
+
+        Args:
+            start (str, datetime or int): Start of the window, inclusive.
+            end (str, datetime or int): End of the window, exclusive.
+
+        Returns:
+            tuple: (visit rows, path rows), sorted by start time.
+        """
+        start = get_time_bound(start)
+        end = get_time_bound(end)
+        return (
+            _query_intervals(
+                self.visit_order,
+                self.visit_start,
+                self.visit_end_max,
+                self.visits.end_time,
+                start,
+                end,
+            ),
+            _query_intervals(
+                self.path_order,
+                self.path_start,
+                self.path_end_max,
+                self.paths.end_time,
+                start,
+                end,
+            ),
+        )
+
+    def query_bbox(self, bbox):
+        """
+        Find the visits inside, and the paths whose bounds intersect, a box.
+
+        Args:
+            bbox (tuple): (min lon, min lat, max lon, max lat).
+
+        Returns:
+            tuple: (visit rows, path rows), in table order.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        visit_rows = self.visit_grid.query(bbox)
+        lon, lat = self.visits.lon[visit_rows], self.visits.lat[visit_rows]
+        visit_rows = visit_rows[
+            (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        ]
+        path_rows = self.path_grid.query(bbox)
+        bounds = [bound[path_rows] for bound in self.path_bounds]
+        path_rows = path_rows[
+            (bounds[0] <= max_lon)
+            & (bounds[2] >= min_lon)
+            & (bounds[1] <= max_lat)
+            & (bounds[3] >= min_lat)
+        ]
+        return visit_rows, path_rows
+
+    def visits_within(self, lon, lat, radius):
+        """
+        Find the visits within a distance of a position.
+
+        Args:
+            lon, lat (float): The position in degrees.
+            radius (float): The distance in metres.
+
+        Returns:
+            tuple: (visit rows, distances in metres), nearest first.
+        """
+        dlat = radius / _METRES_PER_DEGREE
+        dlon = dlat / max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+        rows, _ = self.query_bbox((lon - dlon, lat - dlat, lon + dlon, lat + dlat))
+        distances = haversine(lon, lat, self.visits.lon[rows], self.visits.lat[rows])
+        keep = distances <= radius
+        order = np.argsort(distances[keep], kind="stable")
+        return rows[keep][order], distances[keep][order]
+
+    def nearest_visits(self, lon, lat, k=1):
+        """
+        Find the k visits nearest to a position.
+
+        The search radius starts at one grid cell and doubles until k visits
+        are found, so only the cells around the position are scanned.
+
+        Args:
+            lon, lat (float): The position in degrees.
+            k (int): Number of visits to return.
+
+        Returns:
+            tuple: (visit rows, distances in metres), nearest first.
+        """
+        k = min(k, len(self.visits))
+        radius = self.visit_grid.cell_size * _METRES_PER_DEGREE
+        while radius < np.pi * EARTH_RADIUS:
+            rows, distances = self.visits_within(lon, lat, radius)
+            if len(rows) >= k:
+                return rows[:k], distances[:k]
+            radius *= 2
+        rows = np.arange(len(self.visits))
+        distances = haversine(lon, lat, self.visits.lon, self.visits.lat)
+        order = np.argsort(distances, kind="stable")[:k]
+        return rows[order], distances[order]
+
+    def to_arrays(self):
+        """
+        Get the arrays of the index, without the tables.
+
+        Returns:
+            dict: Arrays named "index_<field>" that from_arrays reads back.
+        """
+        return {
+            "index_visit_order": self.visit_order,
+            "index_path_order": self.path_order,
+            "index_cell_sizes": np.array(
+                [self.visit_grid.cell_size, self.path_grid.cell_size]
+            ),
+            "index_visit_keys": self.visit_grid.keys,
+            "index_visit_rows": self.visit_grid.rows,
+            "index_path_keys": self.path_grid.keys,
+            "index_path_rows": self.path_grid.rows,
+        }
+
+    @classmethod
+    def from_arrays(cls, visits, paths, arrays):
+        """
+        Rebuild an index from its tables and the arrays of to_arrays, without re-sorting.
+
+        Args:
+            visits (VisitColumns): The visit table.
+            paths (PathColumns): The path table.
+            arrays (dict): The arrays returned by to_arrays.
+
+        Returns:
+            TimelineIndex: The index.
+        """
+        index = cls.__new__(cls)
+        index.visits = visits
+        index.paths = paths
+        index.visit_order = arrays["index_visit_order"]
+        index.visit_start = visits.start_time[index.visit_order]
+        index.visit_end_max = _running_end_max(visits, index.visit_order)
+        index.path_order = arrays["index_path_order"]
+        index.path_start = paths.start_time[index.path_order]
+        index.path_end_max = _running_end_max(paths, index.path_order)
+        visit_cell_size, path_cell_size = arrays["index_cell_sizes"]
+        index.visit_grid = _Grid(
+            visit_cell_size, arrays["index_visit_keys"], arrays["index_visit_rows"]
+        )
+        index.path_bounds = _path_bounds(paths)
+        index.path_grid = _Grid(
+            path_cell_size, arrays["index_path_keys"], arrays["index_path_rows"]
+        )
+        return index
+
+    def save(self, file_path):
+        """
+        Save the index and its tables to a NumPy .npz file.
+
+        Args:
+            file_path (str): Path of the output file.
+        """
+        from .cache import columns_to_arrays
+
+        arrays = columns_to_arrays(self.visits, self.paths)
+        arrays.update(self.to_arrays())
+        np.savez(file_path, **arrays)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        Load an index saved with save.
+
+        Args:
+            file_path (str): Path of the .npz file.
+
+        Returns:
+            TimelineIndex: The index.
+        """
+        from .cache import columns_from_arrays
+
+        with np.load(file_path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls.from_arrays(*columns_from_arrays(arrays), arrays)
+
+
+def _running_end_max(table, order):
+    """Get the running maximum of the end times of a table, in start time order."""
+    if len(table) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.maximum.accumulate(table.end_time[order])
+
+
+def _path_bounds(paths):
+    """Get the (min lon, min lat, max lon, max lat) arrays of the paths."""
+    starts = paths.offsets[:-1]
+    bounds = []
+    for reduce, coordinates in (
+        (np.minimum, paths.lon),
+        (np.minimum, paths.lat),
+        (np.maximum, paths.lon),
+        (np.maximum, paths.lat),
+    ):
+        bound = np.full(len(paths), np.nan)
+        filled = paths.vertex_count > 0
+        if filled.any():
+            bound[filled] = reduce.reduceat(coordinates, starts[filled])
+        bounds.append(bound)
+    # Paths without vertices are never returned by bbox queries
+    return [np.nan_to_num(bound, nan=1e9) for bound in bounds]
+
+
+def _query_intervals(order, sorted_start, end_max, end_time, start, end):
+    """
+    Find the intervals overlapping [start, end) with binary searches.
+
+    The running maximum of the end times only grows, so the intervals before
+    the first one where it passes start all end before the window, and the
+    candidates are one contiguous run of the sorted starts. A long interval
+    only widens the queries that start before it ends.
+
+    Returns:
+        ndarray: The table rows of the overlapping intervals, sorted by start.
+    """
+    lower = 0 if start is None else np.searchsorted(end_max, start, side="right")
+    upper = len(sorted_start) if end is None else np.searchsorted(sorted_start, end)
+    rows = order[lower:upper]
+    if start is not None:
+        rows = rows[end_time[rows] > start]
+    return rows
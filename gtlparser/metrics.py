@@ -0,0 +1,137 @@
+"""The metrics module computes distances, durations and speeds of Timeline segments.
+
+Every function works on a whole columnar table at once with NumPy, so the
+metrics of a multi-year export are computed without a Python loop over
+its rows or vertices.
+"""
+
+import numpy as np
+
+EARTH_RADIUS = 6371008.8
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Compute great-circle distances.
+
+    Args:
+        lon1, lat1 (float or ndarray): First positions in degrees.
+        lon2, lat2 (float or ndarray): Second positions in degrees.
+
+    Returns:
+        ndarray: Distances in metres.
+    """
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _speed(distance, duration):
+    """Divide distances by durations, with NaN where the duration is not positive."""
+    speed = np.full(len(distance), np.nan)
+    moving = duration > 0
+    speed[moving] = distance[moving] / duration[moving]
+    return speed
+
+
+def path_vertex_metrics(paths):
+    """
+    Compute the step from the previous vertex for every vertex of a path table.
+
+    The first vertex of each path has a zero distance and duration and a NaN
+    speed.
+
+    Args:
+        paths (PathColumns): The path table.
+
+    Returns:
+        dict: "distance" in metres, "duration" in seconds and "speed" in
+            metres per second, one float64 value per vertex.
+    """
+    n = len(paths.lon)
+    distance = np.zeros(n)
+    duration = np.zeros(n)
+    if n > 1:
+        distance[1:] = haversine(
+            paths.lon[:-1], paths.lat[:-1], paths.lon[1:], paths.lat[1:]
+        )
+        duration[1:] = np.diff(paths.time) / 1000
+    # Steps across two paths are not steps
+    first = paths.offsets[:-1][paths.vertex_count > 0]
+    distance[first] = 0
+    duration[first] = 0
+    speed = _speed(distance, duration)
+    speed[first] = np.nan
+    return {"distance": distance, "duration": duration, "speed": speed}
+
+
+def path_metrics(paths):
+    """
+    Compute the length, duration and average speed of every path of a table.
+
+    Args:
+        paths (PathColumns): The path table.
+
+    Returns:
+        dict: "distance" in metres along the vertices, "duration" in seconds
+            from the segment start to end, and "speed" in metres per second,
+            one float64 value per path.
+    """
+    steps = path_vertex_metrics(paths)["distance"]
+    cumulative = np.concatenate(([0.0], np.cumsum(steps)))
+    distance = cumulative[paths.offsets[1:]] - cumulative[paths.offsets[:-1]]
+    duration = (paths.end_time - paths.start_time) / 1000
+    return {
+        "distance": distance,
+        "duration": duration,
+        "speed": _speed(distance, duration),
+    }
+
+
+def activity_metrics(activities):
+    """
+    Compute the distance, duration and average speed of every activity of a table.
+
+    Args:
+        activities (ActivityColumns): The activity table.
+
+    Returns:
+        dict: "distance" in metres as reported by Timeline (the straight-line
+            distance where it is missing), "straight_distance" in metres from
+            start to end, "duration" in seconds and "speed" in metres per
+            second, one float64 value per activity.
+    """
+    straight_distance = haversine(
+        activities.start_lon,
+        activities.start_lat,
+        activities.end_lon,
+        activities.end_lat,
+    )
+    distance = np.where(
+        np.isnan(activities.distance_meters),
+        straight_distance,
+        activities.distance_meters,
+    )
+    duration = (activities.end_time - activities.start_time) / 1000
+    return {
+        "distance": distance,
+        "straight_distance": straight_distance,
+        "duration": duration,
+        "speed": _speed(distance, duration),
+    }
+
+
+def visit_metrics(visits):
+    """
+    Compute the duration of every visit of a table.
+
+    Args:
+        visits (VisitColumns): The visit table.
+
+    Returns:
+        dict: "duration" in seconds, one float64 value per visit.
+    """
+    return {"duration": (visits.end_time - visits.start_time) / 1000}
@@ -0,0 +1,403 @@
+"""The places module clusters visits into significant places.
+
+The same physical place shows up in a Timeline export with jittered visit
+locations, and often with an UNKNOWN semantic type. The visits are clustered
+with DBSCAN in metres, accelerated by a uniform grid whose cells are
+eps / sqrt(2) wide: the points of a cell are all within eps of each other,
+so cells holding min_samples points are core without a distance check, and
+neighbourhoods only look at the 5 x 5 surrounding cells. No pairwise
+distance matrix of the whole table is built, so hundreds of thousands of
+visits are clustered in seconds. Each cluster is summarized as a place with
+its visit count, total dwell time and first and last seen times.
+"""
+
+import numpy as np
+from geojson import Feature, FeatureCollection, Point
+
+from .columnar import _as_mask, parse_timeline_columns
+from .decoders import format_timestamp
+
+# Metres per degree of latitude on the mean Earth sphere
+_METRES_PER_DEGREE = 111194.93
+# Rows of a cell compared at once with its neighbourhood
+_BLOCK_SIZE = 1024
+# Points facing each other compared before two core cells are fully compared
+_PROBE_SIZE = 64
+# Point pairs expanded at once from pairs of grid cells
+_PAIR_CHUNK = 1 << 22
+
+
+class PlaceColumns:
+    """
+    Columnar table of significant places.
+
+    Attributes:
+        lon, lat (ndarray): Mean location of the visits to the place (float64).
+        visit_count (ndarray): Number of visits to the place (int64).
+        dwell_time (ndarray): Total duration of the visits in seconds (float64).
+        first_seen, last_seen (ndarray): Start of the first visit and end of
+            the last visit in epoch milliseconds (int64).
+        first_offset, last_offset (ndarray): Their UTC offsets in minutes (int16).
+        place_id (ndarray): Most frequent placeId of the visits, "" if none (str).
+    """
+
+    fields = (
+        "lon",
+        "lat",
+        "visit_count",
+        "dwell_time",
+        "first_seen",
+        "last_seen",
+        "first_offset",
+        "last_offset",
+        "place_id",
+    )
+
+    def __init__(self, **columns):
+        """
+        Initializes the table from one array per field.
+
+        Args:
+            **columns: One array-like per name in PlaceColumns.fields.
+        """
+        for field in self.fields:
+            setattr(self, field, np.asarray(columns[field]))
+
+    def __len__(self):
+        return len(self.lon)
+
+    def select(self, mask):
+        """
+        Get the rows of the table selected by a boolean mask.
+
+        Args:
+            mask (ndarray): One boolean per place, or the rows to keep.
+
+        Returns:
+            PlaceColumns: A new table with the selected places, in table order.
+        """
+        mask = _as_mask(mask, len(self))
+        return PlaceColumns(
+            **{field: getattr(self, field)[mask] for field in self.fields}
+        )
+
+    def to_features(self):
+        """
+        Build point features from the table.
+
+        Yields:
+            Feature: One point feature per place.
+        """
+        for i in range(len(self)):
+            yield Feature(
+                geometry=Point((float(self.lon[i]), float(self.lat[i]))),
+                properties={
+                    "placeId": str(self.place_id[i]),
+                    "visitCount": int(self.visit_count[i]),
+                    "dwellTimeSeconds": float(self.dwell_time[i]),
+                    "firstSeen": format_timestamp(
+                        self.first_seen[i], self.first_offset[i]
+                    ),
+                    "lastSeen": format_timestamp(
+                        self.last_seen[i], self.last_offset[i]
+                    ),
+                },
+            )
+
+    def to_feature_collection(self):
+        """
+        Convert the table to a point FeatureCollection.
+
+        Returns:
+            FeatureCollection: One point feature per place.
+        """
+        return FeatureCollection(list(self.to_features()))
+
+
+def _neighbour_cells(cell_keys, columns):
+    """
+    Pair every occupied grid cell with the occupied cells of its 5 x 5 neighbourhood.
+
+    Returns:
+        tuple: (cells, neighbours) arrays of cell indices, sorted by cell.
+    """
+    cells, neighbours = [], []
+    for dx in range(-2, 3):
+        for dy in range(-2, 3):
+            target = cell_keys + dx * columns + dy
+            found = np.searchsorted(cell_keys, target)
+            found[found == len(cell_keys)] = 0
+            hit = cell_keys[found] == target
+            cells.append(np.flatnonzero(hit))
+            neighbours.append(found[hit])
+    cells = np.concatenate(cells)
+    neighbours = np.concatenate(neighbours)
+    order = np.argsort(cells, kind="stable")
+    return cells[order], neighbours[order]
+
+
+def _point_pairs(first_cells, second_cells, cell_start, cell_count):
+    """
+    Expand pairs of grid cells to the pairs of their points, in bounded chunks.
+
+    Yields:
+        tuple: (cell pair index, first point, second point) arrays.
+    """
+    size = cell_count[first_cells] * cell_count[second_cells]
+    end = np.cumsum(size)
+    chunk_start = 0
+    while chunk_start < len(size):
+        limit = (end[chunk_start - 1] if chunk_start else 0) + _PAIR_CHUNK
+        chunk_stop = max(int(np.searchsorted(end, limit, "right")), chunk_start + 1)
+        chunk = np.arange(chunk_start, chunk_stop)
+        chunk_size = size[chunk]
+        pair = np.repeat(chunk, chunk_size)
+        local = np.arange(chunk_size.sum()) - np.repeat(
+            np.cumsum(chunk_size) - chunk_size, chunk_size
+        )
+        width = cell_count[second_cells][pair]
+        yield (
+            pair,
+            cell_start[first_cells][pair] + local // width,
+            cell_start[second_cells][pair] + local % width,
+        )
+        chunk_start = chunk_stop
+
+
+def grid_dbscan(x, y, eps, min_samples=2):
+    """
+    Cluster points with DBSCAN, using a grid instead of a distance matrix.
+
+    Args:
+        x, y (ndarray): Projected point coordinates in metres.
+        eps (float): Neighbourhood radius in metres.
+        min_samples (int): Points within eps, the point included, that make
+            a point a core point.
+
+    Returns:
+        ndarray: Cluster label of every point (int64), numbered from 0 in
+            order of first point, and -1 for noise.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+    limit = eps * eps
+    size = eps / np.sqrt(2)
+    cx = np.floor((x - x.min()) / size).astype(np.int64)
+    cy = np.floor((y - y.min()) / size).astype(np.int64)
+    # Neighbour keys two rows off the edges must not alias occupied cells
+    columns = int(cy.max()) + 3
+    key = cx * columns + cy
+    order = np.argsort(key, kind="stable")
+    xs, ys = x[order], y[order]
+    cell_keys, cell_start, cell_count = np.unique(
+        key[order], return_index=True, return_counts=True
+    )
+    cell_stop = cell_start + cell_count
+    cells, neighbours = _neighbour_cells(cell_keys, columns)
+
+    def within(rows, others):
+        dx = xs[rows] - xs[others]
+        dy = ys[rows] - ys[others]
+        return dx * dx + dy * dy <= limit
+
+    # Core points: every point of a full cell, otherwise count the neighbours
+    core = np.repeat(cell_count >= min_samples, cell_count)
+    sparse = cell_count < min_samples
+    neighbour_count = np.zeros(n, dtype=np.int64)
+    for _, rows, others in _point_pairs(
+        cells[sparse[cells]], neighbours[sparse[cells]], cell_start, cell_count
+    ):
+        neighbour_count += np.bincount(rows, within(rows, others), n).astype(np.int64)
+    core[~core] = neighbour_count[~core] >= min_samples
+
+    # Connect the core cells that hold two core points within eps
+    core_count = np.add.reduceat(core.astype(np.int64), cell_start)
+    core_cell = core_count > 0
+    pair = (cells < neighbours) & core_cell[cells] & core_cell[neighbours]
+    a, b = cells[pair], neighbours[pair]
+    # Bounding boxes of the core points settle most pairs without a loop
+    box = [
+        reduce.reduceat(np.where(core, values, fill), cell_start)
+        for reduce, values, fill in (
+            (np.minimum, xs, np.inf),
+            (np.minimum, ys, np.inf),
+            (np.maximum, xs, -np.inf),
+            (np.maximum, ys, -np.inf),
+        )
+    ]
+    gap_x = np.maximum(0, np.maximum(box[0][b] - box[2][a], box[0][a] - box[2][b]))
+    gap_y = np.maximum(0, np.maximum(box[1][b] - box[3][a], box[1][a] - box[3][b]))
+    span_x = np.maximum(box[2][a], box[2][b]) - np.minimum(box[0][a], box[0][b])
+    span_y = np.maximum(box[3][a], box[3][b]) - np.minimum(box[1][a], box[1][b])
+    connected = span_x * span_x + span_y * span_y <= limit
+    unsure = ~connected & (gap_x * gap_x + gap_y * gap_y <= limit)
+    small = unsure & (core_count[a] * core_count[b] <= _BLOCK_SIZE)
+    for k, rows, others in _point_pairs(a[small], b[small], cell_start, cell_count):
+        hit = within(rows, others) & core[rows] & core[others]
+        connected[np.flatnonzero(small)[np.unique(k[hit])]] = True
+    for k in np.flatnonzero(unsure & ~small):
+        rows = np.arange(cell_start[a[k]], cell_stop[a[k]])
+        rows = rows[core[rows]]
+        others = np.arange(cell_start[b[k]], cell_stop[b[k]])
+        others = others[core[others]]
+        # Try the points facing the other cell first, most pairs connect there
+        rows = rows[
+            np.argsort(
+                np.abs(xs[rows] - xs[others].mean())
+                + np.abs(ys[rows] - ys[others].mean())
+            )
+        ]
+        others = others[
+            np.argsort(
+                np.abs(xs[others] - xs[rows].mean())
+                + np.abs(ys[others] - ys[rows].mean())
+            )
+        ]
+        if within(rows[:_PROBE_SIZE, None], others[:_PROBE_SIZE]).any():
+            connected[k] = True
+            continue
+        for first in range(0, len(rows), _BLOCK_SIZE):
+            if within(rows[first : first + _BLOCK_SIZE, None], others).any():
+                connected[k] = True
+                break
+    a, b = a[connected], b[connected]
+
+    # Connected components of the cell graph by label propagation
+    component = np.arange(len(cell_keys))
+    while True:
+        update = component.copy()
+        np.minimum.at(update, a, component[b])
+        np.minimum.at(update, b, component[a])
+        update = update[update]
+        if np.array_equal(update, component):
+            break
+        component = update
+
+    sorted_labels = np.full(n, -1, dtype=np.int64)
+    point_cell = np.repeat(np.arange(len(cell_keys)), cell_count)
+    sorted_labels[core] = component[point_cell[core]]
+    # Border points join the cluster of their nearest core point
+    border_cell = core_count < cell_count
+    best = np.full(n, np.inf)
+    for _, rows, others in _point_pairs(
+        cells[border_cell[cells]],
+        neighbours[border_cell[cells]],
+        cell_start,
+        cell_count,
+    ):
+        keep = ~core[rows] & core[others] & within(rows, others)
+        rows, others = rows[keep], others[keep]
+        distance = (xs[rows] - xs[others]) ** 2 + (ys[rows] - ys[others]) ** 2
+        nearest = np.lexsort((distance, rows))
+        rows, others = rows[nearest], others[nearest]
+        distance = distance[nearest]
+        first = np.concatenate(([True], rows[1:] != rows[:-1]))
+        closer = first & (distance < best[rows])
+        best[rows[closer]] = distance[closer]
+        sorted_labels[rows[closer]] = sorted_labels[others[closer]]
+
+    labels[order] = sorted_labels
+    clustered = labels >= 0
+    if clustered.any():
+        components, first_index, inverse = np.unique(
+            labels[clustered], return_index=True, return_inverse=True
+        )
+        rank = np.empty(len(components), dtype=np.int64)
+        rank[np.argsort(first_index, kind="stable")] = np.arange(len(components))
+        labels[clustered] = rank[inverse]
+    return labels
+
+
+def _most_frequent(labels, values, count):
+    """Get the most frequent non-empty value of every label, "" if none."""
+    result = np.full(count, "", dtype=object)
+    present = values != ""
+    if not present.any():
+        return result
+    codes, inverse = np.unique(values[present], return_inverse=True)
+    pairs, frequency = np.unique(
+        labels[present] * len(codes) + inverse, return_counts=True
+    )
+    # Sort by label, then by descending frequency, and keep the first of each label
+    order = np.lexsort((-frequency, pairs // len(codes)))
+    pairs = pairs[order]
+    label = pairs // len(codes)
+    first = np.concatenate(([True], label[1:] != label[:-1]))
+    result[label[first]] = codes[pairs[first] % len(codes)]
+    return result
+
+
+def cluster_places(visits, eps=100.0, min_samples=2):
+    """
+    Cluster the visits of a table into significant places.
+
+    Args:
+        visits (VisitColumns or StayColumns): The visits to cluster; stay
+            points from the stays module can be clustered the same way.
+        eps (float): Neighbourhood radius in metres.
+        min_samples (int): Visits within eps, the visit included, that make
+            a visit a core point.
+
+    Returns:
+        tuple: (PlaceColumns of the places, place label of every visit, -1
+            for visits outside any place).
+    """
+    lat = np.asarray(visits.lat, dtype=np.float64)
+    y = lat * _METRES_PER_DEGREE
+    x = visits.lon * np.cos(np.radians(lat)) * _METRES_PER_DEGREE
+    labels = grid_dbscan(x, y, eps, min_samples)
+    count = int(labels.max()) + 1 if len(labels) else 0
+
+    clustered = np.flatnonzero(labels >= 0)
+    label = labels[clustered]
+    visit_count = np.bincount(label, minlength=count)
+    duration = (visits.end_time - visits.start_time) / 1000
+    # The earliest start and the latest end of every place, with their offsets
+    by_start = clustered[np.lexsort((visits.start_time[clustered], label))]
+    by_end = clustered[np.lexsort((visits.end_time[clustered], label))]
+    first_row = by_start[np.searchsorted(labels[by_start], np.arange(count))]
+    last_row = by_end[np.searchsorted(labels[by_end], np.arange(count), "right") - 1]
+    place_id = getattr(visits, "place_id", None)
+    if place_id is None:
+        place_id = np.full(count, "", dtype=object)
+    else:
+        place_id = _most_frequent(label, np.asarray(place_id)[clustered], count)
+    places = PlaceColumns(
+        lon=np.bincount(label, visits.lon[clustered], count)
+        / np.maximum(visit_count, 1),
+        lat=np.bincount(label, lat[clustered], count) / np.maximum(visit_count, 1),
+        visit_count=visit_count,
+        dwell_time=np.bincount(label, duration[clustered], count),
+        first_seen=visits.start_time[first_row],
+        last_seen=visits.end_time[last_row],
+        first_offset=visits.start_offset[first_row],
+        last_offset=visits.end_offset[last_row],
+        place_id=place_id.astype(str),
+    )
+    return places, labels
+
+
+def find_places(in_json, eps=100.0, min_samples=2, cache=None):
+    """
+    Find the significant places of a Timeline export from its visits.
+
+    Args:
+        in_json (str or dict): Path or URL of the Timeline export, or the
+            already loaded JSON data.
+        eps (float): Neighbourhood radius in metres.
+        min_samples (int): Visits within eps, the visit included, that make
+            a visit a core point.
+        cache (ParseCache): Parse cache to load the visit table from.
+
+    Returns:
+        tuple: (PlaceColumns of the places, place label of every visit).
+    """
+    if cache is not None:
+        visits, _ = cache.load_columns(in_json)
+    else:
+        visits, _ = parse_timeline_columns(in_json)
+    return cluster_places(visits, eps, min_samples)
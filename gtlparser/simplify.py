@@ -0,0 +1,320 @@
+"""The simplify module reduces the vertices of timelinePath lines.
+
+Paths recorded by Google Timeline keep one vertex every few seconds, far more
+than a map needs. The functions in this module drop the vertices that do not
+change the shape of a line by more than a tolerance in metres, with the
+Douglas-Peucker or the Visvalingam-Whyatt algorithm, and can produce one
+simplified layer per web map zoom level.
+"""
+
+import heapq
+
+import numpy as np
+
+SIMPLIFY_METHODS = ("douglas-peucker", "visvalingam")
+
+# Metres per degree of latitude on the mean Earth sphere
+_METRES_PER_DEGREE = 111194.93
+# Ground resolution of a 256 px web map tile at zoom 0 on the equator
+_METRES_PER_PIXEL_Z0 = 156543.03
+
+
+def _project(lon, lat):
+    """Project coordinates to local metres around their mean latitude."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    scale = np.cos(np.radians(lat.mean())) if len(lat) else 1.0
+    return lon * scale * _METRES_PER_DEGREE, lat * _METRES_PER_DEGREE
+
+
+def douglas_peucker_mask(x, y, tolerance):
+    """
+    Select the vertices kept by the Douglas-Peucker algorithm.
+
+    The recursion is run with an explicit stack, and the distances of all
+    the vertices of a span to its chord are computed at once.
+
+    Args:
+        x, y (ndarray): Projected vertex coordinates in metres.
+        tolerance (float): Maximum distance in metres of a dropped vertex to the line.
+
+    Returns:
+        ndarray: One boolean per vertex, True for the kept vertices.
+    """
+    n = len(x)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distance = np.abs(px * dy - py * dx) / length
+        else:
+            distance = np.hypot(px, py)
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def visvalingam_mask(x, y, tolerance):
+    """
+    Select the vertices kept by the Visvalingam-Whyatt algorithm.
+
+    Vertices are removed in order of the area of the triangle they form with
+    their neighbours, until every remaining triangle is at least
+    tolerance ** 2 square metres.
+
+    Args:
+        x, y (ndarray): Projected vertex coordinates in metres.
+        tolerance (float): Square root of the minimum effective area in metres.
+
+    Returns:
+        ndarray: One boolean per vertex, True for the kept vertices.
+    """
+    n = len(x)
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep
+    min_area = tolerance**2
+    area = np.empty(n)
+    area[0] = area[-1] = np.inf
+    area[1:-1] = 0.5 * np.abs(
+        (x[:-2] - x[2:]) * (y[1:-1] - y[:-2]) - (x[:-2] - x[1:-1]) * (y[2:] - y[:-2])
+    )
+    previous = np.arange(-1, n - 1)
+    following = np.arange(1, n + 1)
+    heap = [(area[i], i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+
+    def triangle(i):
+        a, c = previous[i], following[i]
+        return 0.5 * abs((x[a] - x[c]) * (y[i] - y[a]) - (x[a] - x[i]) * (y[c] - y[a]))
+
+    while heap:
+        value, i = heapq.heappop(heap)
+        if not keep[i] or value != area[i]:
+            continue
+        if value >= min_area:
+            break
+        keep[i] = False
+        a, c = previous[i], following[i]
+        following[a] = c
+        previous[c] = a
+        for j in (a, c):
+            if 0 < j < n - 1:
+                # An effective area never drops below the last removed one
+                area[j] = max(triangle(j), value)
+                heapq.heappush(heap, (area[j], j))
+    return keep
+
+
+def simplify_mask(lon, lat, tolerance, method="douglas-peucker"):
+    """
+    Select the vertices of a line that survive simplification.
+
+    Args:
+        lon, lat (ndarray): Vertex coordinates in degrees.
+        tolerance (float): Tolerance in metres.
+        method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        ndarray: One boolean per vertex, True for the kept vertices.
+
+    Raises:
+        ValueError: If the method is not supported.
+    """
+    if method not in SIMPLIFY_METHODS:
+        raise ValueError(
+            f"Method '{method}' not supported, use one of {list(SIMPLIFY_METHODS)}."
+        )
+    x, y = _project(lon, lat)
+    if method == "douglas-peucker":
+        return douglas_peucker_mask(x, y, tolerance)
+    return visvalingam_mask(x, y, tolerance)
+
+
+def simplify_feature(feature, tolerance, method="douglas-peucker"):
+    """
+    Simplify the geometry of a line feature built by the gtl2geojson parsers.
+
+    The "vertexTimes" property, if present, is reduced to the kept vertices,
+    and the "originalVertexCount" property records the vertex count before
+    simplification.
+
+    Args:
+        feature (Feature): The line feature.
+        tolerance (float): Tolerance in metres.
+        method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        Feature: A new feature with the simplified line.
+    """
+    from geojson import Feature, LineString
+
+    coordinates = np.asarray(feature["geometry"]["coordinates"], dtype=np.float64)
+    mask = simplify_mask(coordinates[:, 0], coordinates[:, 1], tolerance, method)
+    properties = dict(feature["properties"])
+    if "vertexTimes" in properties:
+        properties["vertexTimes"] = np.asarray(properties["vertexTimes"])[mask].tolist()
+    properties.setdefault("originalVertexCount", len(coordinates))
+    return Feature(
+        geometry=LineString([tuple(point) for point in coordinates[mask].tolist()]),
+        properties=properties,
+    )
+
+
+def simplify_paths(paths, tolerance, method="douglas-peucker"):
+    """
+    Simplify every path of a PathColumns table.
+
+    Args:
+        paths (PathColumns): The path table.
+        tolerance (float): Tolerance in metres.
+        method (str): "douglas-peucker" or "visvalingam".
+
+    Returns:
+        PathColumns: A new table with the kept vertices and their times.
+    """
+    from .columnar import PathColumns
+
+    mask = np.zeros(len(paths.lon), dtype=bool)
+    offsets = paths.offsets
+    for i in range(len(paths)):
+        start, stop = offsets[i], offsets[i + 1]
+        mask[start:stop] = simplify_mask(
+            paths.lon[start:stop], paths.lat[start:stop], tolerance, method
+        )
+    kept = np.concatenate(([0], np.cumsum(mask)))
+    new_offsets = kept[offsets].astype(np.int64)
+    columns = {field: getattr(paths, field) for field in PathColumns.fields}
+    columns.update(
+        offsets=new_offsets,
+        lon=paths.lon[mask],
+        lat=paths.lat[mask],
+        time=paths.time[mask],
+    )
+    return PathColumns(**columns)
+
+
+def zoom_tolerance(zoom, latitude=0.0, pixels=1.0):
+    """
+    Get the simplification tolerance matching a web map zoom level.
+
+    Args:
+        zoom (int): The zoom level of 256 px tiles.
+        latitude (float): Latitude in degrees of the area shown.
+        pixels (float): Tolerance in screen pixels.
+
+    Returns:
+        float: Tolerance in metres.
+    """
+    return pixels * _METRES_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2**zoom
+
+
+def simplify_multiresolution(
+    paths, zooms=(6, 9, 12, 15), method="douglas-peucker", pixels=1.0
+):
+    """
+    Simplify a path table once per zoom level.
+
+    The tolerance of each level is the ground size of `pixels` screen pixels
+    at the mean latitude of the paths, so every level looks the same as the
+    full-resolution lines at its zoom.
+
+    Args:
+        paths (PathColumns): The path table.
+        zooms (tuple): The zoom levels.
+        method (str): "douglas-peucker" or "visvalingam".
+        pixels (float): Tolerance in screen pixels.
+
+    Returns:
+        dict: Maps each zoom level to its simplified PathColumns table.
+    """
+    latitude = float(paths.lat.mean()) if len(paths.lat) else 0.0
+    return {
+        zoom: simplify_paths(paths, zoom_tolerance(zoom, latitude, pixels), method)
+        for zoom in zooms
+    }
+
+
+def simplify_features_multiresolution(
+    features, zooms=(6, 9, 12, 15), method="douglas-peucker", pixels=1.0
+):
+    """
+    Simplify line features once per zoom level, as simplify_multiresolution does for tables.
+
+    Args:
+        features (FeatureCollection or list): The line features.
+        zooms (tuple): The zoom levels.
+        method (str): "douglas-peucker" or "visvalingam".
+        pixels (float): Tolerance in screen pixels.
+
+    Returns:
+        dict: Maps each zoom level to its list of simplified features.
+    """
+    if isinstance(features, dict):
+        features = features["features"]
+    latitudes = [
+        point[1] for feature in features for point in feature["geometry"]["coordinates"]
+    ]
+    latitude = float(np.mean(latitudes)) if latitudes else 0.0
+    return {
+        zoom: [
+            simplify_feature(feature, zoom_tolerance(zoom, latitude, pixels), method)
+            for feature in features
+        ]
+        for zoom in zooms
+    }
+
+
+def vertex_reduction_ratio(original_count, simplified_count):
+    """
+    Get the share of vertices removed by simplification.
+
+    Args:
+        original_count (int): Number of vertices before simplification.
+        simplified_count (int): Number of vertices after simplification.
+
+    Returns:
+        float: The removed share, from 0 (nothing removed) to 1.
+    """
+    if original_count == 0:
+        return 0.0
+    return 1 - simplified_count / original_count
+
+
+def get_vertex_reduction(features):
+    """
+    Get the vertex reduction of line features simplified in the parse pipeline.
+
+    Args:
+        features (FeatureCollection or iterable): Line features with the
+            "originalVertexCount" property.
+
+    Returns:
+        tuple: (original vertex count, simplified vertex count, reduction ratio).
+    """
+    if isinstance(features, dict):
+        features = features["features"]
+    original_count = simplified_count = 0
+    for feature in features:
+        simplified_count += len(feature["geometry"]["coordinates"])
+        original_count += feature["properties"].get(
+            "originalVertexCount", len(feature["geometry"]["coordinates"])
+        )
+    return (
+        original_count,
+        simplified_count,
+        vertex_reduction_ratio(original_count, simplified_count),
+    )
@@ -0,0 +1,262 @@
+"""The stays module derives stay points and trips from timelinePath vertices.
+
+Google's visit segments are sometimes missing or coarse, so stays can be
+re-derived from the recorded path vertices instead. A stay is a run of
+consecutive vertices that all lie within a distance of the first one and
+span at least a minimum duration; the vertices between two stays form a
+trip. The detection is a single forward scan over the time-sorted vertex
+arrays of a PathColumns table, and the stays and trips are aggregated with
+NumPy, so multi-million-vertex histories are segmented in seconds.
+"""
+
+import numpy as np
+from geojson import Feature, FeatureCollection, Point
+
+from .columnar import PathColumns, _as_mask, parse_timeline_columns
+from .decoders import format_timestamp
+
+# Metres per degree of latitude on the mean Earth sphere
+_METRES_PER_DEGREE = 111194.93
+
+
+class StayColumns:
+    """
+    Columnar table of stay points.
+
+    Attributes:
+        lon, lat (ndarray): Mean location of the stay vertices (float64).
+        start_time, end_time (ndarray): Epoch milliseconds (int64).
+        start_offset, end_offset (ndarray): UTC offsets in minutes (int16).
+        vertex_count (ndarray): Number of vertices in the stay (int64).
+    """
+
+    fields = (
+        "lon",
+        "lat",
+        "start_time",
+        "end_time",
+        "start_offset",
+        "end_offset",
+        "vertex_count",
+    )
+
+    def __init__(self, **columns):
+        """
+        Initializes the table from one array per field.
+
+        Args:
+            **columns: One array-like per name in StayColumns.fields.
+        """
+        for field in self.fields:
+            setattr(self, field, np.asarray(columns[field]))
+
+    def __len__(self):
+        return len(self.lon)
+
+    def select(self, mask):
+        """
+        Get the rows of the table selected by a boolean mask.
+
+        Args:
+            mask (ndarray): One boolean per stay, or the rows to keep.
+
+        Returns:
+            StayColumns: A new table with the selected stays, in table order.
+        """
+        mask = _as_mask(mask, len(self))
+        return StayColumns(
+            **{field: getattr(self, field)[mask] for field in self.fields}
+        )
+
+    def to_features(self):
+        """
+        Build point features from the table.
+
+        Yields:
+            Feature: One point feature per stay, with its start and end times,
+                duration in seconds and vertex count.
+        """
+        for i in range(len(self)):
+            yield Feature(
+                geometry=Point((float(self.lon[i]), float(self.lat[i]))),
+                properties={
+                    "startTime": format_timestamp(
+                        self.start_time[i], self.start_offset[i]
+                    ),
+                    "endTime": format_timestamp(self.end_time[i], self.end_offset[i]),
+                    "durationSeconds": (self.end_time[i] - self.start_time[i]) / 1000,
+                    "vertexCount": int(self.vertex_count[i]),
+                },
+            )
+
+    def to_feature_collection(self):
+        """
+        Convert the table to a point FeatureCollection.
+
+        Returns:
+            FeatureCollection: One point feature per stay.
+        """
+        return FeatureCollection(list(self.to_features()))
+
+
+def _sorted_vertices(paths):
+    """
+    Get the vertices of a path table sorted by time, with the UTC offset of their path.
+
+    Returns:
+        tuple: (lon, lat, time, offset) arrays.
+    """
+    offset = np.repeat(paths.start_offset, paths.vertex_count)
+    order = np.argsort(paths.time, kind="stable")
+    return paths.lon[order], paths.lat[order], paths.time[order], offset[order]
+
+
+def _scan_stays(x, y, t, distance, duration, max_gap):
+    """
+    Find the vertex runs that form stays in one forward scan.
+
+    From an anchor vertex, the run grows while the next vertex is within
+    distance of the anchor (and, if max_gap is set, follows the previous one
+    within max_gap). A run lasting at least duration is a stay and the scan
+    resumes after it; otherwise the anchor moves to the last vertex of the
+    run. Anchors never move backwards, so every vertex is visited at most
+    twice.
+
+    Args:
+        x, y (list): Projected vertex coordinates in metres.
+        t (list): Vertex times in milliseconds.
+        distance (float): Stay radius in metres.
+        duration (float): Minimum stay duration in milliseconds.
+        max_gap (float): Maximum time between two vertices of a stay in
+            milliseconds, or None.
+
+    Returns:
+        list: (first, stop) vertex index pairs of the stays.
+    """
+    n = len(x)
+    limit = distance * distance
+    stays = []
+    i = 0
+    while i < n - 1:
+        xi, yi = x[i], y[i]
+        j = i + 1
+        while j < n:
+            dx, dy = x[j] - xi, y[j] - yi
+            if dx * dx + dy * dy > limit:
+                break
+            if max_gap is not None and t[j] - t[j - 1] > max_gap:
+                break
+            j += 1
+        if t[j - 1] - t[i] >= duration:
+            stays.append((i, j))
+            i = j
+        else:
+            i = max(i + 1, j - 1)
+    return stays
+
+
+def detect_stays(paths, distance=200.0, duration=1200.0, max_gap=None):
+    """
+    Detect stay points in the vertices of a path table.
+
+    Args:
+        paths (PathColumns): The path table, e.g. from parse_timeline_columns.
+        distance (float): Stay radius in metres.
+        duration (float): Minimum stay duration in seconds.
+        max_gap (float): Maximum time in seconds between two vertices of a
+            stay, or None for no limit.
+
+    Returns:
+        tuple: (StayColumns of the stays, list of the (first, stop) indices
+            of their vertices in time order).
+    """
+    lon, lat, time, offset = _sorted_vertices(paths)
+    y = lat * _METRES_PER_DEGREE
+    x = lon * np.cos(np.radians(lat)) * _METRES_PER_DEGREE
+    runs = _scan_stays(
+        x.tolist(),
+        y.tolist(),
+        time.tolist(),
+        distance,
+        duration * 1000,
+        None if max_gap is None else max_gap * 1000,
+    )
+    first = np.array([run[0] for run in runs], dtype=np.int64)
+    stop = np.array([run[1] for run in runs], dtype=np.int64)
+    count = stop - first
+    cumulative_lon = np.concatenate(([0.0], np.cumsum(lon)))
+    cumulative_lat = np.concatenate(([0.0], np.cumsum(lat)))
+    mean_lon = (cumulative_lon[stop] - cumulative_lon[first]) / np.maximum(count, 1)
+    mean_lat = (cumulative_lat[stop] - cumulative_lat[first]) / np.maximum(count, 1)
+    stays = StayColumns(
+        lon=mean_lon,
+        lat=mean_lat,
+        start_time=time[first],
+        end_time=time[stop - 1],
+        start_offset=offset[first],
+        end_offset=offset[stop - 1],
+        vertex_count=count,
+    )
+    return stays, runs
+
+
+def segment_trips(paths, runs):
+    """
+    Build the trips between consecutive stays.
+
+    Each trip runs from the last vertex of a stay to the first vertex of the
+    next one; the vertices before the first stay and after the last one
+    form trips too. Trips with fewer than two vertices are dropped.
+
+    Args:
+        paths (PathColumns): The path table the stays were detected in.
+        runs (list): The (first, stop) vertex indices returned by detect_stays.
+
+    Returns:
+        PathColumns: One row per trip, numbered in segment_id.
+    """
+    lon, lat, time, offset = _sorted_vertices(paths)
+    n = len(time)
+    first = np.array([0] + [stop - 1 for _, stop in runs], dtype=np.int64)
+    last = np.array([start for start, _ in runs] + [n - 1], dtype=np.int64)
+    keep = last - first >= 1
+    first, last = first[keep], last[keep]
+    count = last - first + 1
+    # Vertex indices of all trips back to back
+    vertices = np.repeat(first - np.concatenate(([0], np.cumsum(count)[:-1])), count)
+    vertices += np.arange(count.sum(), dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(count))).astype(np.int64)
+    return PathColumns(
+        segment_id=np.arange(len(first), dtype=np.int64),
+        start_time=time[first],
+        end_time=time[last],
+        start_offset=offset[first],
+        end_offset=offset[last],
+        offsets=offsets,
+        lon=lon[vertices],
+        lat=lat[vertices],
+        time=time[vertices],
+    )
+
+
+def segment_timeline(in_json, distance=200.0, duration=1200.0, max_gap=None):
+    """
+    Detect the stay points and trips of a Timeline export.
+
+    Args:
+        in_json (str, dict or PathColumns): Path or URL of the Timeline
+            export, the already loaded JSON data, or a parsed path table.
+        distance (float): Stay radius in metres.
+        duration (float): Minimum stay duration in seconds.
+        max_gap (float): Maximum time in seconds between two vertices of a
+            stay, or None for no limit.
+
+    Returns:
+        tuple: (StayColumns of the stays, PathColumns of the trips).
+    """
+    if isinstance(in_json, PathColumns):
+        paths = in_json
+    else:
+        _, paths = parse_timeline_columns(in_json)
+    stays, runs = detect_stays(paths, distance, duration, max_gap)
+    return stays, segment_trips(paths, runs)
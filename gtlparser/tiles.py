@@ -0,0 +1,514 @@
+"""The tiles module writes Timeline exports to vector tiles.
+
+A web map can only hold so many GeoJSON features, so long histories are cut
+into Mapbox Vector Tiles instead and stored in an MBTiles file, which the map
+loads tile by tile from a local tile server. Every zoom level gets its own
+copy of the paths, simplified to one pixel and without the paths smaller
+than a pixel, and every tile keeps at most a given number of visits, the
+longest first. The tiles are encoded with the standard library and NumPy
+only.
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .decoders import format_timestamp
+
+# Size of a tile in vector tile coordinates
+TILE_EXTENT = 4096
+# Latitude limit of the Web Mercator projection
+_MAX_LATITUDE = 85.05112878
+
+
+def _tile_coordinates(lon, lat, zoom):
+    """Get the Web Mercator coordinates of locations in tile units at a zoom level."""
+    scale = 2.0**zoom
+    lat = np.radians(np.clip(lat, -_MAX_LATITUDE, _MAX_LATITUDE))
+    x = (np.asarray(lon) + 180) / 360 * scale
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * scale
+    return x, y
+
+
+def _varint(value):
+    """Encode an unsigned integer as a protobuf varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    """Map a signed integer to an unsigned one, as protobuf sint fields do."""
+    return (value << 1) ^ (value >> 63)
+
+
+def _message(number, payload):
+    """Encode a length-delimited protobuf field."""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    """Encode a packed repeated uint32 protobuf field."""
+    return _message(number, b"".join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    """Encode a feature property as a vector tile Value message."""
+    if isinstance(value, str):
+        return _message(1, value.encode())
+    if isinstance(value, (bool, np.bool_)):
+        return _varint(7 << 3) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        return _varint(6 << 3) + _varint(_zigzag(int(value)))
+    return _varint(3 << 3 | 1) + struct.pack("<d", float(value))
+
+
+def encode_geometry(x, y):
+    """
+    Encode a point or a line as vector tile geometry commands.
+
+    Args:
+        x, y (ndarray): Integer tile coordinates of the vertices; one vertex
+            encodes a point, more encode a line.
+
+    Returns:
+        list: The command integers, empty for a line without two distinct
+            vertices.
+    """
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    if len(x) > 1:
+        # Repeated vertices would be zero-length LineTo steps
+        moved = np.concatenate(([True], (np.diff(x) != 0) | (np.diff(y) != 0)))
+        x, y = x[moved], y[moved]
+        if len(x) < 2:
+            return []
+    dx = np.diff(x, prepend=0)
+    dy = np.diff(y, prepend=0)
+    steps = np.column_stack((_zigzag(dx), _zigzag(dy)))
+    commands = [1 | 1 << 3, *steps[0].tolist()]
+    if len(x) > 1:
+        commands.append(2 | (len(x) - 1) << 3)
+        commands.extend(steps[1:].ravel().tolist())
+    return commands
+
+
+def encode_layer(name, features, extent=TILE_EXTENT):
+    """
+    Encode a vector tile layer.
+
+    Args:
+        name (str): Name of the layer.
+        features (list): (geometry type, geometry commands, properties)
+            tuples, with 1 for points and 2 for lines.
+        extent (int): Size of the tile in tile coordinates.
+
+    Returns:
+        bytes: The Layer message.
+    """
+    keys, values = {}, {}
+    encoded = []
+    for geometry_type, commands, properties in features:
+        tags = []
+        for key, value in properties.items():
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        encoded.append(
+            _message(
+                2,
+                _packed(2, tags)
+                + _varint(3 << 3)
+                + _varint(geometry_type)
+                + _packed(4, commands),
+            )
+        )
+    return _message(
+        3,
+        _varint(15 << 3)
+        + _varint(2)
+        + _message(1, name.encode())
+        + b"".join(encoded)
+        + b"".join(_message(3, key.encode()) for key in keys)
+        + b"".join(_message(4, _encode_value(value)) for _, value in values)
+        + _varint(5 << 3)
+        + _varint(extent),
+    )
+
+
+def _visit_tiles(visits, zoom, max_points):
+    """
+    Group the visits of a table by tile, keeping the longest ones per tile.
+
+    Returns:
+        dict: Maps (x, y) tiles to lists of (row, tile x, tile y) of visits.
+    """
+    x, y = _tile_coordinates(visits.lon, visits.lat, zoom)
+    column, row = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+    key = column << 32 | row
+    duration = visits.end_time - visits.start_time
+    order = np.lexsort((-duration, key))
+    key = key[order]
+    first = np.concatenate(([True], key[1:] != key[:-1]))
+    start = np.maximum.accumulate(np.where(first, np.arange(len(key)), 0))
+    order = order[np.arange(len(key)) - start < max_points]
+    tiles = {}
+    local_x = np.round((x - column) * TILE_EXTENT).astype(np.int64)
+    local_y = np.round((y - row) * TILE_EXTENT).astype(np.int64)
+    for i in order.tolist():
+        tiles.setdefault((int(column[i]), int(row[i])), []).append(
+            (i, local_x[i], local_y[i])
+        )
+    return tiles
+
+
+def _path_tiles(paths, zoom, min_pixels):
+    """
+    Cut the paths of a table into one piece per tile they cross.
+
+    Segments are first split so that none spans more than half a tile, then
+    every run of vertices in one tile becomes a piece, extended by one vertex
+    on each side so that lines continue across tile edges.
+
+    Returns:
+        dict: Maps (x, y) tiles to lists of (row, tile x array, tile y
+            array) of path pieces.
+    """
+    x, y = _tile_coordinates(paths.lon, paths.lat, zoom)
+    path = np.repeat(np.arange(len(paths)), paths.vertex_count)
+    # Drop the paths smaller than min_pixels pixels of a 256 px tile
+    keep_path = np.zeros(len(paths), dtype=bool)
+    if len(x):
+        starts = paths.offsets[:-1][paths.vertex_count > 0]
+        width = np.maximum.reduceat(x, starts) - np.minimum.reduceat(x, starts)
+        height = np.maximum.reduceat(y, starts) - np.minimum.reduceat(y, starts)
+        keep_path[paths.vertex_count > 0] = (
+            np.hypot(width, height) * 256 >= min_pixels
+        ) & (paths.vertex_count[paths.vertex_count > 0] > 1)
+    keep = keep_path[path]
+    x, y, path = x[keep], y[keep], path[keep]
+    if len(x) == 0:
+        return {}
+
+    # Densify: split every segment into steps of at most half a tile
+    same = path[1:] == path[:-1]
+    length = np.maximum(np.abs(np.diff(x)), np.abs(np.diff(y)))
+    steps = np.where(same, np.maximum(np.ceil(length * 2), 1), 1).astype(np.int64)
+    steps = np.append(steps, 1)
+    vertex = np.repeat(np.arange(len(x)), steps)
+    fraction = (
+        np.arange(len(vertex)) - np.repeat(np.cumsum(steps) - steps, steps)
+    ) / np.repeat(steps, steps)
+    following = np.minimum(vertex + 1, len(x) - 1)
+    fraction[~np.repeat(np.append(same, False), steps)] = 0
+    x = x[vertex] + (x[following] - x[vertex]) * fraction
+    y = y[vertex] + (y[following] - y[vertex]) * fraction
+    path = path[vertex]
+
+    column, row = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+    key = column << 32 | row
+    boundary = np.concatenate(([True], (key[1:] != key[:-1]) | (path[1:] != path[:-1])))
+    first = np.flatnonzero(boundary)
+    stop = np.append(first[1:], len(x))
+    # Extend every piece by the neighbouring vertices of the same path
+    extended_first = np.where(
+        (first > 0) & (path[np.maximum(first - 1, 0)] == path[first]), first - 1, first
+    )
+    extended_stop = np.where(
+        (stop < len(x)) & (path[np.minimum(stop, len(x) - 1)] == path[first]),
+        stop + 1,
+        stop,
+    )
+    tiles = {}
+    for piece in range(len(first)):
+        tile_x, tile_y = int(column[first[piece]]), int(row[first[piece]])
+        vertices = slice(extended_first[piece], extended_stop[piece])
+        tiles.setdefault((tile_x, tile_y), []).append(
+            (
+                int(path[first[piece]]),
+                np.round((x[vertices] - tile_x) * TILE_EXTENT),
+                np.round((y[vertices] - tile_y) * TILE_EXTENT),
+            )
+        )
+    return tiles
+
+
+def iter_tiles(visits, paths, min_zoom=2, max_zoom=14, max_points=2000, min_pixels=1.0):
+    """
+    Encode a visit and a path table as vector tiles.
+
+    The paths of each zoom level are simplified to one pixel of that level,
+    starting from the highest zoom so that every level simplifies the
+    already simplified lines of the level above.
+
+    Args:
+        visits (VisitColumns): The visits, in a "visits" layer.
+        paths (PathColumns): The paths, in a "paths" layer.
+        min_zoom (int): Lowest zoom level.
+        max_zoom (int): Highest zoom level.
+        max_points (int): Maximum number of visits per tile; the longest
+            visits are kept.
+        min_pixels (float): Size in pixels under which a path is dropped.
+
+    Yields:
+        tuple: (zoom, x, y, tile) with the tile as an uncompressed Mapbox
+            Vector Tile.
+    """
+    from .simplify import simplify_paths, zoom_tolerance
+
+    visit_properties = [
+        {
+            "placeId": str(visits.place_id[i]),
+            "semanticType": str(visits.semantic_type[i]),
+            "startTime": format_timestamp(visits.start_time[i], visits.start_offset[i]),
+            "endTime": format_timestamp(visits.end_time[i], visits.end_offset[i]),
+        }
+        for i in range(len(visits))
+    ]
+    path_properties = [
+        {
+            "segmentId": int(paths.segment_id[i]),
+            "startTime": format_timestamp(paths.start_time[i], paths.start_offset[i]),
+            "endTime": format_timestamp(paths.end_time[i], paths.end_offset[i]),
+        }
+        for i in range(len(paths))
+    ]
+    latitude = float(paths.lat.mean()) if len(paths.lat) else 0.0
+    for zoom in range(max_zoom, min_zoom - 1, -1):
+        paths = simplify_paths(paths, zoom_tolerance(zoom + 1, latitude))
+        layers = {}
+        for tile, items in _visit_tiles(visits, zoom, max_points).items():
+            layers.setdefault(tile, {})["visits"] = [
+                (1, encode_geometry([x], [y]), visit_properties[i]) for i, x, y in items
+            ]
+        for tile, items in _path_tiles(paths, zoom, min_pixels).items():
+            features = [
+                (2, commands, path_properties[i])
+                for i, commands in ((i, encode_geometry(x, y)) for i, x, y in items)
+                if commands
+            ]
+            if features:
+                layers.setdefault(tile, {})["paths"] = features
+        for (x, y), tile_layers in sorted(layers.items()):
+            yield zoom, x, y, b"".join(
+                encode_layer(name, features) for name, features in tile_layers.items()
+            )
+
+
+def write_mbtiles(
+    data,
+    file_path,
+    min_zoom=2,
+    max_zoom=14,
+    max_points=2000,
+    min_pixels=1.0,
+    cache=None,
+    **kwargs,
+):
+    """
+    Write the visits and paths of a Timeline export to an MBTiles file of vector tiles.
+
+    Args:
+        data (str, dict or tuple): Path or URL of the Timeline export, the
+            already loaded JSON data, or a (VisitColumns, PathColumns) tuple.
+        file_path (str): Path of the MBTiles file; an existing file is replaced.
+        min_zoom (int): Lowest zoom level.
+        max_zoom (int): Highest zoom level.
+        max_points (int): Maximum number of visits per tile.
+        min_pixels (float): Size in pixels under which a path is dropped.
+        cache (ParseCache): Parse cache to load the tables from.
+        **kwargs: Filters (start, end, bbox) for the parser.
+
+    Returns:
+        int: The number of tiles written.
+    """
+    from .columnar import filter_columns, parse_timeline_columns
+
+    if isinstance(data, tuple):
+        visits, paths = filter_columns(*data, **kwargs)
+    elif cache is not None:
+        visits, paths = filter_columns(*cache.load_columns(data), **kwargs)
+    else:
+        visits, paths = parse_timeline_columns(data, **kwargs)
+
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    lon = np.concatenate((visits.lon, paths.lon))
+    lat = np.concatenate((visits.lat, paths.lat))
+    bounds = (
+        [float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())]
+        if len(lon)
+        else [-180.0, -85.0, 180.0, 85.0]
+    )
+    fields = {"startTime": "String", "endTime": "String"}
+    metadata = {
+        "name": os.path.splitext(os.path.basename(file_path))[0],
+        "format": "pbf",
+        "type": "overlay",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": ",".join(str(value) for value in bounds),
+        "center": f"{(bounds[0] + bounds[2]) / 2},{(bounds[1] + bounds[3]) / 2},"
+        f"{min_zoom}",
+        "json": json.dumps(
+            {
+                "vector_layers": [
+                    {
+                        "id": "visits",
+                        "fields": {
+                            "placeId": "String",
+                            "semanticType": "String",
+                            **fields,
+                        },
+                    },
+                    {"id": "paths", "fields": {"segmentId": "Number", **fields}},
+                ]
+            }
+        ),
+    }
+    count = 0
+    with sqlite3.connect(file_path) as connection:
+        connection.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        connection.execute(
+            "CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, "
+            "tile_row INTEGER, tile_data BLOB)"
+        )
+        connection.execute(
+            "CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)"
+        )
+        connection.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+        for zoom, x, y, tile in iter_tiles(
+            visits, paths, min_zoom, max_zoom, max_points, min_pixels
+        ):
+            # MBTiles rows count from the south, as in TMS
+            connection.execute(
+                "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                (zoom, x, (1 << zoom) - 1 - y, gzip.compress(tile)),
+            )
+            count += 1
+    connection.close()
+    return count
+
+
+def read_tile(file_path, zoom, x, y):
+    """
+    Read a tile of an MBTiles file.
+
+    Args:
+        file_path (str): Path of the MBTiles file.
+        zoom (int): Zoom level of the tile.
+        x, y (int): Column and row of the tile, with rows counted from the
+            north as in web map URLs.
+
+    Returns:
+        bytes: The gzip-compressed tile, or None if there is no such tile.
+    """
+    connection = sqlite3.connect(file_path)
+    try:
+        row = connection.execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+            "AND tile_row = ?",
+            (zoom, x, (1 << zoom) - 1 - y),
+        ).fetchone()
+    finally:
+        connection.close()
+    return None if row is None else row[0]
+
+
+class TileServer:
+    """
+    Serves the tiles of an MBTiles file over HTTP from a background thread.
+
+    Tiles are served at http://host:port/{z}/{x}/{y}.pbf, gzip-encoded and
+    with CORS headers so that notebook maps can load them.
+    """
+
+    def __init__(self, file_path, host="127.0.0.1", port=0):
+        """
+        Starts the server.
+
+        Args:
+            file_path (str): Path of the MBTiles file.
+            host (str): Address to listen on.
+            port (int): Port to listen on; 0 picks a free port.
+        """
+        self.file_path = file_path
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                try:
+                    zoom, x, y = self.path.split("?")[0].strip("/").split("/")
+                    tile = read_tile(
+                        server.file_path, int(zoom), int(x), int(y.split(".")[0])
+                    )
+                except ValueError:
+                    self.send_error(404)
+                    return
+                if tile is None:
+                    self.send_response(204)
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(tile)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(tile)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        """str: The tile URL template of the server."""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/{{z}}/{{x}}/{{y}}.pbf"
+
+    def stop(self):
+        """Stops the server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def prepare_tiles(data, min_zoom=2, max_zoom=14, **kwargs):
+    """
+    Get an MBTiles file for a map layer, writing a temporary one if needed.
+
+    Args:
+        data (str, dict or tuple): An MBTiles file, or the Timeline export to
+            write to a temporary one with write_mbtiles.
+        min_zoom (int): Lowest zoom level.
+        max_zoom (int): Highest zoom level.
+        **kwargs: Additional keyword arguments for write_mbtiles.
+
+    Returns:
+        str: Path of the MBTiles file.
+    """
+    if isinstance(data, str) and data.endswith(".mbtiles"):
+        return data
+    import tempfile
+
+    fd, file_path = tempfile.mkstemp(suffix=".mbtiles")
+    os.close(fd)
+    try:
+        write_mbtiles(data, file_path, min_zoom, max_zoom, **kwargs)
+    except BaseException:
+        os.remove(file_path)
+        raise
+    return file_path
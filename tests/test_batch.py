@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.batch` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from gtlparser import batch
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestBatch(unittest.TestCase):
+    """Tests for `gtlparser.batch` module."""
+
+    def setUp(self):
+        """Create a folder with two exports and one broken file."""
+        self.tmpdir = tempfile.mkdtemp()
+        for user in ("alice", "bob"):
+            os.makedirs(os.path.join(self.tmpdir, user))
+            shutil.copy(
+                EXAMPLE_TIMELINE, os.path.join(self.tmpdir, user, "timeline.json")
+            )
+        with open(os.path.join(self.tmpdir, "broken.json"), "w") as f:
+            f.write('{"semanticSegments": [')
+        self.output_path = os.path.join(self.tmpdir, "out")
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_convert_batch(self):
+        """Every file is converted or reported, with unique output names."""
+        results = batch.convert_batch(
+            self.tmpdir, self.output_path, workers=2, verbose=False
+        )
+        self.assertEqual(
+            [result["output_name"] for result in results],
+            ["alice_timeline", "bob_timeline", "broken"],
+        )
+        self.assertEqual([result["points"] for result in results], [14, 14, 0])
+        self.assertIsNone(results[0]["error"])
+        self.assertIsNotNone(results[2]["error"])
+        with open(os.path.join(self.output_path, "line_bob_timeline.geojson")) as f:
+            self.assertEqual(len(json.load(f)["features"]), 12)
+        self.assertIn("3 files, 1 failed", batch.format_batch_summary(results))
+
+
+if __name__ == "__main__":
+    unittest.main()
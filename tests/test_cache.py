@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.cache` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from gtlparser import cache, gtl2geojson
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestCache(unittest.TestCase):
+    """Tests for `gtlparser.cache` module."""
+
+    def setUp(self):
+        """Create an empty cache folder."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = cache.ParseCache(self.tmpdir)
+
+    def tearDown(self):
+        """Remove the cache folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_cached_parse_matches(self):
+        """Cache misses and hits return the same collections as a plain parse."""
+        expected = gtl2geojson.parse_visitPoint(EXAMPLE_TIMELINE, flag_allField=1)
+        for _ in range(2):
+            self.assertEqual(
+                gtl2geojson.parse_visitPoint(
+                    EXAMPLE_TIMELINE, flag_allField=1, cache=self.cache
+                ),
+                expected,
+            )
+        self.assertEqual(
+            gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE, cache=self.cache),
+            gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE),
+        )
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+
+    def test_lru_eviction(self):
+        """The least recently used entries are evicted past the size cap."""
+        self.cache.put("a", {"x": list(range(1000))})
+        self.cache.put("b", {"x": list(range(1000))})
+        entry_size = os.path.getsize(os.path.join(self.tmpdir, "a.npz"))
+        self.cache.max_bytes = 2 * entry_size
+        os.utime(os.path.join(self.tmpdir, "a.npz"), ns=(1, 1))
+        self.assertIsNotNone(self.cache.get("a"))
+        self.cache.put("c", {"x": list(range(1000))})
+        self.assertIsNotNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.cli` module."""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from gtlparser import cli
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+LEGACY_TIMELINE = {
+    "timelineObjects": [
+        {
+            "placeVisit": {
+                "location": {"latitudeE7": 359571299, "longitudeE7": -839278340},
+                "duration": {
+                    "startTimestamp": "2023-11-06T18:00:00.000Z",
+                    "endTimestamp": "2023-11-06T19:00:00.000Z",
+                },
+            }
+        },
+        {
+            "activitySegment": {
+                "duration": {
+                    "startTimestamp": "2023-11-07T18:00:00.000Z",
+                    "endTimestamp": "2023-11-07T18:30:00.000Z",
+                },
+                "waypointPath": {
+                    "waypoints": [
+                        {"latE7": 359571299, "lngE7": -839278340},
+                        {"latE7": 359600000, "lngE7": -839300000},
+                    ]
+                },
+            }
+        },
+    ]
+}
+
+
+class TestCli(unittest.TestCase):
+    """Tests for `gtlparser.cli` module."""
+
+    def setUp(self):
+        """Create a temporary output folder."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_pipelines_agree(self):
+        """The in-memory and streaming pipelines write the same features."""
+        outputs = []
+        for extra in ([], ["--stream"]):
+            output_path = os.path.join(self.tmpdir, str(len(outputs)))
+            status = cli.main(
+                [EXAMPLE_TIMELINE, "-o", output_path, "--since", "2023-11-07"] + extra
+            )
+            self.assertEqual(status, 0)
+            with open(os.path.join(output_path, "line_example_timeline.geojson")) as f:
+                outputs.append(json.load(f))
+        self.assertEqual(len(outputs[0]["features"]), 11)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_geojsonseq_stats(self):
+        """--stats prints the per-file summary of the conversion."""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli.main(
+                [
+                    EXAMPLE_TIMELINE,
+                    "-o",
+                    self.tmpdir,
+                    "-n",
+                    "nov",
+                    "--format",
+                    "geojsonseq",
+                    "--until",
+                    "2023-11-07T00:00:00-05:00",
+                    "--stats",
+                ]
+            )
+        self.assertIn("1 files, 0 failed", stdout.getvalue())
+        with open(os.path.join(self.tmpdir, "point_nov.geojsons")) as f:
+            self.assertEqual(len(f.read().split("\n")[:-1]), 3)
+
+    def test_extra_layer_stats(self):
+        """--stats also reports the activity, stay and trip layers written."""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli.main(
+                [EXAMPLE_TIMELINE, "-o", self.tmpdir, "--activities", "--stays"]
+                + ["--stats"]
+            )
+        header, row = stdout.getvalue().split("\n")[:2]
+        self.assertEqual(
+            header.split()[1:6], ["points", "lines", "activities", "stays", "trips"]
+        )
+        with open(os.path.join(self.tmpdir, "activity_example_timeline.geojson")) as f:
+            activities = len(json.load(f)["features"])
+        self.assertEqual(int(row.split()[3]), activities)
+
+    def test_legacy_format(self):
+        """Legacy timelineObjects exports are detected and converted."""
+        legacy_file = os.path.join(self.tmpdir, "legacy.json")
+        with open(legacy_file, "w") as f:
+            json.dump(LEGACY_TIMELINE, f)
+        self.assertEqual(cli.detect_timeline_format(legacy_file), "timelineObjects")
+        self.assertEqual(
+            cli.detect_timeline_format(EXAMPLE_TIMELINE), "semanticSegments"
+        )
+        cli.main([legacy_file, "-o", self.tmpdir, "--since", "2023-11-07"])
+        with open(os.path.join(self.tmpdir, "point_legacy.geojson")) as f:
+            self.assertEqual(len(json.load(f)["features"]), 0)
+        with open(os.path.join(self.tmpdir, "line_legacy.geojson")) as f:
+            self.assertEqual(len(json.load(f)["features"]), 1)
+
+    def test_several_exports_in_parallel(self):
+        """With --workers, several exports are converted over a process pool."""
+        input_path = os.path.join(self.tmpdir, "inputs")
+        os.makedirs(input_path)
+        for name in ("2023_11", "2023_12"):
+            shutil.copy(EXAMPLE_TIMELINE, os.path.join(input_path, f"{name}.json"))
+        output_path = os.path.join(self.tmpdir, "out")
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            status = cli.main([input_path, "-o", output_path, "-w", "2", "--stats"])
+        self.assertEqual(status, 0)
+        self.assertIn("2 files, 0 failed", stdout.getvalue())
+        for name in ("2023_11", "2023_12"):
+            with open(os.path.join(output_path, f"line_{name}.geojson")) as f:
+                self.assertEqual(len(json.load(f)["features"]), 12)
+
+    def test_line_counts_agree(self):
+        """Every output format reports the lines with at least two vertices."""
+        counts = set()
+        for output_format in cli.OUTPUT_FORMATS:
+            args = cli.init_parser().parse_args(
+                [EXAMPLE_TIMELINE, "-o", self.tmpdir, "-f", output_format]
+            )
+            result = cli.convert(EXAMPLE_TIMELINE, args, output_format)
+            self.assertIsNone(result["error"])
+            counts.add(result["lines"])
+        self.assertEqual(counts, {12})
+
+    def test_invalid_arguments(self):
+        """Conflicting options are rejected."""
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                cli.main([EXAMPLE_TIMELINE, "--stream", "--format", "parquet"])
+            with self.assertRaises(SystemExit):
+                cli.main([EXAMPLE_TIMELINE, "--since", "not a date"])
+            with self.assertRaises(SystemExit):
+                cli.main([EXAMPLE_TIMELINE, "--workers", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
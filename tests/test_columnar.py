@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.columnar` module."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from gtlparser import columnar, gtl2geojson
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestColumnar(unittest.TestCase):
+    """Tests for `gtlparser.columnar` module."""
+
+    def setUp(self):
+        """Parse the example export once per test."""
+        self.visits, self.paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+
+    def test_column_types(self):
+        """Columns are typed NumPy arrays with consistent lengths."""
+        self.assertEqual(len(self.visits), 14)
+        self.assertEqual(self.visits.lon.dtype, np.float64)
+        self.assertEqual(self.visits.start_time.dtype, np.int64)
+        self.assertEqual(len(self.paths.offsets), len(self.paths) + 1)
+        self.assertEqual(self.paths.offsets[-1], len(self.paths.lon))
+
+    def test_round_trip_to_geojson(self):
+        """Converting back to GeoJSON matches the Feature-based parsers."""
+        self.assertEqual(
+            self.visits.to_feature_collection(flag_allField=1),
+            gtl2geojson.parse_visitPoint(EXAMPLE_TIMELINE, flag_allField=1),
+        )
+        self.assertEqual(
+            self.paths.to_feature_collection(),
+            gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE),
+        )
+
+    def test_pushdown_filters(self):
+        """Filtered tables match the filtered Feature-based parsers."""
+        filters = {
+            "start": "2023-11-07T00:00:00-05:00",
+            "end": "2023-11-08T00:00:00-05:00",
+            "bbox": (-83.95, 35.9, -83.9, 36.0),
+        }
+        visits, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE, **filters)
+        points, lines = gtl2geojson.parse_timeline(EXAMPLE_TIMELINE, **filters)
+        self.assertEqual(visits.to_feature_collection(), points)
+        self.assertEqual(paths.to_feature_collection(), lines)
+        self.assertEqual(paths.offsets[-1], len(paths.lon))
+
+    def test_activity_columns(self):
+        """Activity tables match the Feature-based activity parser."""
+        activities = columnar.parse_activity_columns(EXAMPLE_TIMELINE)
+        self.assertEqual(len(activities), 13)
+        self.assertEqual(
+            activities.to_feature_collection(),
+            gtl2geojson.parse_activity(EXAMPLE_TIMELINE),
+        )
+        self.assertEqual(activities.activity_type[0], "WALKING")
+
+    def test_vertex_times(self):
+        """Per-vertex times are decoded and kept alongside the coordinates."""
+        self.assertEqual(self.paths.time.dtype, np.int64)
+        self.assertEqual(len(self.paths.time), len(self.paths.lon))
+        self.assertEqual(self.paths.get_times(0)[0], 1699294800000)
+
+    def assertTablesEqual(self, first, second):
+        """Assert that two tables hold the same columns."""
+        self.assertEqual(type(first), type(second))
+        for field in first.fields:
+            np.testing.assert_array_equal(
+                getattr(first, field), getattr(second, field), err_msg=field
+            )
+
+    def test_parallel_ranges_match_serial(self):
+        """Parsing byte ranges in worker processes gives the serial tables."""
+        filters = {
+            "start": "2023-11-07T00:00:00-05:00",
+            "bbox": (-84.0, 35.9, -83.9, 36.0),
+        }
+        for kwargs in ({}, filters):
+            serial = columnar.parse_timeline_columns(EXAMPLE_TIMELINE, **kwargs)
+            parallel = columnar.parse_timeline_columns(
+                EXAMPLE_TIMELINE, workers=2, chunk_size=3, **kwargs
+            )
+            for first, second in zip(serial, parallel):
+                self.assertTablesEqual(first, second)
+
+    def test_segment_ranges(self):
+        """Byte ranges skip quotes in strings and nested semanticSegments keys."""
+        with open(EXAMPLE_TIMELINE, encoding="utf8") as f:
+            segments = json.load(f)["semanticSegments"]
+        segments[1]["visit"]["topCandidate"]["placeId"] = 'a \\"}] [{'
+        segments[0]["semanticSegments"] = [{"startTime": "decoy"}]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "timeline.json")
+            for indent in (None, 2):
+                with open(file_path, "w", encoding="utf8") as f:
+                    json.dump({"semanticSegments": segments}, f, indent=indent)
+                ranges = columnar.find_segment_ranges(file_path, chunk_size=4)
+                self.assertEqual(
+                    [i for i, _, _ in ranges], list(range(0, len(segments), 4))
+                )
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                items = []
+                for _, start_byte, end_byte in ranges:
+                    items += json.loads(b"[" + data[start_byte:end_byte] + b"]")
+                self.assertEqual(items, segments)
+
+    def test_concat_paths(self):
+        """Stacked path tables keep every path's vertices."""
+        halves = [
+            self.paths.select(np.arange(3)),
+            self.paths.select(np.arange(3, len(self.paths))),
+        ]
+        self.assertTablesEqual(columnar.PathColumns.concat(halves), self.paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
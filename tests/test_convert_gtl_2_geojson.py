@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.Convert_GTL_2_GeoJSON` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from gtlparser import Convert_GTL_2_GeoJSON as legacy
+
+
+def place_visit(lat_e7, lng_e7, start):
+    """Build a legacy placeVisit object."""
+    return {
+        "placeVisit": {
+            "location": {"latitudeE7": lat_e7, "longitudeE7": lng_e7},
+            "duration": {
+                "startTimestamp": start,
+                "endTimestamp": start.replace("T18", "T19"),
+            },
+        }
+    }
+
+
+def activity_segment(start, raw_points=0):
+    """Build a legacy activitySegment object."""
+    segment = {
+        "activitySegment": {
+            "duration": {
+                "startTimestamp": start,
+                "endTimestamp": start.replace("T18", "T19"),
+            },
+            "waypointPath": {
+                "waypoints": [
+                    {"latE7": 359571299, "lngE7": -839278340},
+                    {"latE7": 359600000, "lngE7": -839300000},
+                ]
+            },
+        }
+    }
+    if raw_points:
+        segment["activitySegment"]["simplifiedRawPath"] = {
+            "points": [
+                {
+                    "latE7": 359571299 + 1000 * i,
+                    "lngE7": -839278340 - 1000 * i,
+                    "accuracyMeters": 10,
+                    "timestamp": start.replace(":00:00", f":{i:02d}:00"),
+                }
+                for i in range(raw_points)
+            ],
+            "source": "INFERRED",
+            "distanceMeters": 42.0,
+        }
+    return segment
+
+
+MONTHS = {
+    ("2022", "2022_DECEMBER.json"): [
+        place_visit(359571299, -839278340, "2022-12-01T18:00:00.000Z"),
+        {},
+    ],
+    ("2023", "2023_FEBRUARY.json"): [
+        activity_segment("2023-02-01T18:00:00.000Z", raw_points=3),
+        {"activitySegment": {"duration": {}}},
+    ],
+    ("2023", "2023_JANUARY.json"): [
+        activity_segment("2023-01-01T18:00:00.000Z", raw_points=1),
+        place_visit(359600000, -839300000, "2023-01-02T18:00:00.000Z"),
+    ],
+}
+
+
+class TestConvertGTL2GeoJSON(unittest.TestCase):
+    """Tests for `gtlparser.Convert_GTL_2_GeoJSON` module."""
+
+    def setUp(self):
+        """Write a Semantic Location History tree."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.history = os.path.join(self.tmpdir, "Semantic Location History")
+        for (year, name), timeline_objects in MONTHS.items():
+            os.makedirs(os.path.join(self.history, year), exist_ok=True)
+            with open(os.path.join(self.history, year, name), "w") as f:
+                json.dump({"timelineObjects": timeline_objects}, f)
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def read(self, name):
+        """Read an output file."""
+        with open(os.path.join(self.tmpdir, name)) as f:
+            return json.load(f)
+
+    def test_tree_in_month_order(self):
+        """Monthly files are read by year and month."""
+        names = [
+            os.path.basename(file_path)
+            for file_path in legacy.find_legacy_files(self.history)
+        ]
+        self.assertEqual(
+            names, ["2022_DECEMBER.json", "2023_JANUARY.json", "2023_FEBRUARY.json"]
+        )
+        self.assertEqual(len(list(legacy.iter_timeline_objects(self.history))), 6)
+
+    def test_single_pass_matches_two_passes(self):
+        """One walk writes the same layers and failures as the two passes."""
+        timeline_objects = list(legacy.iter_timeline_objects(self.history))
+        reader = {"timelineObjects": timeline_objects}
+        points = legacy.create_point_file(reader, self.tmpdir, "two")
+        lines = legacy.create_line_file(reader, self.tmpdir, "two")
+        counts = legacy.create_layer_files(
+            legacy.TimelineObjectReader(self.history), self.tmpdir, "one"
+        )
+        self.assertEqual(counts, (points, lines))
+        self.assertEqual(counts, (2, 2))
+        for prefix in ("point", "line"):
+            self.assertEqual(
+                self.read(f"{prefix}_one.geojson"), self.read(f"{prefix}_two.geojson")
+            )
+        for prefix in ("failed_point", "failed_line"):
+            one, _ = legacy.read_failures(f"{self.tmpdir}/{prefix}_one.jsonl")
+            two, _ = legacy.read_failures(f"{self.tmpdir}/{prefix}_two.jsonl")
+            self.assertEqual(
+                [(r["type"], r["sample"]) for r in one],
+                [(r["type"], r["sample"]) for r in two],
+            )
+        failures, summary = legacy.read_failures(f"{self.tmpdir}/failed_line_one.jsonl")
+        self.assertEqual(
+            summary,
+            {"failed": 2, "recorded": 2, "types": {"KeyError": 1, "TypeError": 1}},
+        )
+        self.assertEqual(
+            [(os.path.basename(r["file"]), r["index"]) for r in failures],
+            [("2022_DECEMBER.json", 1), ("2023_FEBRUARY.json", 1)],
+        )
+        self.assertEqual(failures[1]["message"], "'waypoints'")
+        self.assertLess(failures[1]["offset"], 10000)
+
+    def test_single_layer_skips_other_objects(self):
+        """The point wrapper does not build the activitySegments."""
+        timeline_objects = list(legacy.iter_timeline_objects(self.history))
+        build_line = mock.Mock(side_effect=AssertionError("line built"))
+        with mock.patch.dict(
+            legacy.FEATURE_BUILDERS, {"activitySegment": (build_line, False)}
+        ):
+            points = legacy.create_point_file(
+                {"timelineObjects": timeline_objects}, self.tmpdir, "points"
+            )
+        self.assertEqual(points, 2)
+        build_line.assert_not_called()
+
+    def test_error_sink_cap(self):
+        """Failures past max_errors are only counted, and samples are truncated."""
+        file_path = os.path.join(self.tmpdir, "failed.jsonl")
+        with legacy.ErrorSink(file_path, max_errors=2, sample_size=10) as errors:
+            for i in range(5):
+                errors.add({"placeVisit": {"i": i}}, KeyError("location"), {"index": i})
+            errors.add([], ValueError("bad"))
+        failures, summary = legacy.read_failures(file_path)
+        self.assertEqual([r["index"] for r in failures], [0, 1])
+        self.assertEqual(failures[0]["sample"], '{"placeVis')
+        self.assertEqual(
+            summary,
+            {"failed": 6, "recorded": 2, "types": {"KeyError": 5, "ValueError": 1}},
+        )
+
+    def test_raw_path_layer(self):
+        """Raw paths of two points or more are written to their own layer."""
+        counts = legacy.create_layer_files(
+            legacy.iter_timeline_objects(self.history),
+            self.tmpdir,
+            "out",
+            raw_paths=True,
+        )
+        self.assertEqual(counts, (2, 2, 1))
+        (feature,) = self.read("rawpath_out.geojson")["features"]
+        self.assertEqual(feature["geometry"]["coordinates"][-1], [-83.928034, 35.95733])
+        self.assertEqual(feature["properties"]["pointCount"], 3)
+        self.assertEqual(feature["properties"]["source"], "INFERRED")
+        self.assertEqual(feature["properties"]["endTimestamprecordTime"], "13:02:00")
+
+        lines = self.read("line_out.geojson")["features"]
+        properties = [line["properties"] for line in lines]
+        self.assertNotIn("simplifiedRawPath", properties[0])
+        self.assertEqual(
+            [p["simplifiedRawPath_pointCount"] for p in properties], [1, 3]
+        )
+
+    def test_flattened_fields(self):
+        """The field mapping specs flatten nested fields like the parsers did."""
+        place = legacy.parse_placeVisit_items(
+            {
+                "placeVisit": {
+                    "location": {
+                        "latitudeE7": 359571299,
+                        "name": "Campus",
+                        "sourceInfo": {"deviceTag": 7},
+                    },
+                    "childVisits": [
+                        {
+                            "location": {"name": "Library"},
+                            "duration": {"startTimestamp": "2023-01-01T18:00:00Z"},
+                        }
+                    ],
+                    "otherCandidateLocations": [{"placeId": "a"}],
+                    "centerLngE7": -839278340,
+                    "placeConfidence": "HIGH_CONFIDENCE",
+                }
+            }
+        )
+        self.assertEqual(
+            place,
+            {
+                "latitudeE7": 35.9571299,
+                "name": "Library Campus",
+                "sourceInfo": "deviceTag",
+                "deviceTag": 7,
+                "startTimestamprecordDate": "2023-01-01",
+                "startTimestamprecordTime": "13:00:00",
+                "otherCandidateFields": [{"placeId": "a"}],
+                "centerLngE7": -83.927834,
+                "placeConfidence": "HIGH_CONFIDENCE",
+            },
+        )
+        segment = legacy.parse_activitySegment_items(
+            {
+                "activitySegment": {
+                    "startLocation": {
+                        "latitudeE7": 10,
+                        "address": "x",
+                        "sourceInfo": {"deviceTag": 1},
+                    },
+                    "waypointPath": {
+                        "waypoints": [{"latE7": 20, "lngE7": 30}],
+                        "roadSegment": [],
+                        "confidence": 0.5,
+                        "source": "INFERRED",
+                    },
+                    "parkingEvent": {
+                        "location": {
+                            "latitudeE7": 1,
+                            "longitudeE7": 2,
+                            "accuracyMetres": 9,
+                        },
+                        "timestamp": "2023-01-01T18:00:00.500Z",
+                        "other": 1,
+                    },
+                    "distance": 5,
+                }
+            }
+        )
+        self.assertEqual(
+            segment,
+            {
+                "start_latitudeE7": 1e-06,
+                "start_sourceInfo": "deviceTag",
+                "start_deviceTag": 1,
+                "waypoints": [(3e-06, 2e-06)],
+                "travelMode_confidence": 0.5,
+                "source": "INFERRED",
+                "parkingEvent_point": (2e-07, 1e-07),
+                "parkingEvent_accuracyMetres": 9,
+                "parkingEvent_timestamp": "2023-01-01 18:00:00",
+                "distance": 5,
+            },
+        )
+
+    def test_record_time_zone(self):
+        """recordDate/recordTime follow the time zone or the record's offset."""
+        item = place_visit(359571299, -839278340, "2023-07-01T18:00:00.000Z")
+        self.assertEqual(
+            legacy.parse_placeVisit_items(item)["startTimestamprecordTime"], "13:00:00"
+        )
+        fields = legacy.parse_placeVisit_items(item, "America/New_York")
+        self.assertEqual(fields["startTimestamprecordTime"], "14:00:00")
+        self.assertEqual(fields["endTimestamprecordTime"], "15:00:00")
+        item["placeVisit"]["startTimeTimezoneUtcOffsetMinutes"] = 120
+        item["placeVisit"]["duration"]["endTimestampMs"] = "1688234400000"
+        fields = legacy.parse_placeVisit_items(item, "America/New_York")
+        self.assertEqual(fields["startTimestamprecordTime"], "20:00:00")
+        self.assertEqual(fields["endTimestamprecordTime"], "15:00:00")
+        self.assertEqual(fields["endTimestampMsrecordDate"], "2023-07-01")
+        self.assertEqual(fields["endTimestampMsrecordTime"], "14:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
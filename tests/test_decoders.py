@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.decoders` module."""
+
+import unittest
+from unittest import mock
+
+from gtlparser import decoders
+
+
+class TestDecoders(unittest.TestCase):
+    """Tests for `gtlparser.decoders` module."""
+
+    def test_decode_latlng(self):
+        """Coordinate strings decode into float arrays."""
+        lat, lon = decoders.decode_latlng(["35.9571299°, -83.927834°", "-1.5°, 2.25°"])
+        self.assertEqual(lat.tolist(), [35.9571299, -1.5])
+        self.assertEqual(lon.tolist(), [-83.927834, 2.25])
+        for values in (["1°, 2°, 3°", "4°"], ["1° 2°", "3°, 4°"], ["1°, x°"]):
+            with self.assertRaises(ValueError):
+                decoders.decode_latlng(values)
+
+    def test_decode_timestamps_fast_path(self):
+        """The fixed Google layout matches the scalar parser."""
+        values = [
+            "2023-11-06T13:20:20.000-05:00",
+            "1969-12-31T23:59:59.999+00:00",
+            "2024-02-29T08:15:00.250+05:30",
+        ]
+        epoch_ms, offset = decoders.decode_timestamps(values)
+        expected = [decoders.parse_timestamp(value) for value in values]
+        self.assertEqual(epoch_ms.tolist(), [value[0] for value in expected])
+        self.assertEqual(offset.tolist(), [value[1] for value in expected])
+
+    def test_decode_timestamps_fallback(self):
+        """Other ISO 8601 layouts are still decoded."""
+        epoch_ms, offset = decoders.decode_timestamps(["2023-11-06T18:20:20Z"])
+        self.assertEqual(epoch_ms.tolist(), [1699294820000])
+        self.assertEqual(offset.tolist(), [0])
+
+    def test_timestamp_round_trip(self):
+        """Timestamps survive the epoch/offset conversion unchanged."""
+        value = "2023-11-06T13:20:20.000-05:00"
+        epoch_ms, offset = decoders.parse_timestamp(value)
+        self.assertEqual(epoch_ms, 1699294820000)
+        self.assertEqual(offset, -300)
+        self.assertEqual(decoders.format_timestamp(epoch_ms, offset), value)
+
+    def test_decode_e7(self):
+        """E7 coordinates are scaled like the legacy per-point division."""
+        points = [
+            {"latE7": 359571299, "lngE7": -839278340},
+            {"latE7": -1, "lngE7": 1800000000},
+        ]
+        lon, lat = decoders.decode_e7(points)
+        self.assertEqual(lon.tolist(), [p["lngE7"] / 10000000 for p in points])
+        self.assertEqual(lat.tolist(), [p["latE7"] / 10000000 for p in points])
+        self.assertEqual(len(decoders.decode_e7([])[0]), 0)
+        with self.assertRaises(KeyError):
+            decoders.decode_e7([{"latE7": 1}])
+
+    def test_local_time(self):
+        """Local times follow the daylight saving time of the zone."""
+        local_time = decoders.LocalTime("America/New_York")
+        winter, _ = decoders.parse_timestamp("2023-01-10T18:20:20.900Z")
+        summer, _ = decoders.parse_timestamp("2023-07-10T18:20:20Z")
+        self.assertEqual(local_time.date_time(winter), ("2023-01-10", "13:20:20"))
+        self.assertEqual(local_time.date_time(summer), ("2023-07-10", "14:20:20"))
+        transition, _ = decoders.parse_timestamp("2023-03-12T06:59:59Z")
+        self.assertEqual(local_time.date_time(transition), ("2023-03-12", "01:59:59"))
+        transition, _ = decoders.parse_timestamp("2023-03-12T07:00:00Z")
+        self.assertEqual(local_time.date_time(transition), ("2023-03-12", "03:00:00"))
+        self.assertEqual(
+            decoders.LocalTime(-300).date_time(summer, offset=120),
+            ("2023-07-10", "20:20:20"),
+        )
+
+    def test_local_time_without_zoneinfo(self):
+        """Without zoneinfo, fixed offsets work and zone names fail clearly."""
+        summer, _ = decoders.parse_timestamp("2023-07-10T18:20:20Z")
+        with mock.patch.dict("sys.modules", {"zoneinfo": None}):
+            with self.assertRaisesRegex(ValueError, "Python 3.9"):
+                decoders.LocalTime("America/New_York")
+            self.assertEqual(
+                decoders.LocalTime(-300).date_time(summer), ("2023-07-10", "13:20:20")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
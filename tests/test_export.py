@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.export` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import geopandas as gpd
+import numpy as np
+
+from gtlparser import export, gtl2geojson
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestExport(unittest.TestCase):
+    """Tests for `gtlparser.export` module."""
+
+    def setUp(self):
+        """Create a temporary output folder."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary output folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_export_geoparquet(self):
+        """GeoParquet layers keep typed columns and the same geometries."""
+        point_file, line_file = export.export_timeline(
+            EXAMPLE_TIMELINE, self.tmpdir, "example"
+        )
+        points = gpd.read_parquet(point_file)
+        lines = gpd.read_parquet(line_file)
+        self.assertEqual(len(points), 14)
+        self.assertEqual(len(lines), 12)
+        self.assertEqual(str(points["startTime"].dtype), "datetime64[ms, UTC]")
+        self.assertEqual(points["probability"].dtype, "float64")
+        expected = gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE)["features"]
+        for line, feature in zip(lines.geometry, expected):
+            np.testing.assert_allclose(
+                np.asarray(line.coords), feature["geometry"]["coordinates"], atol=1e-6
+            )
+
+    def test_export_flatgeobuf(self):
+        """FlatGeobuf layers can be read back."""
+        point_file, _ = export.export_timeline(
+            EXAMPLE_TIMELINE, self.tmpdir, "example", file_format="flatgeobuf"
+        )
+        self.assertTrue(point_file.endswith(".fgb"))
+        self.assertEqual(len(gpd.read_file(point_file)), 14)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.fetch` module."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gtlparser import fetch, gtl2geojson
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TimelineHandler(BaseHTTPRequestHandler):
+    """Serves the example export with an ETag; /flaky fails once with a 503."""
+
+    requests = []
+    failures = {"/flaky": 1}
+
+    def do_GET(self):
+        with open(EXAMPLE_TIMELINE, "rb") as f:
+            body = f.read()
+        if self.failures.get(self.path, 0) > 0:
+            self.failures[self.path] -= 1
+            self.requests.append((self.path, 503))
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.requests.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.requests.append((self.path, 200))
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetch(unittest.TestCase):
+    """Tests for `gtlparser.fetch` module."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a local HTTP server."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), TimelineHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local HTTP server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Use an empty download cache."""
+        self.tmpdir = tempfile.mkdtemp()
+        os.environ["GTLPARSER_CACHE_DIR"] = self.tmpdir
+        TimelineHandler.requests.clear()
+
+    def tearDown(self):
+        """Remove the download cache."""
+        del os.environ["GTLPARSER_CACHE_DIR"]
+        shutil.rmtree(self.tmpdir)
+
+    def test_streamed_parse_and_revalidation(self):
+        """URLs are parsed from the stream and revalidated with the cached ETag."""
+        url = f"{self.url}/timeline.json"
+        expected = gtl2geojson.parse_timeline(EXAMPLE_TIMELINE)
+        self.assertEqual(gtl2geojson.parse_timeline(url), expected)
+        self.assertEqual(gtl2geojson.parse_timeline(url), expected)
+        self.assertEqual(
+            TimelineHandler.requests,
+            [("/timeline.json", 200), ("/timeline.json", 304)],
+        )
+
+    def test_cache_eviction(self):
+        """Downloaded copies are evicted, with their validators, past the size cap."""
+        cache_dir = os.path.join(self.tmpdir, "http")
+        max_bytes = os.path.getsize(EXAMPLE_TIMELINE) + 1
+        for path in ("/first.json", "/second.json"):
+            with fetch.open_url(
+                self.url + path, cache_dir=cache_dir, max_bytes=max_bytes
+            ) as f:
+                while f.read(1 << 16):
+                    pass
+        names = sorted(os.listdir(cache_dir))
+        self.assertEqual(len(names), 2)
+        self.assertEqual(names[1], names[0] + ".meta")
+        with fetch.open_url(self.url + "/second.json", cache_dir=cache_dir) as f:
+            self.assertTrue(f.read(1))
+        self.assertEqual(TimelineHandler.requests[-1], ("/second.json", 304))
+
+    def test_retry(self):
+        """Transient server errors are retried."""
+        with fetch.open_url(f"{self.url}/flaky", cache_dir=False) as f:
+            self.assertTrue(f.read(1))
+        self.assertEqual(TimelineHandler.requests, [("/flaky", 503), ("/flaky", 200)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.gtl2geojson` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import geojson
+
+from gtlparser import gtl2geojson
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestGtl2geojson(unittest.TestCase):
+    """Tests for `gtlparser.gtl2geojson` module."""
+
+    def test_iter_semanticSegments(self):
+        """Every segment is yielded once with its type."""
+        with open(EXAMPLE_TIMELINE, encoding="utf8") as f:
+            expected = json.load(f)["semanticSegments"]
+        segments = list(gtl2geojson.iter_semanticSegments(EXAMPLE_TIMELINE))
+        self.assertEqual([item for _, item in segments], expected)
+        self.assertEqual(
+            sorted({segment_type for segment_type, _ in segments}),
+            sorted(gtl2geojson.SEGMENT_TYPES),
+        )
+
+    def test_parse_timeline_single_pass(self):
+        """The single-pass parser matches the per-layer parsers."""
+        points, lines = gtl2geojson.parse_timeline(EXAMPLE_TIMELINE, flag_allField=1)
+        self.assertEqual(
+            points, gtl2geojson.parse_visitPoint(EXAMPLE_TIMELINE, flag_allField=1)
+        )
+        self.assertEqual(lines, gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE))
+        self.assertEqual(len(points["features"]), 14)
+        self.assertEqual(len(lines["features"]), 12)
+
+    def test_pushdown_filters(self):
+        """Time and bounding-box filters match filtering the full output."""
+        start, end = "2023-11-07T00:00:00-05:00", "2023-11-08T00:00:00-05:00"
+        bbox = (-83.95, 35.9, -83.9, 36.0)
+        points, lines = gtl2geojson.parse_timeline(
+            EXAMPLE_TIMELINE, start=start, end=end, bbox=bbox
+        )
+        lower = gtl2geojson.get_time_bound(start)
+        upper = gtl2geojson.get_time_bound(end)
+
+        def keep(feature):
+            start_time = gtl2geojson.get_time_bound(feature["properties"]["startTime"])
+            coordinates = feature["geometry"]["coordinates"]
+            if feature["geometry"]["type"] == "Point":
+                coordinates = [coordinates]
+            return lower <= start_time < upper and any(
+                bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3]
+                for lon, lat in coordinates
+            )
+
+        all_points, all_lines = gtl2geojson.parse_timeline(EXAMPLE_TIMELINE)
+        expected_points = [f for f in all_points["features"] if keep(f)]
+        expected_lines = [f for f in all_lines["features"] if keep(f)]
+        self.assertTrue(0 < len(expected_points) < len(all_points["features"]))
+        self.assertEqual(points["features"], expected_points)
+        self.assertEqual(lines["features"], expected_lines)
+        self.assertEqual(
+            list(gtl2geojson.iter_visitPoint(EXAMPLE_TIMELINE, start=start, end=end)),
+            gtl2geojson.parse_visitPoint(EXAMPLE_TIMELINE, start=start, end=end)[
+                "features"
+            ],
+        )
+
+    def test_pushdown_early_stop(self):
+        """Sorted exports are not read past the end of the time window."""
+        with open(EXAMPLE_TIMELINE, encoding="utf8") as f:
+            json_data = json.load(f)
+        json_data["semanticSegments"].append(
+            {"startTime": "2030-01-01T00:00:00Z", "visit": {}}
+        )
+        json_data["semanticSegments"].append({"startTime": "not a time", "visit": {}})
+        end = "2023-11-07T00:00:00-05:00"
+        with self.assertRaises(Exception):
+            gtl2geojson.parse_visitPoint(json_data, end=end)
+        points = gtl2geojson.parse_visitPoint(json_data, end=end, assume_sorted=True)
+        self.assertEqual(len(points["features"]), 3)
+
+    def test_create_geojson_file_streaming(self):
+        """Streamed output matches geojson.dump, and GeoJSONSeq has one feature per line."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            points = gtl2geojson.parse_visitPoint(EXAMPLE_TIMELINE)
+            count = gtl2geojson.create_geojson_file(
+                tmpdir, "example", gtl2geojson.iter_visitPoint(EXAMPLE_TIMELINE)
+            )
+            self.assertEqual(count, 14)
+            with open(os.path.join(tmpdir, "point_example.geojson")) as f:
+                self.assertEqual(f.read(), geojson.dumps(points))
+
+            gtl2geojson.write_timeline(
+                EXAMPLE_TIMELINE, tmpdir, "example", driver="GeoJSONSeq"
+            )
+            with open(os.path.join(tmpdir, "line_example.geojsons")) as f:
+                records = f.read().split("\n")[:-1]
+            self.assertEqual(len(records), 12)
+            self.assertTrue(all(record.startswith("\x1e") for record in records))
+            self.assertEqual(
+                json.loads(records[0][1:]),
+                json.loads(
+                    json.dumps(
+                        gtl2geojson.parse_timelinePath(EXAMPLE_TIMELINE)["features"][0]
+                    )
+                ),
+            )
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@
 """Tests for `gtlparser` package."""
 
 
+import subprocess
+import sys
 import unittest
 
 from gtlparser import gtlparser
@@ -19,3 +21,21 @@ class TestGtlparser(unittest.TestCase):
 
     def test_000_something(self):
         """Test something."""
+
+    def test_lazy_mapping_imports(self):
+        """Importing the package does not load the mapping libraries."""
+        code = (
+            "import sys, gtlparser; gtlparser.parse_visitPoint; "
+            "print(sorted({'ipyleaflet', 'ipywidgets', 'folium'} & set(sys.modules)))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+    def test_lazy_map_access(self):
+        """The mapping classes are still reachable from the package."""
+        import gtlparser as package
+
+        self.assertIs(package.Map, gtlparser.Map)
+        self.assertTrue(hasattr(package.foliumap, "Map"))
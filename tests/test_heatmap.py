@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.heatmap` module."""
+
+import json
+import os
+import unittest
+
+import numpy as np
+
+from gtlparser import columnar, foliumap, heatmap
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestHeatmap(unittest.TestCase):
+    """Tests for `gtlparser.heatmap` module."""
+
+    def test_density_grid(self):
+        """Locations land in the Web Mercator cell holding them."""
+        lon = np.array([-179.0, 0.5, 0.5, 179.0])
+        lat = np.array([-60.0, 0.1, 0.1, 60.0])
+        grid, bbox = heatmap.density_grid(lon, lat, bbox=(-180, -80, 180, 80))
+        self.assertEqual(grid.sum(), 4)
+        self.assertEqual(grid.shape[1], 512)
+        rows = np.linspace(
+            heatmap._mercator_y(bbox[3]), heatmap._mercator_y(bbox[1]), len(grid) + 1
+        )
+        row, column = np.unravel_index(np.argmax(grid), grid.shape)
+        self.assertEqual(grid[row, column], 2)
+        self.assertTrue(rows[row + 1] <= heatmap._mercator_y(0.1) < rows[row])
+        self.assertAlmostEqual(bbox[1], -80)
+
+        cells = heatmap.density_cells(grid, bbox)
+        self.assertEqual(len(cells["features"]), 3)
+        self.assertEqual(sum(f["properties"]["count"] for f in cells["features"]), 4)
+
+    def test_timeline_density(self):
+        """The grid counts every visit and path vertex, and renders on a map."""
+        visits, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        grid, _ = heatmap.timeline_density(EXAMPLE_TIMELINE, max_cells=64)
+        self.assertEqual(grid.sum(), len(visits) + len(paths.lon))
+        self.assertLessEqual(max(grid.shape), 64)
+        grid, _ = heatmap.timeline_density((visits, paths), paths=False)
+        self.assertEqual(grid.sum(), len(visits))
+        image = heatmap.density_to_rgba(grid)
+        self.assertTrue(np.array_equal(image[..., 3] > 0, grid > 0))
+        self.assertTrue(heatmap.density_image(grid).startswith("data:image/png"))
+
+        m = foliumap.Map()
+        m.add_timeline_heatmap(EXAMPLE_TIMELINE, max_cells=64)
+        self.assertIn("data:image/png;base64", m.get_root().render())
+
+    def test_timeline_density_start(self):
+        """A segment that straddles start is dropped, as it starts before it."""
+        with open(EXAMPLE_TIMELINE) as f:
+            segments = json.load(f)["semanticSegments"]
+        straddling = segments[0]
+        self.assertEqual(straddling["startTime"], "2023-11-06T13:00:00.000-05:00")
+        self.assertEqual(straddling["endTime"], "2023-11-06T15:00:00.000-05:00")
+        grid, _ = heatmap.timeline_density(EXAMPLE_TIMELINE, visits=False)
+        start = "2023-11-06T14:00:00-05:00"
+        for data in (
+            EXAMPLE_TIMELINE,
+            columnar.parse_timeline_columns(EXAMPLE_TIMELINE),
+        ):
+            filtered, _ = heatmap.timeline_density(
+                data, bbox=(-180, -80, 180, 80), visits=False, start=start
+            )
+            self.assertEqual(
+                filtered.sum(), grid.sum() - len(straddling["timelinePath"])
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.incremental` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from gtlparser import gtl2geojson, incremental
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestIncremental(unittest.TestCase):
+    """Tests for `gtlparser.incremental` module."""
+
+    def setUp(self):
+        """Create an export holding the first half of the example segments."""
+        self.tmpdir = tempfile.mkdtemp()
+        with open(EXAMPLE_TIMELINE, encoding="utf8") as f:
+            self.segments = json.load(f)["semanticSegments"]
+        self.in_json = os.path.join(self.tmpdir, "timeline.json")
+        self.write_export(self.segments[:20])
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def write_export(self, segments):
+        """Write segments as the export file."""
+        with open(self.in_json, "w", encoding="utf8") as f:
+            json.dump({"semanticSegments": segments}, f)
+
+    def read_output(self, prefix):
+        """Read one of the GeoJSON outputs."""
+        with open(os.path.join(self.tmpdir, f"{prefix}_timeline.geojson")) as f:
+            return json.load(f)
+
+    def read_sequence(self, prefix):
+        """Read one of the GeoJSONSeq outputs as a list of features."""
+        with open(os.path.join(self.tmpdir, f"{prefix}_timeline.geojsons")) as f:
+            return [json.loads(line.lstrip("\x1e")) for line in f]
+
+    def test_convert_incremental(self):
+        """Appending the new segments gives the same output as a full run."""
+        first = incremental.convert_incremental(self.in_json, self.tmpdir, "timeline")
+        self.assertFalse(first["skipped"])
+
+        self.write_export(self.segments)
+        second = incremental.convert_incremental(self.in_json, self.tmpdir, "timeline")
+        self.assertLess(second["points"], 14)
+        points, lines = gtl2geojson.parse_timeline(self.in_json)
+        self.assertEqual(self.read_output("point"), json.loads(json.dumps(points)))
+        self.assertEqual(self.read_output("line"), json.loads(json.dumps(lines)))
+
+        third = incremental.convert_incremental(self.in_json, self.tmpdir, "timeline")
+        self.assertTrue(third["skipped"])
+
+    def test_growing_path_replaced(self):
+        """A path still growing at the last run is replaced, not duplicated."""
+        for driver, read in (("GeoJSON", self.read_output), ("GeoJSONSeq", None)):
+            growing = json.loads(json.dumps(self.segments[:25]))
+            path = growing[24]
+            path["timelinePath"] = path["timelinePath"][:10]
+            path["endTime"] = "2023-11-07T19:40:00.000-05:00"
+            self.write_export(growing)
+            incremental.convert_incremental(
+                self.in_json, self.tmpdir, "timeline", driver=driver
+            )
+
+            self.write_export(self.segments[:30])
+            incremental.convert_incremental(
+                self.in_json, self.tmpdir, "timeline", driver=driver
+            )
+            points, lines = gtl2geojson.parse_timeline(self.in_json)
+            if read is None:
+                self.assertEqual(
+                    self.read_sequence("line"),
+                    json.loads(json.dumps(lines["features"])),
+                )
+            else:
+                self.assertEqual(read("point"), json.loads(json.dumps(points)))
+                self.assertEqual(read("line"), json.loads(json.dumps(lines)))
+
+    def test_streamed_segments(self):
+        """Only the segments that may still grow are held before being written."""
+        batches = []
+
+        def build_features(segments, *args):
+            batches.append(len(segments))
+            return gtl2geojson.build_features(segments, *args)
+
+        self.write_export(self.segments)
+        with mock.patch.object(incremental, "build_features", build_features):
+            incremental.convert_incremental(self.in_json, self.tmpdir, "timeline")
+        self.assertEqual(sum(batches), 27)
+        self.assertLessEqual(max(batches), 4)
+        points, lines = gtl2geojson.parse_timeline(self.in_json)
+        self.assertEqual(self.read_output("point"), json.loads(json.dumps(points)))
+        self.assertEqual(self.read_output("line"), json.loads(json.dumps(lines)))
+
+    def test_convert_incremental_geojsonseq(self):
+        """GeoJSONSeq outputs are appended to directly."""
+        incremental.convert_incremental(
+            self.in_json, self.tmpdir, "timeline", driver="GeoJSONSeq"
+        )
+        self.write_export(self.segments)
+        incremental.convert_incremental(
+            self.in_json, self.tmpdir, "timeline", driver="GeoJSONSeq"
+        )
+        points, _ = gtl2geojson.parse_timeline(self.in_json)
+        self.assertEqual(
+            self.read_sequence("point"), json.loads(json.dumps(points["features"]))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.index` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from gtlparser import cache, columnar, index
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+def make_tables(n=500, seed=0):
+    """Build random visit and path tables around Knoxville."""
+    rng = np.random.default_rng(seed)
+    start = np.sort(rng.integers(0, 10**9, n))
+    end = start + rng.integers(0, 10**7, n)
+    visits = columnar.VisitColumns(
+        segment_id=np.arange(n),
+        lon=rng.uniform(-84.2, -83.7, n),
+        lat=rng.uniform(35.8, 36.1, n),
+        start_time=start,
+        end_time=end,
+        start_offset=np.zeros(n, dtype=np.int16),
+        end_offset=np.zeros(n, dtype=np.int16),
+        hierarchy_level=np.zeros(n, dtype=np.int16),
+        probability=np.ones(n),
+        place_id=np.array(["p"] * n),
+        semantic_type=np.array(["UNKNOWN"] * n),
+        top_probability=np.ones(n),
+    )
+    vertex_count = rng.integers(0, 6, n)
+    offsets = np.concatenate(([0], np.cumsum(vertex_count)))
+    paths = columnar.PathColumns(
+        segment_id=np.arange(n),
+        start_time=start,
+        end_time=end,
+        start_offset=np.zeros(n, dtype=np.int16),
+        end_offset=np.zeros(n, dtype=np.int16),
+        offsets=offsets,
+        lon=rng.uniform(-84.2, -83.7, offsets[-1]),
+        lat=rng.uniform(35.8, 36.1, offsets[-1]),
+        time=np.zeros(offsets[-1], dtype=np.int64),
+    )
+    return visits, paths
+
+
+class TestIndex(unittest.TestCase):
+    """Tests for `gtlparser.index` module."""
+
+    def setUp(self):
+        """Index random tables."""
+        self.visits, self.paths = make_tables()
+        self.index = index.TimelineIndex(self.visits, self.paths)
+
+    def test_query_time(self):
+        """Time-window queries match a linear scan."""
+        start, end = 4 * 10**8, 5 * 10**8
+        visit_rows, path_rows = self.index.query_time(start, end)
+        expected = np.flatnonzero(
+            (self.visits.start_time < end) & (self.visits.end_time > start)
+        )
+        self.assertEqual(sorted(visit_rows), expected.tolist())
+        self.assertEqual(sorted(path_rows), expected.tolist())
+
+    def test_long_intervals(self):
+        """A long visit only widens the time queries that start before it ends."""
+        self.visits.end_time[10] = self.visits.start_time[10] + 5 * 10**8
+        long_index = index.TimelineIndex(self.visits, self.paths)
+        for start, end in ((4 * 10**8, 5 * 10**8), (8 * 10**8, 9 * 10**8)):
+            visit_rows, _ = long_index.query_time(start, end)
+            expected = np.flatnonzero(
+                (self.visits.start_time < end) & (self.visits.end_time > start)
+            )
+            self.assertEqual(sorted(visit_rows), expected.tolist())
+        lower = np.searchsorted(long_index.visit_end_max, 8 * 10**8, side="right")
+        self.assertGreater(lower, 10)
+
+    def test_large_paths(self):
+        """Long and antimeridian paths take one grid entry each and are found."""
+        n = 3
+        paths = columnar.PathColumns(
+            segment_id=np.arange(n),
+            start_time=np.arange(n),
+            end_time=np.arange(n) + 1,
+            start_offset=np.zeros(n, dtype=np.int16),
+            end_offset=np.zeros(n, dtype=np.int16),
+            offsets=np.array([0, 2, 4, 6]),
+            lon=np.array([179.5, -179.5, -100.0, 100.0, -83.95, -83.9]),
+            lat=np.array([10.0, 10.5, 30.0, 40.0, 35.95, 35.96]),
+            time=np.zeros(6, dtype=np.int64),
+        )
+        large_index = index.TimelineIndex(self.visits, paths)
+        self.assertEqual(len(large_index.path_grid.keys), n)
+        for bbox, expected in (
+            ((0.0, 10.0, 1.0, 11.0), [0]),
+            ((-84.0, 35.9, -83.9, 36.0), [1, 2]),
+            ((-84.0, -10.0, -83.0, 0.0), []),
+        ):
+            _, path_rows = large_index.query_bbox(bbox)
+            self.assertEqual(path_rows.tolist(), expected)
+
+    def test_query_bbox(self):
+        """Bounding-box queries match a linear scan."""
+        bbox = (-84.0, 35.9, -83.9, 36.0)
+        visit_rows, path_rows = self.index.query_bbox(bbox)
+        expected = np.flatnonzero(
+            (self.visits.lon >= bbox[0])
+            & (self.visits.lon <= bbox[2])
+            & (self.visits.lat >= bbox[1])
+            & (self.visits.lat <= bbox[3])
+        )
+        self.assertEqual(visit_rows.tolist(), expected.tolist())
+        expected_paths = [
+            i
+            for i in range(len(self.paths))
+            if len(self.paths.get_path(i)[0])
+            and self.paths.get_path(i)[0].min() <= bbox[2]
+            and self.paths.get_path(i)[0].max() >= bbox[0]
+            and self.paths.get_path(i)[1].min() <= bbox[3]
+            and self.paths.get_path(i)[1].max() >= bbox[1]
+        ]
+        self.assertEqual(path_rows.tolist(), expected_paths)
+        self.assertEqual(len(self.paths.select(path_rows)), len(expected_paths))
+
+    def test_nearest_visits(self):
+        """Nearest and radius queries match a linear scan."""
+        distances = index.haversine(-83.93, 35.96, self.visits.lon, self.visits.lat)
+        rows, found = self.index.nearest_visits(-83.93, 35.96, k=5)
+        self.assertEqual(rows.tolist(), np.argsort(distances)[:5].tolist())
+        np.testing.assert_allclose(found, np.sort(distances)[:5])
+        rows, _ = self.index.visits_within(-83.93, 35.96, 2000)
+        self.assertEqual(sorted(rows), np.flatnonzero(distances <= 2000).tolist())
+
+    def test_save_and_cache(self):
+        """The index survives a save/load round trip and the parse cache."""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(tmpdir, "index.npz")
+            self.index.save(file_path)
+            loaded = index.TimelineIndex.load(file_path)
+            self.assertEqual(
+                loaded.query_bbox((-84.0, 35.9, -83.9, 36.0))[1].tolist(),
+                self.index.query_bbox((-84.0, 35.9, -83.9, 36.0))[1].tolist(),
+            )
+            parse_cache = cache.ParseCache(os.path.join(tmpdir, "cache"))
+            first = index.TimelineIndex.from_timeline(EXAMPLE_TIMELINE, parse_cache)
+            second = index.TimelineIndex.from_timeline(EXAMPLE_TIMELINE, parse_cache)
+            self.assertEqual(
+                first.query_time("2023-11-07", "2023-11-08")[0].tolist(),
+                second.query_time("2023-11-07", "2023-11-08")[0].tolist(),
+            )
+            self.assertEqual(len(os.listdir(parse_cache.cache_dir)), 2)
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.metrics` module."""
+
+import math
+import os
+import unittest
+
+import numpy as np
+
+from gtlparser import columnar, metrics
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests for `gtlparser.metrics` module."""
+
+    def setUp(self):
+        """Parse the example export once per test."""
+        _, self.paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        self.activities = columnar.parse_activity_columns(EXAMPLE_TIMELINE)
+
+    def test_haversine(self):
+        """One degree of latitude is about 111.2 km."""
+        self.assertAlmostEqual(metrics.haversine(0, 0, 0, 1) / 1000, 111.195, 2)
+
+    def test_path_vertex_metrics(self):
+        """Vectorized vertex steps match a per-path loop."""
+        steps = metrics.path_vertex_metrics(self.paths)
+        for i in range(len(self.paths)):
+            lon, lat = self.paths.get_path(i)
+            times = self.paths.get_times(i)
+            start = self.paths.offsets[i]
+            for j in range(len(lon)):
+                if j == 0:
+                    self.assertEqual(steps["distance"][start], 0)
+                    self.assertTrue(math.isnan(steps["speed"][start]))
+                    continue
+                distance = metrics.haversine(lon[j - 1], lat[j - 1], lon[j], lat[j])
+                self.assertAlmostEqual(steps["distance"][start + j], distance)
+                self.assertEqual(
+                    steps["duration"][start + j], (times[j] - times[j - 1]) / 1000
+                )
+
+    def test_segment_metrics(self):
+        """Path lengths add up their steps and activity speeds are distance / time."""
+        path = metrics.path_metrics(self.paths)
+        steps = metrics.path_vertex_metrics(self.paths)["distance"]
+        self.assertAlmostEqual(path["distance"].sum(), steps.sum(), places=6)
+        self.assertEqual(len(path["speed"]), len(self.paths))
+
+        activity = metrics.activity_metrics(self.activities)
+        np.testing.assert_allclose(
+            activity["speed"],
+            self.activities.distance_meters
+            / ((self.activities.end_time - self.activities.start_time) / 1000),
+        )
+        self.assertTrue((activity["straight_distance"] > 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.places` module."""
+
+import os
+import unittest
+
+import numpy as np
+
+from gtlparser import columnar, places
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+def brute_force_dbscan(x, y, eps, min_samples):
+    """Get the core points and the clusters of their pairwise distance matrix."""
+    distance = np.hypot(x[:, None] - x, y[:, None] - y)
+    core = (distance <= eps).sum(axis=1) >= min_samples
+    labels = np.full(len(x), -1)
+    cluster = 0
+    for i in np.flatnonzero(core):
+        if labels[i] >= 0:
+            continue
+        labels[i] = cluster
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            for k in np.flatnonzero((distance[j] <= eps) & core & (labels < 0)):
+                labels[k] = cluster
+                stack.append(k)
+        cluster += 1
+    return core, labels, distance
+
+
+class TestPlaces(unittest.TestCase):
+    """Tests for `gtlparser.places` module."""
+
+    def test_grid_dbscan(self):
+        """The grid clusters match a brute-force DBSCAN."""
+        rng = np.random.default_rng(0)
+        centres = rng.uniform(0, 3000, (20, 2))
+        points = centres[rng.integers(0, 20, 800)] + rng.normal(0, 40, (800, 2))
+        points = np.concatenate((points, rng.uniform(0, 3000, (200, 2))))
+        x, y = points[:, 0], points[:, 1]
+        for min_samples in (1, 3, 8):
+            labels = places.grid_dbscan(x, y, 50, min_samples)
+            core, expected, distance = brute_force_dbscan(x, y, 50, min_samples)
+            # Same partition of the core points
+            pairs = set(zip(labels[core], expected[core]))
+            self.assertEqual(len(pairs), len(set(expected[core])))
+            self.assertEqual(len(pairs), len(set(labels[core])))
+            # Border points join a cluster of a core point within eps
+            border = ~core & (labels >= 0)
+            near_core = ((distance <= 50) & core).any(axis=1)
+            self.assertTrue(np.array_equal(border, ~core & near_core))
+            self.assertTrue(np.all(labels[~core & ~near_core] == -1))
+
+    def test_cluster_places(self):
+        """Jittered visits of one place are summarized into one place."""
+        rng = np.random.default_rng(1)
+        n = 10
+        start = np.arange(n, dtype=np.int64) * 86_400_000
+        visits = columnar.VisitColumns(
+            segment_id=np.arange(n),
+            lon=np.append(-83.93 + rng.normal(0, 1e-4, n - 1), -84.5),
+            lat=np.append(35.96 + rng.normal(0, 1e-4, n - 1), 36.5),
+            start_time=start,
+            end_time=start + 3_600_000,
+            start_offset=np.full(n, -300, dtype=np.int16),
+            end_offset=np.full(n, -240, dtype=np.int16),
+            hierarchy_level=np.zeros(n, dtype=np.int16),
+            probability=np.ones(n),
+            place_id=np.array(["a", "b", "b"] + [""] * (n - 3)),
+            semantic_type=np.array(["UNKNOWN"] * n),
+            top_probability=np.ones(n),
+        )
+        found, labels = places.cluster_places(visits, eps=100)
+        self.assertEqual(labels.tolist(), [0] * (n - 1) + [-1])
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found.visit_count.tolist(), [n - 1])
+        self.assertEqual(found.dwell_time.tolist(), [3600.0 * (n - 1)])
+        self.assertEqual(found.first_seen.tolist(), [0])
+        self.assertEqual(found.last_seen.tolist(), [start[n - 2] + 3_600_000])
+        self.assertEqual(found.place_id.tolist(), ["b"])
+        feature = next(found.to_features())
+        self.assertEqual(feature["properties"]["firstSeen"][-6:], "-05:00")
+        self.assertEqual(feature["properties"]["lastSeen"][-6:], "-04:00")
+
+    def test_find_places(self):
+        """Places of the example export account for every clustered visit."""
+        visits, _ = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        found, labels = places.find_places(EXAMPLE_TIMELINE, eps=200)
+        self.assertEqual(len(labels), len(visits))
+        self.assertEqual(found.visit_count.sum(), (labels >= 0).sum())
+        self.assertEqual(len(found.select(found.visit_count > 1)), len(found))
+
+
+if __name__ == "__main__":
+    unittest.main()
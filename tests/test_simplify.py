@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.simplify` module."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from gtlparser import cache, columnar, gtl2geojson, simplify
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+class TestSimplify(unittest.TestCase):
+    """Tests for `gtlparser.simplify` module."""
+
+    def test_douglas_peucker_tolerance(self):
+        """Dropped vertices stay within the tolerance of the simplified line."""
+        rng = np.random.default_rng(0)
+        x = np.linspace(0, 1000, 200)
+        y = 50 * np.sin(x / 100) + rng.normal(0, 1, 200)
+        keep = simplify.douglas_peucker_mask(x, y, 5.0)
+        self.assertTrue(keep[0] and keep[-1])
+        self.assertLess(keep.sum(), 60)
+        simplified = np.interp(x, x[keep], y[keep])
+        self.assertLessEqual(np.abs(simplified - y).max(), 5.0 * 1.5)
+
+    def test_visvalingam(self):
+        """Collinear vertices are removed and corners are kept."""
+        x = np.array([0.0, 1, 2, 3, 3, 3])
+        y = np.array([0.0, 0, 0, 0, 1, 2])
+        keep = simplify.visvalingam_mask(x, y, 0.1)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 3, 5])
+
+    def test_parse_pipeline(self):
+        """Parsed, cached and columnar simplification agree."""
+        lines = gtl2geojson.parse_timelinePath(
+            EXAMPLE_TIMELINE, flag_vertexTime=1, simplify=20
+        )
+        original, simplified, ratio = simplify.get_vertex_reduction(lines)
+        self.assertGreater(ratio, 0)
+        for feature in lines["features"]:
+            self.assertEqual(
+                len(feature["properties"]["vertexTimes"]),
+                len(feature["geometry"]["coordinates"]),
+            )
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            parse_cache = cache.ParseCache(tmpdir)
+            parse_cache.load_columns(EXAMPLE_TIMELINE)
+            cached = gtl2geojson.parse_timelinePath(
+                EXAMPLE_TIMELINE, flag_vertexTime=1, simplify=20, cache=parse_cache
+            )
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(cached, lines)
+
+        _, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        paths = paths.select(paths.vertex_count > 1)
+        simplified_paths = simplify.simplify_paths(paths, 20)
+        self.assertEqual(len(simplified_paths.lon), simplified)
+        self.assertEqual(simplified_paths.offsets[-1], simplified)
+
+    def test_multiresolution(self):
+        """Lower zoom levels keep fewer vertices."""
+        _, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        levels = simplify.simplify_multiresolution(paths, zooms=(8, 12, 16))
+        counts = [len(levels[zoom].lon) for zoom in (8, 12, 16)]
+        self.assertEqual(counts, sorted(counts))
+        self.assertLessEqual(counts[-1], len(paths.lon))
+        self.assertAlmostEqual(
+            simplify.zoom_tolerance(1) * 2, simplify.zoom_tolerance(0)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.stays` module."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from gtlparser import cli, columnar, stays
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+def make_paths(lon, lat, time):
+    """Build a single-path table from vertex arrays."""
+    time = np.asarray(time, dtype=np.int64)
+    return columnar.PathColumns(
+        segment_id=np.arange(1),
+        start_time=time[:1],
+        end_time=time[-1:],
+        start_offset=np.zeros(1, dtype=np.int16),
+        end_offset=np.zeros(1, dtype=np.int16),
+        offsets=np.array([0, len(time)]),
+        lon=np.asarray(lon, dtype=np.float64),
+        lat=np.asarray(lat, dtype=np.float64),
+        time=time,
+    )
+
+
+class TestStays(unittest.TestCase):
+    """Tests for `gtlparser.stays` module."""
+
+    def test_planted_stays(self):
+        """Two planted stays are found and joined by one trip."""
+        rng = np.random.default_rng(0)
+        home = rng.normal(0, 2e-4, (30, 2)) + (-83.93, 35.96)
+        trip = np.column_stack(
+            (np.linspace(-83.93, -83.90, 20), np.linspace(35.96, 35.98, 20))
+        )
+        work = rng.normal(0, 2e-4, (30, 2)) + (-83.90, 35.98)
+        coordinates = np.concatenate((home, trip[1:-1], work))
+        time = np.arange(len(coordinates)) * 60_000
+        found, trips = stays.segment_timeline(
+            make_paths(coordinates[:, 0], coordinates[:, 1], time)
+        )
+        self.assertEqual(len(found), 2)
+        np.testing.assert_allclose(found.lon, [-83.93, -83.90], atol=2e-4)
+        np.testing.assert_allclose(found.lat, [35.96, 35.98], atol=2e-4)
+        self.assertEqual(len(trips), 1)
+        self.assertEqual(trips.start_time[0], found.end_time[0])
+        self.assertEqual(trips.end_time[0], found.start_time[1])
+        self.assertEqual(
+            len(trips.lon), len(coordinates) - found.vertex_count.sum() + 2
+        )
+
+    def test_thresholds(self):
+        """Short stops are trips, and gaps split stays when max_gap is set."""
+        time = np.array([0, 600, 1200, 1800, 7200]) * 1000
+        paths = make_paths(np.full(5, -83.93), np.full(5, 35.96), time)
+        self.assertEqual(len(stays.detect_stays(paths, duration=7200)[0]), 1)
+        self.assertEqual(len(stays.detect_stays(paths, duration=7201)[0]), 0)
+        found, runs = stays.detect_stays(paths, duration=1200, max_gap=900)
+        self.assertEqual(runs, [(0, 4)])
+        self.assertEqual(found.end_time.tolist(), [1800 * 1000])
+
+    def test_example_timeline(self):
+        """Every vertex is in a stay or a trip, and stays export as layers."""
+        _, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        found, trips = stays.segment_timeline(EXAMPLE_TIMELINE)
+        self.assertGreater(len(found), 0)
+        self.assertTrue(np.all(np.diff(trips.time) >= 0))
+        self.assertEqual(
+            len(trips.lon) - 2 * len(found),
+            len(paths.lon) - found.vertex_count.sum(),
+        )
+        collection = found.to_feature_collection()
+        self.assertEqual(len(collection["features"]), len(found))
+        self.assertTrue(
+            all(
+                feature["properties"]["durationSeconds"] >= 1200
+                for feature in collection["features"]
+            )
+        )
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            cli.main([EXAMPLE_TIMELINE, "-o", tmpdir, "-n", "out", "--stays"])
+            with open(os.path.join(tmpdir, "stay_out.geojson")) as f:
+                self.assertEqual(len(json.load(f)["features"]), len(found))
+            with open(os.path.join(tmpdir, "trip_out.geojson")) as f:
+                self.assertEqual(len(json.load(f)["features"]), len(trips))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+"""Tests for `gtlparser.tiles` module."""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+
+from gtlparser import cli, columnar, foliumap, tiles
+
+EXAMPLE_TIMELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, "example_timeline.json"
+)
+
+
+def read_varint(data, position):
+    """Read a protobuf varint."""
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, position
+
+
+def read_fields(data):
+    """Read the (field number, value) pairs of a protobuf message."""
+    fields = []
+    position = 0
+    while position < len(data):
+        key, position = read_varint(data, position)
+        if key & 7 == 0:
+            value, position = read_varint(data, position)
+        elif key & 7 == 1:
+            value, position = data[position : position + 8], position + 8
+        else:
+            length, position = read_varint(data, position)
+            value, position = data[position : position + length], position + length
+        fields.append((key >> 3, value))
+    return fields
+
+
+def decode_geometry(commands):
+    """Decode vector tile geometry commands to absolute coordinates."""
+    x = y = 0
+    points = []
+    i = 0
+    while i < len(commands):
+        count = commands[i] >> 3
+        i += 1
+        for _ in range(count):
+            dx, dy = commands[i], commands[i + 1]
+            x += (dx >> 1) ^ -(dx & 1)
+            y += (dy >> 1) ^ -(dy & 1)
+            points.append((x, y))
+            i += 2
+    return points
+
+
+def read_layers(tile):
+    """Map the layer names of a tile to their number of features."""
+    layers = {}
+    for _, layer in read_fields(tile):
+        fields = read_fields(layer)
+        layers[dict(fields)[1].decode()] = sum(1 for number, _ in fields if number == 2)
+    return layers
+
+
+class TestTiles(unittest.TestCase):
+    """Tests for `gtlparser.tiles` module."""
+
+    def setUp(self):
+        """Create a temporary folder."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary folder."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_encode_geometry(self):
+        """Lines round-trip through the geometry commands without repeated vertices."""
+        commands = tiles.encode_geometry([5, 5, 10, -3], [7, 7, 2, 4096])
+        self.assertEqual(decode_geometry(commands), [(5, 7), (10, 2), (-3, 4096)])
+        self.assertEqual(tiles.encode_geometry([1, 1], [2, 2]), [])
+        self.assertEqual(decode_geometry(tiles.encode_geometry([3], [4])), [(3, 4)])
+
+    def test_write_mbtiles(self):
+        """Every zoom level holds the visits, and the server returns the tiles."""
+        visits, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        file_path = os.path.join(self.tmpdir, "timeline.mbtiles")
+        count = tiles.write_mbtiles(EXAMPLE_TIMELINE, file_path, 4, 14)
+        with sqlite3.connect(file_path) as connection:
+            rows = connection.execute(
+                "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles"
+            ).fetchall()
+            metadata = dict(connection.execute("SELECT * FROM metadata"))
+        connection.close()
+        self.assertEqual(len(rows), count)
+        self.assertEqual(metadata["format"], "pbf")
+        for zoom in range(4, 15):
+            visit_count = sum(
+                read_layers(gzip.decompress(tile)).get("visits", 0)
+                for level, _, _, tile in rows
+                if level == zoom
+            )
+            self.assertEqual(visit_count, len(visits))
+
+        zoom, x, row, tile = rows[-1]
+        y = (1 << zoom) - 1 - row
+        self.assertEqual(tiles.read_tile(file_path, zoom, x, y), tile)
+        server = tiles.TileServer(file_path)
+        try:
+            with urllib.request.urlopen(server.url.format(z=zoom, x=x, y=y)) as r:
+                self.assertEqual(r.read(), tile)
+                self.assertEqual(r.headers["Content-Encoding"], "gzip")
+            with urllib.request.urlopen(server.url.format(z=0, x=0, y=0)) as r:
+                self.assertEqual(r.status, 204)
+        finally:
+            server.stop()
+
+    def test_feature_dropping(self):
+        """Visits per tile are capped, and low zooms drop and simplify paths."""
+        visits, paths = columnar.parse_timeline_columns(EXAMPLE_TIMELINE)
+        counts = {}
+        for zoom, _, _, tile in tiles.iter_tiles(visits, paths, 2, 16, max_points=3):
+            layers = read_layers(tile)
+            self.assertLessEqual(layers.get("visits", 0), 3)
+            counts[zoom] = counts.get(zoom, 0) + layers.get("paths", 0)
+        self.assertLess(counts[2], counts[16])
+
+    def test_prepare_tiles_cleanup(self):
+        """The temporary MBTiles file is removed when writing it fails."""
+        with mock.patch.object(tempfile, "tempdir", self.tmpdir):
+            with mock.patch.object(tiles, "write_mbtiles", side_effect=ValueError):
+                with self.assertRaises(ValueError):
+                    tiles.prepare_tiles(EXAMPLE_TIMELINE)
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_cli_and_map(self):
+        """The command line writes MBTiles and the map loads them from a server."""
+        cli.main([EXAMPLE_TIMELINE, "-o", self.tmpdir, "-n", "out", "-f", "mbtiles"])
+        file_path = os.path.join(self.tmpdir, "out.mbtiles")
+        self.assertTrue(os.path.exists(file_path))
+        m = foliumap.Map()
+        server = m.add_timeline_tiles(file_path)
+        try:
+            self.assertIn(server.url.split("{")[0], m.get_root().render())
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()